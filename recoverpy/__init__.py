@@ -2,21 +2,223 @@
 
 import argparse
 import logging
+import sys
 from datetime import datetime
 from os import path
+from pathlib import Path
 from tempfile import gettempdir
+from typing import Callable, List, Optional
 
+from recoverpy.lib.search.binary_scanner import (IO_POLICIES, IO_POLICY_CACHED,
+                                                 SCAN_BACKEND_MMAP,
+                                                 SCAN_BACKEND_READ)
+from recoverpy.lib.search.block_classification import build_block_class_map
+from recoverpy.lib.search.ngram_index import build_ngram_index
+from recoverpy.lib.search.scan_throttle import IO_CLASSES
+from recoverpy.lib.search.search_jobs import (JOB_STATUS_COMPLETED,
+                                              SearchJobError, load_search_jobs,
+                                              run_search_jobs)
+from recoverpy.lib.storage.device_cache import DeviceCacheError
 from recoverpy.log.logger import log
+from recoverpy.models.search_options import (DEFAULT_REGEX_MAX_MATCH_LEN,
+                                             SearchOptions)
 from recoverpy.ui.app import RecoverpyApp
 
 
-def _set_logger() -> None:
-    global log
-
+def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("-d", "--debug", action="store_true", help="Enable logging")
+    parser.add_argument(
+        "-i",
+        "--image",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Offer disk image FILE (raw, .gz, .xz or .bz2) next to the partitions",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=_positive_int,
+        default=1,
+        help="Scan the device in parallel byte-range shards using N processes",
+    )
+    parser.add_argument(
+        "-k",
+        "--keywords",
+        type=_keywords_file,
+        default=[],
+        metavar="FILE",
+        help="Also search every line of FILE as a keyword, in the same device pass",
+    )
+    parser.add_argument(
+        "-r",
+        "--regex",
+        action="store_true",
+        help="Treat the search string as a regular expression",
+    )
+    parser.add_argument(
+        "--max-match-len",
+        type=_positive_int,
+        default=DEFAULT_REGEX_MAX_MATCH_LEN,
+        metavar="N",
+        help="Longest regular expression match expected, in bytes",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory-map disk image files instead of reading them in chunks",
+    )
+    parser.add_argument(
+        "--io-policy",
+        choices=IO_POLICIES,
+        default=IO_POLICY_CACHED,
+        help="Page cache policy: keep cached pages, drop them once scanned, "
+        "or bypass the cache with O_DIRECT",
+    )
+    parser.add_argument(
+        "--auto-chunk-size",
+        action="store_true",
+        help="Size read chunks from the device queue hints and tune them "
+        "from measured throughput",
+    )
+    parser.add_argument(
+        "--limit",
+        type=_positive_int,
+        default=0,
+        metavar="MB",
+        help="Cap scan bandwidth at MB megabytes per second",
+    )
+    parser.add_argument(
+        "--io-class",
+        choices=IO_CLASSES,
+        help="I/O scheduling class of the scan",
+    )
+    parser.add_argument(
+        "--nice",
+        type=_niceness,
+        metavar="N",
+        help="CPU niceness of the scan, from -20 to 19",
+    )
+    parser.add_argument(
+        "--tolerate-read-errors",
+        action="store_true",
+        help="Skip unreadable sectors instead of aborting the search",
+    )
+    parser.add_argument(
+        "--error-map",
+        metavar="FILE",
+        help="Write unreadable ranges to FILE when the search ends "
+        "(implies --tolerate-read-errors)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="Periodically save search progress and hits to FILE",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="FILE",
+        help="Resume the interrupted search saved in checkpoint FILE",
+    )
+    parser.add_argument(
+        "--shared-scan",
+        action="store_true",
+        help="Read a device once for all concurrent searches of it (batch jobs)",
+    )
+    parser.add_argument(
+        "--use-index",
+        action="store_true",
+        help="Only scan the regions of a device its trigram index points to",
+    )
+    parser.add_argument(
+        "--build-index",
+        metavar="DEVICE",
+        help="Build the trigram index of DEVICE for --use-index and exit",
+    )
+    parser.add_argument(
+        "--text-only",
+        action="store_true",
+        help="Skip the blocks of a device its block map classifies as non-text",
+    )
+    parser.add_argument(
+        "--classify-blocks",
+        metavar="DEVICE",
+        help="Build the block map of DEVICE for --text-only and exit",
+    )
+    parser.add_argument(
+        "--unallocated-only",
+        action="store_true",
+        help="Only scan the blocks an ext2/3/4 or FAT32 filesystem marks free",
+    )
+    parser.add_argument(
+        "--skip-live-files",
+        action="store_true",
+        help="Drop the hits in blocks owned by a live file of an ext2/3/4 filesystem",
+    )
+    parser.add_argument(
+        "--jobs",
+        metavar="FILE",
+        help="Run the searches listed in job FILE without the interface",
+    )
+    parser.add_argument(
+        "--report-dir",
+        metavar="DIR",
+        help="Write job reports to DIR (default: a new directory in the current one)",
+    )
+    return parser.parse_args()
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"expected a value > 0, got {value}")
+    return number
+
+
+def _niceness(value: str) -> int:
+    number = int(value)
+    if not -20 <= number <= 19:
+        raise argparse.ArgumentTypeError(f"expected a value in [-20, 19], got {value}")
+    return number
+
+
+def _keywords_file(value: str) -> List[str]:
+    try:
+        with open(value, "r", encoding="utf-8") as keywords_file:
+            return [line.strip() for line in keywords_file if line.strip()]
+    except (OSError, UnicodeDecodeError) as error:
+        raise argparse.ArgumentTypeError(f"cannot read keywords file: {error}")
+
+
+def _get_search_options(args: argparse.Namespace) -> SearchOptions:
+    return SearchOptions(
+        scan_workers=args.workers,
+        image_paths=args.image,
+        keywords=args.keywords,
+        regex=args.regex,
+        max_match_len=args.max_match_len,
+        scan_backend=SCAN_BACKEND_MMAP if args.mmap else SCAN_BACKEND_READ,
+        io_policy=args.io_policy,
+        auto_chunk_size=args.auto_chunk_size,
+        bandwidth_limit_mb=args.limit,
+        io_class=args.io_class,
+        niceness=args.nice,
+        tolerate_read_errors=args.tolerate_read_errors or bool(args.error_map),
+        error_map_path=args.error_map,
+        checkpoint_path=args.checkpoint,
+        resume_from=args.resume,
+        shared_scan=args.shared_scan,
+        use_index=args.use_index,
+        text_only=args.text_only,
+        unallocated_only=args.unallocated_only,
+        skip_live_files=args.skip_live_files,
+    )
+
+
+def _set_logger(args: argparse.Namespace) -> None:
+    global log
 
-    args = parser.parse_args()
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     log_file_path = path.join(gettempdir(), f"recoverpy-{timestamp}.log")
 
@@ -32,10 +234,66 @@ def _set_logger() -> None:
     log = logging.getLogger()
 
 
+def _run_jobs(args: argparse.Namespace) -> int:
+    report_dir = args.report_dir or datetime.now().strftime(
+        "recoverpy-reports-%Y%m%d-%H%M%S"
+    )
+    try:
+        jobs = load_search_jobs(args.jobs, _get_search_options(args))
+    except SearchJobError as error:
+        log.error(f"Cannot load jobs: {error}")
+        print(error.user_message, file=sys.stderr)
+        return 2
+
+    reports = run_search_jobs(jobs, report_dir)
+    for report in reports:
+        line = f"{report.job.name}: {report.status}, {len(report.results)} results"
+        if report.error_message:
+            line += f" ({report.error_message})"
+        print(line)
+    print(f"Reports written to {report_dir}")
+    return 0 if all(report.status == JOB_STATUS_COMPLETED for report in reports) else 1
+
+
+def _build_device_cache(
+    build: Callable[..., Optional[Path]], device_path: str, kind: str
+) -> int:
+    def print_progress(processed_bytes: int) -> None:
+        print(
+            f"\rRead {processed_bytes // (1024 * 1024)} MiB of {device_path}",
+            end="",
+            flush=True,
+        )
+
+    try:
+        cache_path = build(device_path, progress_callback=print_progress)
+    except DeviceCacheError as error:
+        log.error(f"Cannot build {kind}: {error}")
+        print(f"\n{error.user_message}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print(f"\nBuilding the {kind} was interrupted", file=sys.stderr)
+        return 1
+    print(f"\n{kind.capitalize()} written to {cache_path}")
+    return 0
+
+
 def main() -> None:
-    _set_logger()
+    args = _parse_args()
+    _set_logger(args)
+    if args.build_index:
+        log.info("Building Recoverpy index")
+        sys.exit(_build_device_cache(build_ngram_index, args.build_index, "index"))
+    if args.classify_blocks:
+        log.info("Building Recoverpy block map")
+        sys.exit(
+            _build_device_cache(build_block_class_map, args.classify_blocks, "block map")
+        )
+    if args.jobs:
+        log.info("Starting Recoverpy jobs")
+        sys.exit(_run_jobs(args))
     log.info("Starting Recoverpy app")
-    RecoverpyApp().run()
+    RecoverpyApp(search_options=_get_search_options(args)).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Filesystem metadata read directly from the raw device, without mounting it."""
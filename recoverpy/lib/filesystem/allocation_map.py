@@ -0,0 +1,57 @@
+"""
+Unallocated space of a device, read from its filesystem allocation maps.
+
+Deleted data only survives in blocks the filesystem considers free, so
+searches limited to unallocated space skip every live file. Each provider
+recognizes one filesystem and returns the free byte ranges of the device, or
+None when the device does not hold its filesystem; the first provider
+recognizing the device wins. Adding a filesystem means adding a provider to
+`ALLOCATION_MAP_PROVIDERS`.
+
+Maps are read when the search starts: blocks allocated or freed on a mounted
+filesystem during the search are not followed.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from recoverpy.lib.filesystem.ext4 import get_ext4_free_ranges
+from recoverpy.lib.filesystem.fat import get_fat32_free_ranges
+from recoverpy.log.logger import log
+from recoverpy.models.scan_range import (ByteRange, intersect_ranges,
+                                         merge_close_ranges)
+
+
+class AllocationMapProvider(NamedTuple):
+    name: str
+    get_free_ranges: Callable[[str], Optional[List[ByteRange]]]
+
+
+ALLOCATION_MAP_PROVIDERS: Sequence[AllocationMapProvider] = (
+    AllocationMapProvider("ext4", get_ext4_free_ranges),
+    AllocationMapProvider("FAT32", get_fat32_free_ranges),
+)
+
+
+def get_unallocated_ranges(
+    source_path: str, start_offset: int = 0, end_offset: Optional[int] = None
+) -> Optional[List[ByteRange]]:
+    """Sorted unallocated ranges of [start_offset, end_offset), None when no
+    provider recognizes the filesystem of `source_path`."""
+    for provider in ALLOCATION_MAP_PROVIDERS:
+        ranges = provider.get_free_ranges(source_path)
+        if ranges is None:
+            continue
+        # Adjacent free blocks are read as one run.
+        ranges = merge_close_ranges(sorted(ranges), 0)
+        if ranges:
+            clip_end = ranges[-1][1] if end_offset is None else end_offset
+            ranges = intersect_ranges(ranges, [(start_offset, clip_end)])
+        log.info(
+            f"allocation_map - {sum(end - start for start, end in ranges)} bytes of "
+            f"{source_path} are unallocated in its {provider.name} filesystem"
+        )
+        return ranges
+    log.info(f"allocation_map - No supported filesystem found on {source_path}")
+    return None
@@ -0,0 +1,136 @@
+"""
+Allocation unit of the filesystem on a device, probed from its superblock.
+
+Files are laid out in filesystem blocks (clusters), usually 4 KiB, while the
+device addresses 512-byte sectors. Results and block views use the filesystem
+block when it is known, so one block of a file is one result and one page.
+Supported: ext2/3/4, XFS, btrfs, NTFS, exFAT and FAT12/16/32.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Callable, NamedTuple, Optional, Sequence, Tuple
+
+from recoverpy.lib.filesystem.ext4 import read_ext4_superblock
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     read_range)
+from recoverpy.log.logger import log
+
+# Larger clusters are viewed in slices of this size.
+MAX_VIEW_BLOCK_SIZE = 64 * 1024
+_BOOT_SECTOR_SIZE = 512
+_BTRFS_SUPERBLOCK_OFFSET = 0x10000
+_BTRFS_MAGIC = b"_BHRfS_M"
+_XFS_MAGIC = b"XFSB"
+_SECTOR_SIZES = (512, 1024, 2048, 4096)
+
+
+class FilesystemBlockSize(NamedTuple):
+    filesystem: str
+    block_size: int
+
+
+def probe_filesystem_block_size(source_path: str) -> Optional[FilesystemBlockSize]:
+    """The filesystem of `source_path` and its block size, None if unknown."""
+    for filesystem, probe in _PROBES:
+        try:
+            block_size = probe(source_path)
+        except BlockExtractionError:
+            block_size = None
+        if block_size is not None and _is_power_of_two(block_size):
+            log.info(
+                f"block_size - {source_path} holds {filesystem} with "
+                f"{block_size} byte blocks"
+            )
+            return FilesystemBlockSize(filesystem, block_size)
+    return None
+
+
+def get_view_block_size(source_path: str, sector_size: int) -> int:
+    """Block size for results and block views: the filesystem block, capped at
+    `MAX_VIEW_BLOCK_SIZE`, or the sector size when it cannot be used."""
+    probed = probe_filesystem_block_size(source_path)
+    if probed is None or probed.block_size % sector_size:
+        return sector_size
+    return min(probed.block_size, max(MAX_VIEW_BLOCK_SIZE, sector_size))
+
+
+def _probe_ext(source_path: str) -> Optional[int]:
+    superblock = read_ext4_superblock(source_path)
+    return None if superblock is None else superblock.block_size
+
+
+def _probe_xfs(source_path: str) -> Optional[int]:
+    data = read_range(source_path, 0, 8)
+    if data[:4] != _XFS_MAGIC:
+        return None
+    (block_size,) = struct.unpack_from(">I", data, 4)
+    return block_size
+
+
+def _probe_btrfs(source_path: str) -> Optional[int]:
+    data = read_range(source_path, _BTRFS_SUPERBLOCK_OFFSET, 0x98)
+    if data[0x40:0x48] != _BTRFS_MAGIC:
+        return None
+    (sector_size,) = struct.unpack_from("<I", data, 0x90)
+    return sector_size
+
+
+def _probe_ntfs(source_path: str) -> Optional[int]:
+    data = read_range(source_path, 0, _BOOT_SECTOR_SIZE)
+    if data[3:11] != b"NTFS    ":
+        return None
+    bytes_per_sector, sectors_per_cluster = struct.unpack_from("<HB", data, 0x0B)
+    if bytes_per_sector not in _SECTOR_SIZES:
+        return None
+    if sectors_per_cluster > 0x80:
+        # Large clusters store the cluster size as a negative power of two.
+        return 1 << (256 - sectors_per_cluster)
+    return bytes_per_sector * sectors_per_cluster
+
+
+def _probe_exfat(source_path: str) -> Optional[int]:
+    data = read_range(source_path, 0, _BOOT_SECTOR_SIZE)
+    if data[3:11] != b"EXFAT   ":
+        return None
+    bytes_per_sector_shift, sectors_per_cluster_shift = struct.unpack_from(
+        "<BB", data, 0x6C
+    )
+    if not 9 <= bytes_per_sector_shift <= 12 or sectors_per_cluster_shift > 25:
+        return None
+    return 1 << (bytes_per_sector_shift + sectors_per_cluster_shift)
+
+
+def _probe_fat(source_path: str) -> Optional[int]:
+    data = read_range(source_path, 0, _BOOT_SECTOR_SIZE)
+    if data[510:512] != b"\x55\xaa":
+        return None
+    # FAT12/16 and FAT32 write their type at different offsets.
+    if not (data[0x36:0x39] == b"FAT" or data[0x52:0x55] == b"FAT"):
+        return None
+    bytes_per_sector, sectors_per_cluster, reserved_sectors, fat_count = (
+        struct.unpack_from("<HBHB", data, 0x0B)
+    )
+    if (
+        bytes_per_sector not in _SECTOR_SIZES
+        or not _is_power_of_two(sectors_per_cluster)
+        or not reserved_sectors
+        or not fat_count
+    ):
+        return None
+    return bytes_per_sector * sectors_per_cluster
+
+
+def _is_power_of_two(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+_PROBES: Sequence[Tuple[str, Callable[[str], Optional[int]]]] = (
+    ("ext2/3/4", _probe_ext),
+    ("XFS", _probe_xfs),
+    ("btrfs", _probe_btrfs),
+    ("NTFS", _probe_ntfs),
+    ("exFAT", _probe_exfat),
+    ("FAT", _probe_fat),
+)
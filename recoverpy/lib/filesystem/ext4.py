@@ -0,0 +1,310 @@
+"""
+ext2/3/4 on-disk structures: superblock, group descriptors and block bitmaps.
+
+Only the fields needed to locate blocks are decoded. Checksums are not
+verified, so a damaged filesystem yields wrong maps rather than errors;
+callers only use them to narrow what gets scanned.
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     read_range)
+from recoverpy.log.logger import log
+from recoverpy.models.scan_range import ByteRange
+
+SUPERBLOCK_OFFSET = 1024
+_SUPERBLOCK_SIZE = 1024
+_EXT4_MAGIC = 0xEF53
+_COMPAT_SPARSE_SUPER2 = 0x200
+_RO_COMPAT_SPARSE_SUPER = 0x1
+_INCOMPAT_META_BG = 0x10
+_INCOMPAT_64BIT = 0x80
+_GOOD_OLD_INODE_SIZE = 128
+_MIN_DESC_SIZE = 32
+_MIN_DESC_SIZE_64BIT = 64
+# Group descriptor flag: the block bitmap was never written, as no block of
+# the group has been allocated since the filesystem was created.
+_BG_BLOCK_UNINIT = 0x2
+_MAX_LOG_BLOCK_SIZE = 6
+# Runs of clear bytes, or a byte with both clear and set bits.
+_CLEAR_BYTES = re.compile(rb"\x00+|[^\xff]")
+
+
+@dataclass(frozen=True)
+class Ext4Superblock:
+    blocks_count: int
+    inodes_count: int
+    first_data_block: int
+    block_size: int
+    blocks_per_group: int
+    inodes_per_group: int
+    inode_size: int
+    desc_size: int
+    feature_compat: int
+    feature_incompat: int
+    feature_ro_compat: int
+    reserved_gdt_blocks: int
+    # The only groups holding a superblock backup besides the first one, with
+    # the sparse_super2 feature.
+    backup_groups: Tuple[int, int]
+
+    @property
+    def group_count(self) -> int:
+        return -(-(self.blocks_count - self.first_data_block) // self.blocks_per_group)
+
+    @property
+    def is_64bit(self) -> bool:
+        return bool(self.feature_incompat & _INCOMPAT_64BIT)
+
+    @property
+    def inode_table_blocks(self) -> int:
+        return -(-self.inodes_per_group * self.inode_size // self.block_size)
+
+    def has_superblock_backup(self, group: int) -> bool:
+        """Whether `group` starts with a copy of the superblock and group
+        descriptor table, as decided by the kernel's `ext4_bg_has_super`."""
+        if group == 0:
+            return True
+        if self.feature_compat & _COMPAT_SPARSE_SUPER2:
+            return group in self.backup_groups
+        if group == 1 or not self.feature_ro_compat & _RO_COMPAT_SPARSE_SUPER:
+            return True
+        if not group & 1:
+            return False
+        return any(_is_power_of(group, base) for base in (3, 5, 7))
+
+
+@dataclass(frozen=True)
+class Ext4GroupDescriptor:
+    block_bitmap: int
+    inode_bitmap: int
+    inode_table: int
+    flags: int
+
+
+def read_ext4_superblock(source_path: str) -> Optional[Ext4Superblock]:
+    """The superblock of the ext2/3/4 filesystem of `source_path`, None if
+    it holds none."""
+    try:
+        data = read_range(source_path, SUPERBLOCK_OFFSET, _SUPERBLOCK_SIZE)
+    except BlockExtractionError:
+        return None
+    (magic,) = struct.unpack_from("<H", data, 0x38)
+    if magic != _EXT4_MAGIC:
+        return None
+    inodes_count, blocks_count_lo = struct.unpack_from("<II", data, 0x00)
+    first_data_block, log_block_size = struct.unpack_from("<II", data, 0x14)
+    (blocks_per_group,) = struct.unpack_from("<I", data, 0x20)
+    (inodes_per_group,) = struct.unpack_from("<I", data, 0x28)
+    (rev_level,) = struct.unpack_from("<I", data, 0x4C)
+    (inode_size,) = struct.unpack_from("<H", data, 0x58)
+    feature_compat, feature_incompat, feature_ro_compat = struct.unpack_from(
+        "<III", data, 0x5C
+    )
+    (reserved_gdt_blocks,) = struct.unpack_from("<H", data, 0xCE)
+    (desc_size,) = struct.unpack_from("<H", data, 0xFE)
+    (blocks_count_hi,) = struct.unpack_from("<I", data, 0x150)
+    backup_groups = struct.unpack_from("<II", data, 0x24C)
+    if log_block_size > _MAX_LOG_BLOCK_SIZE or not blocks_per_group or not inodes_per_group:
+        log.warning(f"ext4 - Inconsistent superblock on {source_path}")
+        return None
+    is_64bit = bool(feature_incompat & _INCOMPAT_64BIT)
+    return Ext4Superblock(
+        blocks_count=blocks_count_lo | (blocks_count_hi << 32 if is_64bit else 0),
+        inodes_count=inodes_count,
+        first_data_block=first_data_block,
+        block_size=1024 << log_block_size,
+        blocks_per_group=blocks_per_group,
+        inodes_per_group=inodes_per_group,
+        inode_size=inode_size if rev_level else _GOOD_OLD_INODE_SIZE,
+        desc_size=max(desc_size, _MIN_DESC_SIZE_64BIT) if is_64bit else _MIN_DESC_SIZE,
+        feature_compat=feature_compat,
+        feature_incompat=feature_incompat,
+        feature_ro_compat=feature_ro_compat,
+        reserved_gdt_blocks=reserved_gdt_blocks,
+        backup_groups=(backup_groups[0], backup_groups[1]),
+    )
+
+
+def read_group_descriptors(
+    source_path: str, superblock: Ext4Superblock
+) -> Optional[List[Ext4GroupDescriptor]]:
+    """Descriptors of every block group, None when they are scattered by the
+    meta_bg feature, which is not supported."""
+    if superblock.feature_incompat & _INCOMPAT_META_BG:
+        log.info(f"ext4 - meta_bg group descriptors of {source_path} are not supported")
+        return None
+    table_offset = (superblock.first_data_block + 1) * superblock.block_size
+    table = read_range(
+        source_path, table_offset, superblock.group_count * superblock.desc_size
+    )
+    descriptors: List[Ext4GroupDescriptor] = []
+    for offset in range(0, len(table), superblock.desc_size):
+        block_bitmap, inode_bitmap, inode_table = struct.unpack_from(
+            "<III", table, offset
+        )
+        (flags,) = struct.unpack_from("<H", table, offset + 0x12)
+        if superblock.is_64bit:
+            block_bitmap_hi, inode_bitmap_hi, inode_table_hi = struct.unpack_from(
+                "<III", table, offset + 0x20
+            )
+            block_bitmap |= block_bitmap_hi << 32
+            inode_bitmap |= inode_bitmap_hi << 32
+            inode_table |= inode_table_hi << 32
+        descriptors.append(
+            Ext4GroupDescriptor(block_bitmap, inode_bitmap, inode_table, flags)
+        )
+    return descriptors
+
+
+def get_ext4_free_ranges(source_path: str) -> Optional[List[ByteRange]]:
+    """Byte ranges of the blocks marked free in the block bitmaps, None if
+    `source_path` holds no supported ext2/3/4 filesystem."""
+    superblock = read_ext4_superblock(source_path)
+    if superblock is None:
+        return None
+    try:
+        descriptors = read_group_descriptors(source_path, superblock)
+        if descriptors is None:
+            return None
+        block_ranges: List[Tuple[int, int]] = []
+        metadata_runs = _get_metadata_runs(superblock, descriptors)
+        for group, descriptor in enumerate(descriptors):
+            first_block = superblock.first_data_block + group * superblock.blocks_per_group
+            block_count = min(
+                superblock.blocks_per_group, superblock.blocks_count - first_block
+            )
+            if descriptor.flags & _BG_BLOCK_UNINIT:
+                # Everything but the metadata mkfs wrote there is free.
+                block_ranges.extend(
+                    _subtract_runs(
+                        first_block,
+                        first_block + block_count,
+                        metadata_runs.get(group, []),
+                    )
+                )
+                continue
+            bitmap = read_range(
+                source_path,
+                descriptor.block_bitmap * superblock.block_size,
+                superblock.block_size,
+            )
+            for start, end in iter_clear_bit_runs(bitmap, block_count):
+                block_ranges.append((first_block + start, first_block + end))
+    except BlockExtractionError as error:
+        log.warning(f"ext4 - Cannot read allocation metadata of {source_path}: {error}")
+        return None
+    return [
+        (start * superblock.block_size, end * superblock.block_size)
+        for start, end in block_ranges
+    ]
+
+
+def iter_clear_bit_runs(bitmap: bytes, bit_count: int) -> Iterator[Tuple[int, int]]:
+    """[start, end) runs of clear bits among the first `bit_count` bits of
+    `bitmap`, bit i being bit i % 8 of byte i // 8. Bits past the end of
+    `bitmap` are clear."""
+    run_start = run_end = 0
+    for start, end in _iter_byte_clear_runs(bitmap, bit_count):
+        end = min(end, bit_count)
+        if start >= end:
+            break
+        if start != run_end:
+            if run_start < run_end:
+                yield run_start, run_end
+            run_start = start
+        run_end = end
+    if run_start < run_end:
+        yield run_start, run_end
+
+
+def _iter_byte_clear_runs(bitmap: bytes, bit_count: int) -> Iterator[Tuple[int, int]]:
+    """Clear runs of `bitmap` in order, not merged across bytes holding both
+    clear and set bits, then the bits past its end."""
+    byte_count = -(-bit_count // 8)
+    for match in _CLEAR_BYTES.finditer(bitmap, 0, byte_count):
+        first_bit = match.start() * 8
+        value = match.group()[0]
+        if value:
+            for start, end in _BYTE_CLEAR_RUNS[value]:
+                yield first_bit + start, first_bit + end
+        else:
+            yield first_bit, match.end() * 8
+    yield len(bitmap) * 8, byte_count * 8
+
+
+def _get_byte_clear_runs(value: int) -> List[Tuple[int, int]]:
+    runs: List[Tuple[int, int]] = []
+    for bit in range(8):
+        if value >> bit & 1:
+            continue
+        if runs and runs[-1][1] == bit:
+            runs[-1] = (runs[-1][0], bit + 1)
+        else:
+            runs.append((bit, bit + 1))
+    return runs
+
+
+_BYTE_CLEAR_RUNS = [_get_byte_clear_runs(value) for value in range(256)]
+
+
+def _get_metadata_runs(
+    superblock: Ext4Superblock, descriptors: List[Ext4GroupDescriptor]
+) -> Dict[int, List[Tuple[int, int]]]:
+    """Block runs of each group holding a superblock or descriptor table
+    copy, or the bitmaps and inode table of any group, which the flex_bg
+    feature places in other groups."""
+    first_data_block = superblock.first_data_block
+    blocks_per_group = superblock.blocks_per_group
+    # Superblock, descriptor table and blocks reserved for its growth.
+    backup_blocks = (
+        1
+        + -(-superblock.group_count * superblock.desc_size // superblock.block_size)
+        + superblock.reserved_gdt_blocks
+    )
+    runs: Dict[int, List[Tuple[int, int]]] = {}
+    for group in range(superblock.group_count):
+        if superblock.has_superblock_backup(group):
+            first_block = first_data_block + group * blocks_per_group
+            runs.setdefault(group, []).append((first_block, first_block + backup_blocks))
+    for descriptor in descriptors:
+        for start, length in (
+            (descriptor.block_bitmap, 1),
+            (descriptor.inode_bitmap, 1),
+            (descriptor.inode_table, superblock.inode_table_blocks),
+        ):
+            # Inode tables may run over into the next group.
+            end = start + length
+            while start < end:
+                group = (start - first_data_block) // blocks_per_group
+                group_end = first_data_block + (group + 1) * blocks_per_group
+                runs.setdefault(group, []).append((start, min(end, group_end)))
+                start = group_end
+    return runs
+
+
+def _subtract_runs(
+    start: int, end: int, runs: List[Tuple[int, int]]
+) -> Iterator[Tuple[int, int]]:
+    """Parts of [start, end) outside every run of `runs`."""
+    for run_start, run_end in sorted(runs):
+        if run_start > start:
+            yield start, min(run_start, end)
+        start = max(start, run_end)
+        if start >= end:
+            return
+    if start < end:
+        yield start, end
+
+
+def _is_power_of(value: int, base: int) -> bool:
+    power = base
+    while power < value:
+        power *= base
+    return power == value
@@ -0,0 +1,441 @@
+"""
+Reverse map from the blocks of an ext2/3/4 filesystem to the live inodes
+owning them.
+
+Hits in the blocks of live files are rarely what a recovery is after, and on a
+busy partition they bury the deleted data. The map is built on first use from
+the inode tables: the extents, or on ext2/3 the block maps, of every allocated
+file, directory and symbolic link are collected into sorted runs of blocks,
+together with their extent tree, indirect and extended attribute blocks.
+Preallocated extents that were never written are left out, as they still hold
+whatever was stored there before. So are the reserved inodes other than the
+root directory: the journal keeps copies of deleted data.
+
+Maps are cached per device fingerprint, which covers the superblock, with its
+write time and free block count, and the group descriptors, so a map cached
+before files were deleted is not reused once the filesystem recorded the
+deletion. A mounted filesystem may change at any time without that showing on
+the device yet: its map is built anew for every search and not cached. Paths
+are only resolved when asked for, by reading every directory once.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from recoverpy.lib.filesystem.ext4 import (Ext4Superblock, iter_clear_bit_runs,
+                                           read_ext4_superblock,
+                                           read_group_descriptors)
+from recoverpy.lib.storage.block_device_inventory import is_mounted
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     read_range)
+from recoverpy.lib.storage.device_cache import (CACHE_HEADER_SIZE,
+                                                DeviceCacheError,
+                                                decode_cache_header,
+                                                get_cache_path,
+                                                get_device_fingerprint,
+                                                write_cache_file)
+from recoverpy.log.logger import log
+
+OWNER_MAP_SUFFIX = ".owners"
+ROOT_INODE = 2
+# Inodes below are reserved for the filesystem itself.
+_FIRST_REGULAR_INODE = 11
+_BG_INODE_UNINIT = 0x1
+_S_IFMT = 0xF000
+_S_IFDIR = 0x4000
+_S_IFREG = 0x8000
+_S_IFLNK = 0xA000
+_EXTENTS_FL = 0x80000
+_INLINE_DATA_FL = 0x10000000
+_I_BLOCK_OFFSET = 0x28
+_I_BLOCK_SIZE = 60
+_DIRECT_BLOCKS = 12
+_EXTENT_MAGIC = 0xF30A
+_EXTENT_HEADER_SIZE = 12
+_EXTENT_ENTRY_SIZE = 12
+# Longer extents are preallocated ones, not written yet.
+_MAX_INIT_EXTENT_LEN = 32768
+_MAX_EXTENT_DEPTH = 5
+_DIRECTORY_ENTRY_HEADER_SIZE = 8
+_DIRECTORY_READ_BLOCKS = 256
+# A path deeper than this is taken as a directory loop.
+_MAX_PATH_DEPTH = 4096
+
+# What the blocks of a run hold for their inode.
+_KIND_DATA = 0
+_KIND_DIRECTORY = 1
+_KIND_METADATA = 2
+
+_MAP_VERSION = 1
+_MAGIC = b"RPYOWNRS"
+
+# First block, end block, inode and kind.
+_OwnedRun = Tuple[int, int, int, int]
+
+
+class Ext4OwnerMap:
+    def __init__(
+        self,
+        source_path: str,
+        block_size: int,
+        runs: List[_OwnedRun],
+    ):
+        self.source_path = source_path
+        self.block_size = block_size
+        self._starts = array("Q", [run[0] for run in runs])
+        self._ends = array("Q", [run[1] for run in runs])
+        self._inodes = array("I", [run[2] for run in runs])
+        self._kinds = array("B", [run[3] for run in runs])
+        self._parents: Optional[Dict[int, Tuple[int, str]]] = None
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def owned_bytes(self) -> int:
+        return (sum(self._ends) - sum(self._starts)) * self.block_size
+
+    def find_owner(self, offset: int) -> Optional[int]:
+        """Inode of the live file owning the block at byte `offset`, None if
+        no live file owns it."""
+        block = offset // self.block_size
+        index = bisect_right(self._starts, block) - 1
+        if index >= 0 and block < self._ends[index]:
+            return self._inodes[index]
+        return None
+
+    def get_path(self, inode: int) -> Optional[str]:
+        """Path of `inode` from the filesystem root, None if no directory
+        links to it."""
+        if self._parents is None:
+            self._parents = self._read_directories()
+        names: List[str] = []
+        while inode != ROOT_INODE:
+            link = self._parents.get(inode)
+            if link is None or len(names) >= _MAX_PATH_DEPTH:
+                return None
+            inode, name = link
+            names.append(name)
+        return "/" + "/".join(reversed(names))
+
+    @classmethod
+    def load(
+        cls, source_path: str, cache_path: Path, fingerprint: str
+    ) -> Optional[Ext4OwnerMap]:
+        """Map cached in `cache_path`, None if missing, damaged or stale."""
+        try:
+            with open(cache_path, "rb") as cache_file:
+                header = decode_cache_header(_MAGIC, cache_file.read(CACHE_HEADER_SIZE))
+                if (
+                    header.get("version") != _MAP_VERSION
+                    or header.get("fingerprint") != fingerprint
+                    or header.get("byteorder") != sys.byteorder
+                ):
+                    return None
+                run_count: int = header["run_count"]
+                owner_map = cls(source_path, header["block_size"], [])
+                for column in owner_map._get_columns():
+                    column.fromfile(cache_file, run_count)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, KeyError, TypeError) as error:
+            log.warning(f"ext4_owners - Ignoring damaged owner map {cache_path}: {error}")
+            return None
+        log.info(f"ext4_owners - Loaded owner map of {source_path} from {cache_path}")
+        return owner_map
+
+    def save(self, cache_path: Path, fingerprint: str) -> None:
+        def write_columns(cache_file: BinaryIO) -> Dict[str, Any]:
+            for column in self._get_columns():
+                column.tofile(cache_file)
+            return {
+                "version": _MAP_VERSION,
+                "fingerprint": fingerprint,
+                "source_path": self.source_path,
+                "block_size": self.block_size,
+                "run_count": len(self),
+                "byteorder": sys.byteorder,
+            }
+
+        try:
+            write_cache_file(cache_path, _MAGIC, "owner map", write_columns)
+        except DeviceCacheError as error:
+            log.warning(f"ext4_owners - Cannot cache owner map in {cache_path}: {error}")
+
+    def _get_columns(self) -> Tuple[array[int], ...]:
+        return self._starts, self._ends, self._inodes, self._kinds
+
+    def _read_directories(self) -> Dict[int, Tuple[int, str]]:
+        """Directory and name of every linked inode, from the first link met."""
+        parents: Dict[int, Tuple[int, str]] = {}
+        for index, kind in enumerate(self._kinds):
+            if kind != _KIND_DIRECTORY:
+                continue
+            directory = self._inodes[index]
+            for first_block in range(
+                self._starts[index], self._ends[index], _DIRECTORY_READ_BLOCKS
+            ):
+                block_count = min(
+                    _DIRECTORY_READ_BLOCKS, self._ends[index] - first_block
+                )
+                try:
+                    data = read_range(
+                        self.source_path,
+                        first_block * self.block_size,
+                        block_count * self.block_size,
+                    )
+                except BlockExtractionError as error:
+                    log.warning(
+                        f"ext4_owners - Cannot read directory {directory}: {error}"
+                    )
+                    break
+                for block_offset in range(0, len(data), self.block_size):
+                    for inode, name in iter_directory_entries(
+                        data[block_offset : block_offset + self.block_size]
+                    ):
+                        if name not in (".", ".."):
+                            parents.setdefault(inode, (directory, name))
+        log.info(
+            f"ext4_owners - Read {len(parents)} directory entries of {self.source_path}"
+        )
+        return parents
+
+
+def get_ext4_owner_map(source_path: str) -> Optional[Ext4OwnerMap]:
+    """Owner map of the ext2/3/4 filesystem of `source_path`, read from the
+    cache or built and cached on first use, or always built when mounted;
+    None if it holds no supported filesystem."""
+    superblock = read_ext4_superblock(source_path)
+    if superblock is None:
+        return None
+    try:
+        fingerprint = get_device_fingerprint(source_path)
+    except DeviceCacheError as error:
+        log.warning(f"ext4_owners - Cannot fingerprint {source_path}: {error}")
+        return None
+    cache_path = get_cache_path(fingerprint, OWNER_MAP_SUFFIX)
+    if is_mounted(source_path):
+        log.info(f"ext4_owners - {source_path} is mounted, building its owner map")
+        return build_ext4_owner_map(source_path, superblock)
+    owner_map = Ext4OwnerMap.load(source_path, cache_path, fingerprint)
+    if owner_map is not None:
+        return owner_map
+    owner_map = build_ext4_owner_map(source_path, superblock)
+    if owner_map is not None:
+        owner_map.save(cache_path, fingerprint)
+    return owner_map
+
+
+def build_ext4_owner_map(
+    source_path: str, superblock: Ext4Superblock
+) -> Optional[Ext4OwnerMap]:
+    """Owner map read from the inode tables, None if they cannot be read."""
+    try:
+        descriptors = read_group_descriptors(source_path, superblock)
+        if descriptors is None:
+            return None
+        runs: List[_OwnedRun] = []
+        for group, descriptor in enumerate(descriptors):
+            first_inode = group * superblock.inodes_per_group + 1
+            inode_count = min(
+                superblock.inodes_per_group,
+                superblock.inodes_count - first_inode + 1,
+            )
+            if descriptor.flags & _BG_INODE_UNINIT or inode_count <= 0:
+                continue
+            bitmap = read_range(
+                source_path,
+                descriptor.inode_bitmap * superblock.block_size,
+                superblock.block_size,
+            )
+            # Runs of used inodes are the clear runs of the inverted bitmap.
+            used_runs = list(
+                iter_clear_bit_runs(bytes(byte ^ 0xFF for byte in bitmap), inode_count)
+            )
+            if not used_runs:
+                continue
+            table = read_range(
+                source_path,
+                descriptor.inode_table * superblock.block_size,
+                used_runs[-1][1] * superblock.inode_size,
+            )
+            for start, end in used_runs:
+                for index in range(start, end):
+                    inode = first_inode + index
+                    if inode == ROOT_INODE or inode >= _FIRST_REGULAR_INODE:
+                        _add_inode_runs(
+                            runs,
+                            source_path,
+                            superblock,
+                            inode,
+                            table[
+                                index * superblock.inode_size : (index + 1)
+                                * superblock.inode_size
+                            ],
+                        )
+    except BlockExtractionError as error:
+        log.warning(f"ext4_owners - Cannot read inode tables of {source_path}: {error}")
+        return None
+    owner_map = Ext4OwnerMap(source_path, superblock.block_size, _sort_runs(runs))
+    log.info(
+        f"ext4_owners - {owner_map.owned_bytes} bytes of {source_path} belong to "
+        f"live files, in {len(owner_map)} runs"
+    )
+    return owner_map
+
+
+def iter_directory_entries(block: bytes) -> Iterator[Tuple[int, str]]:
+    """Inode and name of the entries of one directory block."""
+    offset = 0
+    while offset + _DIRECTORY_ENTRY_HEADER_SIZE <= len(block):
+        inode, record_length, name_length = struct.unpack_from("<IHB", block, offset)
+        if (
+            record_length < _DIRECTORY_ENTRY_HEADER_SIZE
+            or offset + record_length > len(block)
+        ):
+            return
+        name_start = offset + _DIRECTORY_ENTRY_HEADER_SIZE
+        if inode and name_length and name_start + name_length <= offset + record_length:
+            yield inode, block[name_start : name_start + name_length].decode(
+                "utf-8", "replace"
+            )
+        offset += record_length
+
+
+def _add_inode_runs(
+    runs: List[_OwnedRun],
+    source_path: str,
+    superblock: Ext4Superblock,
+    inode: int,
+    record: bytes,
+) -> None:
+    (mode,) = struct.unpack_from("<H", record, 0x00)
+    size_lo, _, _, _, dtime = struct.unpack_from("<IIIII", record, 0x04)
+    (links_count,) = struct.unpack_from("<H", record, 0x1A)
+    (flags,) = struct.unpack_from("<I", record, 0x20)
+    (file_acl_lo,) = struct.unpack_from("<I", record, 0x68)
+    (file_acl_hi,) = struct.unpack_from("<H", record, 0x76)
+    file_type = mode & _S_IFMT
+    if dtime or not links_count or file_type not in (_S_IFREG, _S_IFDIR, _S_IFLNK):
+        return
+    kind = _KIND_DIRECTORY if file_type == _S_IFDIR else _KIND_DATA
+    block_runs: List[Tuple[int, int, int]] = []
+    i_block = record[_I_BLOCK_OFFSET : _I_BLOCK_OFFSET + _I_BLOCK_SIZE]
+    if flags & _INLINE_DATA_FL:
+        # Small files and directories stored inside the inode own no block.
+        pass
+    elif flags & _EXTENTS_FL:
+        block_runs.extend(
+            _iter_extent_runs(source_path, superblock.block_size, i_block, kind, None)
+        )
+    elif not (file_type == _S_IFLNK and size_lo < _I_BLOCK_SIZE):
+        # Short symbolic links store their target in place of block numbers.
+        block_runs.extend(
+            _iter_block_map_runs(source_path, superblock.block_size, i_block, kind)
+        )
+    file_acl = file_acl_lo | (file_acl_hi << 32)
+    if file_acl:
+        block_runs.append((file_acl, 1, _KIND_METADATA))
+
+    for start, length, run_kind in block_runs:
+        end = start + length
+        if not 0 < start < end <= superblock.blocks_count:
+            continue
+        last = runs[-1] if runs else None
+        if last is not None and (last[1], last[2], last[3]) == (start, inode, run_kind):
+            runs[-1] = (last[0], end, inode, run_kind)
+        else:
+            runs.append((start, end, inode, run_kind))
+
+
+def _iter_extent_runs(
+    source_path: str,
+    block_size: int,
+    node: bytes,
+    kind: int,
+    expected_depth: Optional[int],
+) -> Iterator[Tuple[int, int, int]]:
+    """First block, length and kind of the blocks reached from an extent tree
+    node."""
+    if len(node) < _EXTENT_HEADER_SIZE:
+        return
+    magic, entry_count, _, depth = struct.unpack_from("<HHHH", node, 0)
+    if (
+        magic != _EXTENT_MAGIC
+        or depth > _MAX_EXTENT_DEPTH
+        or (expected_depth is not None and depth != expected_depth)
+    ):
+        return
+    for entry in range(entry_count):
+        offset = _EXTENT_HEADER_SIZE + entry * _EXTENT_ENTRY_SIZE
+        if offset + _EXTENT_ENTRY_SIZE > len(node):
+            return
+        if depth == 0:
+            _, length, start_hi, start_lo = struct.unpack_from("<IHHI", node, offset)
+            if length <= _MAX_INIT_EXTENT_LEN:
+                yield start_lo | (start_hi << 32), length, kind
+            continue
+        _, child_lo, child_hi = struct.unpack_from("<IIH", node, offset)
+        child = child_lo | (child_hi << 32)
+        yield child, 1, _KIND_METADATA
+        yield from _iter_extent_runs(
+            source_path,
+            block_size,
+            read_range(source_path, child * block_size, block_size),
+            kind,
+            depth - 1,
+        )
+
+
+def _iter_block_map_runs(
+    source_path: str, block_size: int, i_block: bytes, kind: int
+) -> Iterator[Tuple[int, int, int]]:
+    """Blocks of an ext2/3 block map: direct blocks, then single, double and
+    triple indirect ones."""
+    pointers = struct.unpack_from(f"<{_I_BLOCK_SIZE // 4}I", i_block)
+    for block in pointers[:_DIRECT_BLOCKS]:
+        if block:
+            yield block, 1, kind
+    for level, block in enumerate(pointers[_DIRECT_BLOCKS:], start=1):
+        yield from _iter_indirect_runs(source_path, block_size, block, level, kind)
+
+
+def _iter_indirect_runs(
+    source_path: str, block_size: int, block: int, level: int, kind: int
+) -> Iterator[Tuple[int, int, int]]:
+    if not block:
+        return
+    yield block, 1, _KIND_METADATA
+    data = read_range(source_path, block * block_size, block_size)
+    for pointer in struct.unpack(f"<{block_size // 4}I", data):
+        if level == 1:
+            if pointer:
+                yield pointer, 1, kind
+        else:
+            yield from _iter_indirect_runs(
+                source_path, block_size, pointer, level - 1, kind
+            )
+
+
+def _sort_runs(runs: List[_OwnedRun]) -> List[_OwnedRun]:
+    """Runs in block order, without overlaps: a block shared by several
+    inodes, such as an extended attribute block, keeps its first owner."""
+    sorted_runs: List[_OwnedRun] = []
+    for start, end, inode, kind in sorted(runs):
+        if sorted_runs:
+            last_start, last_end, last_inode, last_kind = sorted_runs[-1]
+            if end <= last_end:
+                continue
+            if start < last_end:
+                start = last_end
+            elif start == last_end and (inode, kind) == (last_inode, last_kind):
+                sorted_runs[-1] = (last_start, end, inode, kind)
+                continue
+        sorted_runs.append((start, end, inode, kind))
+    return sorted_runs
@@ -0,0 +1,141 @@
+"""
+FAT32 on-disk structures: boot sector and file allocation table.
+
+Free clusters are found without decoding each FAT entry: runs of zero bytes
+are located with a regular expression and the 4-byte entries they fully cover
+are free. Entries whose reserved high bits are set on a free cluster are
+taken as allocated.
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+from dataclasses import dataclass
+from typing import List, Optional
+
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     read_range)
+from recoverpy.log.logger import log
+from recoverpy.models.scan_range import ByteRange
+
+_BOOT_SECTOR_SIZE = 512
+_BOOT_SIGNATURE = b"\x55\xaa"
+_FAT_ENTRY_SIZE = 4
+_FIRST_CLUSTER = 2
+_FAT_READ_SIZE = 1024 * 1024
+_ZERO_RUN = re.compile(b"\0{4,}")
+_SECTOR_SIZES = (512, 1024, 2048, 4096)
+
+
+@dataclass(frozen=True)
+class Fat32BootSector:
+    bytes_per_sector: int
+    sectors_per_cluster: int
+    reserved_sectors: int
+    fat_count: int
+    fat_sectors: int
+    total_sectors: int
+
+    @property
+    def cluster_size(self) -> int:
+        return self.bytes_per_sector * self.sectors_per_cluster
+
+    @property
+    def data_offset(self) -> int:
+        """Offset of cluster 2, the first data cluster."""
+        return (
+            self.reserved_sectors + self.fat_count * self.fat_sectors
+        ) * self.bytes_per_sector
+
+    @property
+    def cluster_count(self) -> int:
+        data_sectors = self.total_sectors - self.data_offset // self.bytes_per_sector
+        return max(0, data_sectors // self.sectors_per_cluster)
+
+
+def read_fat32_boot_sector(source_path: str) -> Optional[Fat32BootSector]:
+    """The boot sector of the FAT32 filesystem of `source_path`, None if it
+    holds none."""
+    try:
+        data = read_range(source_path, 0, _BOOT_SECTOR_SIZE)
+    except BlockExtractionError:
+        return None
+    if data[510:512] != _BOOT_SIGNATURE:
+        return None
+    bytes_per_sector, sectors_per_cluster, reserved_sectors, fat_count = (
+        struct.unpack_from("<HBHB", data, 0x0B)
+    )
+    (root_entries,) = struct.unpack_from("<H", data, 0x11)
+    (fat_sectors_16,) = struct.unpack_from("<H", data, 0x16)
+    total_sectors, fat_sectors = struct.unpack_from("<II", data, 0x20)
+    if (
+        bytes_per_sector not in _SECTOR_SIZES
+        or sectors_per_cluster == 0
+        or sectors_per_cluster & (sectors_per_cluster - 1)
+        or not reserved_sectors
+        or not fat_count
+        # FAT12 and FAT16 have a fixed root directory and a 16-bit FAT size.
+        or root_entries
+        or fat_sectors_16
+        or not fat_sectors
+    ):
+        return None
+    return Fat32BootSector(
+        bytes_per_sector=bytes_per_sector,
+        sectors_per_cluster=sectors_per_cluster,
+        reserved_sectors=reserved_sectors,
+        fat_count=fat_count,
+        fat_sectors=fat_sectors,
+        total_sectors=total_sectors,
+    )
+
+
+def get_fat32_free_ranges(source_path: str) -> Optional[List[ByteRange]]:
+    """Byte ranges of the clusters marked free in the first FAT, None if
+    `source_path` holds no FAT32 filesystem."""
+    boot_sector = read_fat32_boot_sector(source_path)
+    if boot_sector is None:
+        return None
+    fat_offset = boot_sector.reserved_sectors * boot_sector.bytes_per_sector
+    fat_size = min(
+        boot_sector.fat_sectors * boot_sector.bytes_per_sector,
+        (_FIRST_CLUSTER + boot_sector.cluster_count) * _FAT_ENTRY_SIZE,
+    )
+    free_entries: List[ByteRange] = []
+    try:
+        for chunk_offset in range(0, fat_size, _FAT_READ_SIZE):
+            chunk = read_range(
+                source_path,
+                fat_offset + chunk_offset,
+                min(_FAT_READ_SIZE, fat_size - chunk_offset),
+            )
+            first_entry = chunk_offset // _FAT_ENTRY_SIZE
+            for match in _ZERO_RUN.finditer(chunk):
+                start = -(-match.start() // _FAT_ENTRY_SIZE)
+                end = match.end() // _FAT_ENTRY_SIZE
+                if start >= end:
+                    continue
+                start += first_entry
+                end += first_entry
+                if free_entries and free_entries[-1][1] == start:
+                    start = free_entries.pop()[0]
+                free_entries.append((start, end))
+    except BlockExtractionError as error:
+        log.warning(f"fat - Cannot read the FAT of {source_path}: {error}")
+        return None
+
+    ranges: List[ByteRange] = []
+    for start, end in free_entries:
+        # Entries 0 and 1 hold no cluster.
+        start = max(start, _FIRST_CLUSTER)
+        if start < end:
+            ranges.append(
+                (
+                    boot_sector.data_offset
+                    + (start - _FIRST_CLUSTER) * boot_sector.cluster_size,
+                    boot_sector.data_offset
+                    + (end - _FIRST_CLUSTER) * boot_sector.cluster_size,
+                )
+            )
+    return ranges
@@ -3,28 +3,173 @@ Streaming binary scanner for devices and disk images.
 
 This module performs chunked byte-pattern scanning without loading the full source
 in memory. It emits lightweight `ScanHit` records containing the absolute match
-offset and a bounded preview window around each match.
+offset and a bounded preview window around each match. Several literal patterns
+can be searched in a single pass; each hit records which pattern matched.
+Compiled bytes regexes are supported with a caller-declared maximum match length.
+
+Large sources can optionally be split into byte-range shards scanned by a
+process pool. Each shard owns the match offsets inside its range and reads a
+small overlap past its end, so hits are neither lost nor duplicated at shard
+edges. Shard results are merged back in offset order.
+
+Bytes are fed to the matchers as "windows" produced by a backend: the default
+read backend fills a small ring of reusable buffers with `preadv` from a
+read-ahead thread, while the mmap backend
+exposes slices of a read-only mapping of a regular file without copying.
+An I/O policy can keep full-device scans from flooding the page cache.
+Compressed disk images are decoded on the fly and scanned as one stream, and
+split images are read across their segments as one device.
 """
 
 from __future__ import annotations
 
+import errno
+import mmap
 import os
-from dataclasses import dataclass
-from threading import Event
-from time import sleep
-from typing import Iterator
+import stat
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, replace
+from multiprocessing import get_context
+from queue import Queue
+from threading import Event, Semaphore, Thread
+from time import monotonic, sleep
+from typing import (Callable, Deque, Generator, Iterator, List, NamedTuple,
+                    Optional, Sequence, Tuple, Union)
+
+from recoverpy.lib.search.chunk_tuner import ChunkSizeTuner
+from recoverpy.lib.search.pattern_matcher import (PatternMatcher, ScanPatterns,
+                                                  build_matcher)
+from recoverpy.lib.search.scan_error_map import ByteRange, ScanErrorMap
+from recoverpy.lib.search.scan_throttle import ScanThrottle
+from recoverpy.lib.storage.block_device_inventory import get_queue_hints
+from recoverpy.lib.storage.block_device_metadata import (
+    DeviceIOError, get_physical_block_size)
+from recoverpy.lib.storage.compressed_image import CompressedImage
+from recoverpy.lib.storage.virtual_source import (VIRTUAL_SOURCE_ERRORS,
+                                                  VirtualSource,
+                                                  VirtualSourceReader,
+                                                  open_virtual_source)
+from recoverpy.log.logger import log
 
 DEFAULT_SCAN_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_SCAN_WORKERS = 1
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+# Chunks the read-ahead thread may fill ahead of the search cursor; 0 reads
+# inline. Each extra buffer costs one chunk of memory.
+DEFAULT_READ_AHEAD_CHUNKS = 1
 DEFAULT_PREVIEW_BEFORE_BYTES = 256
 DEFAULT_PREVIEW_AFTER_BYTES = 256
 DEFAULT_MAX_PREVIEW_BYTES = 512
 PAUSE_POLL_INTERVAL_SECONDS = 0.25
+SCAN_BACKEND_READ = "read"
+SCAN_BACKEND_MMAP = "mmap"
+SCAN_BACKENDS = (SCAN_BACKEND_READ, SCAN_BACKEND_MMAP)
+# Page cache policies: keep the default kernel caching, drop already-scanned
+# pages behind the cursor, or bypass the cache entirely with O_DIRECT.
+IO_POLICY_CACHED = "cached"
+IO_POLICY_DROP_BEHIND = "drop-behind"
+IO_POLICY_DIRECT = "direct"
+IO_POLICIES = (IO_POLICY_CACHED, IO_POLICY_DROP_BEHIND, IO_POLICY_DIRECT)
+_SHARDS_IN_FLIGHT_PER_WORKER = 2
+# Longest run of back-to-back regex matches followed back before a sub-range.
+_MAX_LOOKBACK_BYTES = 1024 * 1024
+# Errors reported by failing media, as opposed to configuration problems.
+_MEDIA_ERRNOS = frozenset(
+    code
+    for code in (
+        errno.EIO,
+        getattr(errno, "ENODATA", None),
+        getattr(errno, "EILSEQ", None),
+        getattr(errno, "EBADMSG", None),
+    )
+    if code is not None
+)
 
 
 @dataclass(frozen=True)
 class ScanHit:
     match_offset: int
     preview: bytes
+    pattern_index: int = 0
+
+
+@dataclass(frozen=True)
+class _ScanConfig:
+    chunk_size: int
+    preview_before: int
+    preview_after: int
+    max_preview_len: int
+    backend: str
+    io_policy: str = IO_POLICY_CACHED
+    read_ahead: int = DEFAULT_READ_AHEAD_CHUNKS
+    tolerate_read_errors: bool = False
+
+    @property
+    def preview_window(self) -> int:
+        return min(self.max_preview_len, self.preview_before + self.preview_after)
+
+
+class _ScanWindow(NamedTuple):
+    # Matchers search `data`; previews are sliced from `view` over the same bytes.
+    data: Union[bytearray, mmap.mmap]
+    view: memoryview
+    # Absolute source offset of `data[0]`.
+    base_offset: int
+    # Absolute offsets of the bytes available for matching in this window.
+    start_offset: int
+    end_offset: int
+    # Previews may also use bytes up to here (the whole mapping for mmap).
+    available_end_offset: int
+    # No window follows this one.
+    is_final: bool
+    # `available_end_offset` is the end of the source.
+    is_eof: bool
+    # Bytes from here to `end_offset` are known to be zero and are not searched.
+    zero_from: int
+    # Bytes actually read from the source for this window.
+    read_bytes: int
+    # Index of the scanned range the window belongs to.
+    range_index: int = 0
+
+
+class _ChunkRead(NamedTuple):
+    slot: int
+    # Absolute source offset of the first byte of the chunk.
+    offset: int
+    length: int
+    is_final: bool
+    is_eof: bool
+    # The chunk is all zeros: a skipped hole (`read_bytes == 0`, only the
+    # first `resident_len` zero bytes are in the slot) or a zero-filled read.
+    is_zero: bool
+    read_bytes: int
+    # Bytes of the chunk present in the slot.
+    resident_len: int
+    range_index: int = 0
+
+
+class StreamChunk(NamedTuple):
+    """Bytes read from a source by a caller of `iter_stream_hits`."""
+
+    offset: int
+    data: bytes
+    # The source ends with this chunk.
+    is_eof: bool
+
+
+# Byte range to scan, end None meaning EOF.
+_ScanRange = Tuple[int, Optional[int]]
+# Hits of a shard and the unreadable ranges met while scanning it.
+_ShardResult = Tuple[List[ScanHit], List[ByteRange]]
+
+
+class _PendingHit(NamedTuple):
+    match_offset: int
+    pattern_index: int
+    preview_start: int
+    preview_end: int
 
 
 class ScanError(Exception):
@@ -32,10 +177,14 @@ class ScanError(Exception):
         super().__init__(message)
         self.user_message = user_message
 
+    def __reduce__(self):  # type: ignore[no-untyped-def]
+        # Shard workers raise ScanError in child processes; keep it picklable.
+        return (self.__class__, (self.args[0], self.user_message))
+
 
 def iter_scan_hits(
     source_path: str,
-    needle: bytes,
+    needle: ScanPatterns,
     *,
     chunk_size: int = DEFAULT_SCAN_CHUNK_SIZE,
     preview_before: int = DEFAULT_PREVIEW_BEFORE_BYTES,
@@ -43,25 +192,268 @@ def iter_scan_hits(
     max_preview_len: int = DEFAULT_MAX_PREVIEW_BYTES,
     stop_event: Event | None = None,
     pause_event: Event | None = None,
+    workers: int = DEFAULT_SCAN_WORKERS,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    max_match_len: int | None = None,
+    backend: str = SCAN_BACKEND_READ,
+    io_policy: str = IO_POLICY_CACHED,
+    read_ahead: int = DEFAULT_READ_AHEAD_CHUNKS,
+    throttle: ScanThrottle | None = None,
+    error_map: ScanErrorMap | None = None,
+    progress_callback: Callable[[int], None] | None = None,
+    start_offset: int = 0,
+    end_offset: int | None = None,
+    ranges: Sequence[ByteRange] | None = None,
+    auto_chunk_size: bool = False,
 ) -> Iterator[ScanHit]:
+    """
+    Scan `source_path` for `needle`: a literal, a sequence of literals searched
+    in one pass, or a compiled bytes regex. Regex scans require `max_match_len`,
+    the longest match the caller expects, which sizes the chunk overlap.
+
+    `backend="mmap"` maps regular files instead of reading them; other sources
+    silently use the read backend. `io_policy` limits page cache pollution:
+    "drop-behind" evicts scanned pages, "direct" reads with O_DIRECT. The read
+    backend reads up to `read_ahead` chunks ahead in an I/O thread. `throttle`
+    caps the scan bandwidth.
+
+    Passing an `error_map` makes the scan tolerate media errors: unreadable
+    sectors are recorded in the map, read as zeros and skipped ddrescue-style.
+
+    Holes of sparse files are skipped without reading them and all-zero chunks
+    are not searched; matches made only of NUL bytes inside them are not
+    reported. `progress_callback` receives the offset scanned through, skipped
+    bytes included: every hit starting below it has been yielded. Passing it
+    back as `start_offset` resumes the scan without losing or repeating hits.
+
+    Only matches starting in [start_offset, end_offset) are reported, end None
+    meaning EOF. They may extend past `end_offset` and their previews past
+    either bound. Hits are identical to the ones a full scan reports: a regex
+    match may start inside one a full scan finds before `start_offset`, so
+    regex scans search from far enough before it to be in step with a full
+    scan, dropping the hits found there. Only back-to-back matches running
+    over more than 1 MiB before `start_offset` can still shift the hits.
+
+    `ranges` narrows the scan to these [start, end) byte ranges of
+    [start_offset, end_offset), as if each one was scanned on its own, but
+    through one descriptor, buffer ring and worker pool. Progress offsets
+    count the bytes between ranges as scanned.
+
+    `auto_chunk_size` replaces `chunk_size` with a size derived from the queue
+    hints of the device, tuned online from measured reads by the sequential
+    read backend.
+
+    gzip, xz and bz2 compressed images are decoded while scanning, with the
+    read backend in a single worker; offsets are uncompressed offsets. Given
+    its first segment (`.001`), a split image is scanned as the concatenation
+    of its segments with the read backend.
+    """
+    matcher = build_matcher(needle, max_match_len)
+    chunk_tuner = None
+    if auto_chunk_size:
+        chunk_tuner = ChunkSizeTuner(source_path, get_queue_hints(source_path))
+        chunk_size = chunk_tuner.chunk_size
     _validate_scan_params(
-        needle=needle,
         chunk_size=chunk_size,
         preview_before=preview_before,
         preview_after=preview_after,
         max_preview_len=max_preview_len,
+        workers=workers,
+        shard_size=shard_size,
+        backend=backend,
+        io_policy=io_policy,
+        read_ahead=read_ahead,
+        start_offset=start_offset,
+        end_offset=end_offset,
+        ranges=ranges,
+    )
+    scan_ranges = _get_scan_ranges(start_offset, end_offset, ranges)
+    config = _ScanConfig(
+        chunk_size=chunk_size,
+        preview_before=preview_before,
+        preview_after=preview_after,
+        max_preview_len=max_preview_len,
+        backend=backend,
+        io_policy=io_policy,
+        read_ahead=read_ahead,
+        tolerate_read_errors=error_map is not None,
     )
 
+    virtual_source = open_virtual_source(source_path)
+    if virtual_source is not None:
+        if isinstance(virtual_source, CompressedImage):
+            log.info(
+                f"binary_scanner - {source_path} is {virtual_source.compression} "
+                "compressed, scanning the decoded stream in one worker"
+            )
+            # Every shard would decode the stream from its closest seek point.
+            workers = 1
+        else:
+            log.info(
+                f"binary_scanner - {source_path} is split into "
+                f"{virtual_source.segment_count} segments, scanning them as one device"
+            )
+        # Mappings, page cache advice, holes and sector retries all address the
+        # file at `source_path`, not the device it presents.
+        error_map = None
+        config = replace(
+            config,
+            backend=SCAN_BACKEND_READ,
+            io_policy=IO_POLICY_CACHED,
+            tolerate_read_errors=False,
+        )
+
+    if workers > 1:
+        yield from _iter_parallel_scan_hits(
+            source_path,
+            matcher,
+            config,
+            stop_event=stop_event,
+            pause_event=pause_event,
+            workers=workers,
+            shard_size=shard_size,
+            throttle=throttle,
+            error_map=error_map,
+            progress_callback=progress_callback,
+            ranges=scan_ranges,
+        )
+        return
+
+    if not scan_ranges:
+        return
+    fd = _open_scan_source(source_path)
+    try:
+        yield from _iter_range_hits(
+            fd=fd,
+            source_path=source_path,
+            matcher=matcher,
+            config=config,
+            ranges=scan_ranges,
+            stop_event=stop_event,
+            pause_event=pause_event,
+            throttle=throttle,
+            error_map=error_map,
+            progress_callback=progress_callback,
+            chunk_tuner=chunk_tuner,
+            virtual_source=virtual_source,
+        )
+    finally:
+        os.close(fd)
+
+
+def iter_stream_hits(
+    source_path: str,
+    needle: ScanPatterns,
+    chunks: Iterator[StreamChunk],
+    *,
+    start_offset: int,
+    end_offset: int | None,
+    preview_before: int = DEFAULT_PREVIEW_BEFORE_BYTES,
+    preview_after: int = DEFAULT_PREVIEW_AFTER_BYTES,
+    max_preview_len: int = DEFAULT_MAX_PREVIEW_BYTES,
+    stop_event: Event | None = None,
+    pause_event: Event | None = None,
+    max_match_len: int | None = None,
+    throttle: ScanThrottle | None = None,
+    progress_callback: Callable[[int], None] | None = None,
+) -> Iterator[ScanHit]:
+    """
+    Like `iter_scan_hits` over [start_offset, end_offset), with bytes read by
+    the caller: `chunks` are contiguous, the first one containing
+    `start_offset`. Chunks are consumed up to `end_offset` plus the overlap
+    needed by matches starting before it, or up to the end of the source.
+
+    `source_path` is only read for previews running past the chunks in memory
+    and, by regex scans, right before `start_offset`.
+    """
+    matcher = build_matcher(needle, max_match_len)
+    config = _ScanConfig(
+        chunk_size=DEFAULT_SCAN_CHUNK_SIZE,
+        preview_before=preview_before,
+        preview_after=preview_after,
+        max_preview_len=max_preview_len,
+        backend=SCAN_BACKEND_READ,
+    )
+    overlap = max(0, matcher.max_match_len - 1)
+    read_limit = None if end_offset is None else end_offset + overlap
+    windows = _iter_stream_windows(
+        chunks,
+        read_limit=read_limit,
+        tail_size=max(overlap, config.preview_before, config.preview_window),
+    )
+    virtual_source = open_virtual_source(source_path)
+    fd = _open_scan_source(source_path)
+    try:
+        yield from _iter_range_hits(
+            fd=fd,
+            source_path=source_path,
+            matcher=matcher,
+            config=config,
+            ranges=[(start_offset, end_offset)],
+            stop_event=stop_event,
+            pause_event=pause_event,
+            throttle=throttle,
+            progress_callback=progress_callback,
+            virtual_source=virtual_source,
+            windows=windows,
+        )
+    finally:
+        os.close(fd)
+
+
+def _iter_range_hits(
+    *,
+    fd: int,
+    source_path: str,
+    matcher: PatternMatcher,
+    config: _ScanConfig,
+    ranges: Sequence[_ScanRange],
+    stop_event: Event | None,
+    pause_event: Event | None,
+    throttle: ScanThrottle | None = None,
+    error_map: ScanErrorMap | None = None,
+    progress_callback: Callable[[int], None] | None = None,
+    chunk_tuner: ChunkSizeTuner | None = None,
+    virtual_source: VirtualSource | None = None,
+    windows: Generator[_ScanWindow, None, None] | None = None,
+) -> Iterator[ScanHit]:
+    """Yield hits whose match offset lies in one of `ranges`, sorted disjoint
+    [start, end) ranges, the last end only being None for EOF.
+
+    `windows` replaces the windows read from `fd` by the configured backend.
+    """
     # Keep enough trailing bytes from the previous chunk so matches crossing
     # chunk boundaries are still detected in the next iteration.
-    overlap = max(0, len(needle) - 1)
-    tail_size = max(overlap, preview_before)
-    preview_window = min(max_preview_len, preview_before + preview_after)
+    overlap = max(0, matcher.max_match_len - 1)
+    # The tail also holds a whole preview window, so hits whose preview runs
+    # past the end of the current buffer can be served after the next read.
+    tail_size = max(overlap, config.preview_before, config.preview_window)
+    # A match starting right before a range end may extend up to `overlap`
+    # bytes past it.
+    read_ranges = [
+        (start, None if end is None else end + overlap) for start, end in ranges
+    ]
 
-    fd = _open_scan_source(source_path)
+    if windows is None:
+        windows = _open_windows(
+            fd=fd,
+            source_path=source_path,
+            config=config,
+            read_ranges=read_ranges,
+            tail_size=tail_size,
+            error_map=error_map,
+            chunk_tuner=chunk_tuner,
+            virtual_source=virtual_source,
+        )
 
-    offset = 0
-    tail = b""
+    # Each window owns match starts in [scan_from, window end - overlap): a match
+    # starting later may not be complete yet and is left to the next window, so
+    # every match is reported exactly once.
+    scan_from = 0
+    range_index = -1
+    end: int | None = None
+    # Hits near the end of the previous window whose preview was incomplete.
+    deferred_hits: List[_PendingHit] = []
     try:
         while True:
             if _should_stop(stop_event):
@@ -71,51 +463,973 @@ def iter_scan_hits(
             if _should_stop(stop_event):
                 return
 
-            chunk = _read_chunk(fd=fd, source_path=source_path, chunk_size=chunk_size)
-            if not chunk:
+            window = next(windows, None)
+            if window is None:
                 return
 
-            buffer = tail + chunk
-            buffer_start_offset = offset - len(tail)
-            min_new_match_offset = max(0, offset - overlap)
-
-            for absolute_match_offset in _iter_match_offsets(
-                buffer=buffer,
-                needle=needle,
-                buffer_start_offset=buffer_start_offset,
-                min_new_match_offset=min_new_match_offset,
-            ):
-                preview = _read_preview(
+            if throttle is not None and window.read_bytes > 0:
+                throttle.consume(window.read_bytes, stop_event)
+                if _should_stop(stop_event):
+                    return
+
+            if deferred_hits:
+                yield from _resolve_hits(
                     fd=fd,
-                    match_offset=absolute_match_offset,
-                    before=preview_before,
-                    after=preview_after,
-                    max_len=preview_window,
+                    window=window,
+                    hits=deferred_hits,
+                    error_map=error_map,
+                    virtual_source=virtual_source,
                 )
-                yield ScanHit(match_offset=absolute_match_offset, preview=preview)
+                deferred_hits = []
+
+            if window.range_index != range_index:
+                range_index = window.range_index
+                start, end = ranges[range_index]
+                scan_from = _get_resume_offset(
+                    fd=fd,
+                    matcher=matcher,
+                    start=start,
+                    overlap=overlap,
+                    virtual_source=virtual_source,
+                )
+
+            own_end = window.end_offset if window.is_final else window.end_offset - overlap
+            if end is not None:
+                own_end = min(own_end, end)
+            # Skipped holes leave a gap between windows.
+            scan_from = max(scan_from, window.start_offset)
+            # Inside known-zero bytes only matches starting before them are
+            # searched; they may extend up to `overlap` bytes into the zeros.
+            search_until = min(own_end, window.zero_from)
+            search_end = min(window.end_offset, window.zero_from + overlap)
+
+            if own_end > scan_from:
+                resume_offset = own_end
+                for match_index, match_end, pattern_index in matcher.iter_matches(
+                    window.data,
+                    scan_from - window.base_offset,
+                    search_end - window.base_offset,
+                ):
+                    absolute_match_offset = window.base_offset + match_index
+                    if absolute_match_offset >= search_until:
+                        break
+                    if not matcher.overlapping:
+                        # Non-overlapping matchers resume after the previous match.
+                        resume_offset = max(
+                            resume_offset, window.base_offset + match_end
+                        )
+                    hit = _PendingHit(
+                        absolute_match_offset,
+                        pattern_index,
+                        *_get_preview_span(
+                            match_offset=absolute_match_offset,
+                            before=config.preview_before,
+                            after=config.preview_after,
+                            max_len=config.preview_window,
+                        ),
+                    )
+                    if deferred_hits or (
+                        hit.preview_end > window.available_end_offset
+                        and not window.is_final
+                        and not window.is_eof
+                    ):
+                        # Preview ends are monotonic in the match offset, so
+                        # once one hit is deferred every later one is too.
+                        deferred_hits.append(hit)
+                        continue
+                    yield from _resolve_hits(
+                        fd=fd,
+                        window=window,
+                        hits=[hit],
+                        error_map=error_map,
+                        virtual_source=virtual_source,
+                    )
+                scan_from = resume_offset
 
-            offset += len(chunk)
-            tail = buffer[-tail_size:] if tail_size > 0 else b""
+            if progress_callback is not None:
+                # Deferred hits are yielded with the next window.
+                progress_callback(
+                    deferred_hits[0].match_offset if deferred_hits else scan_from
+                )
+
+            if window.is_final:
+                return
+    finally:
+        windows.close()
+
+
+def _get_resume_offset(
+    *,
+    fd: int,
+    matcher: PatternMatcher,
+    start: int,
+    overlap: int,
+    virtual_source: VirtualSource | None = None,
+) -> int:
+    """Offset from which a full scan searches for matches starting at `start`
+    or after it: past the end of a match straddling `start`, or `start`.
+
+    Non-overlapping matchers resume after each match, so the bytes before
+    `start` are searched to find that match. A search started earlier is in
+    step with a full scan from the first resume point followed by `overlap`
+    bytes where no match starts: a straddling match would end inside them.
+    Back-to-back matches delay that point, so the lookback doubles until it
+    comes before `start`.
+    """
+    if matcher.overlapping or overlap == 0:
+        return start
+    lookback = min(start, overlap)
+    while lookback > 0:
+        search_from = start - lookback
+        try:
+            if virtual_source is not None:
+                data = virtual_source.pread(lookback + 2 * overlap, search_from)
+            else:
+                data = os.pread(fd, lookback + 2 * overlap, search_from)
+        except (OSError, *VIRTUAL_SOURCE_ERRORS):
+            # The scan itself reports or maps the unreadable bytes.
+            return start
+        # Searching from the start of the source is a full scan.
+        resume_offset = _find_resume_offset(
+            matcher, data, lookback, overlap, in_step=search_from == 0
+        )
+        if resume_offset is not None:
+            return search_from + resume_offset
+        if lookback >= _MAX_LOOKBACK_BYTES:
+            break
+        lookback = min(start, 2 * lookback, _MAX_LOOKBACK_BYTES)
+    return start
+
+
+def _find_resume_offset(
+    matcher: PatternMatcher, data: bytes, start: int, overlap: int, *, in_step: bool
+) -> Optional[int]:
+    """`_get_resume_offset` from `data[0]`, None if a full scan may not be in
+    step by `start`. `data` extends `2 * overlap` bytes past `start`."""
+    resume_offset = 0
+    for match_index, match_end, _ in matcher.iter_matches(data, 0, len(data)):
+        if resume_offset <= start and match_index - resume_offset >= overlap:
+            in_step = True
+        if match_index >= start:
+            break
+        resume_offset = match_end
+    else:
+        # No match starts within `overlap` bytes of the last resume point.
+        in_step = in_step or resume_offset <= start
+    return max(start, resume_offset) if in_step else None
+
+
+def _open_windows(
+    *,
+    fd: int,
+    source_path: str,
+    config: _ScanConfig,
+    read_ranges: List[_ScanRange],
+    tail_size: int,
+    error_map: ScanErrorMap | None = None,
+    chunk_tuner: ChunkSizeTuner | None = None,
+    virtual_source: VirtualSource | None = None,
+) -> Generator[_ScanWindow, None, None]:
+    if virtual_source is not None:
+        return _iter_read_windows(
+            fd=fd,
+            source_path=source_path,
+            read_ranges=read_ranges,
+            chunk_size=config.chunk_size,
+            tail_size=tail_size,
+            read_ahead=config.read_ahead,
+            chunk_tuner=chunk_tuner,
+            source_reader=_open_source_reader(virtual_source),
+        )
+
+    if config.io_policy == IO_POLICY_DIRECT:
+        direct_fd = _open_direct_source(source_path)
+        if direct_fd is not None:
+            return _iter_read_windows(
+                fd=direct_fd,
+                source_path=source_path,
+                read_ranges=read_ranges,
+                chunk_size=config.chunk_size,
+                tail_size=tail_size,
+                read_ahead=config.read_ahead,
+                alignment=_get_direct_io_alignment(source_path),
+                owns_fd=True,
+                error_map=error_map,
+                chunk_tuner=chunk_tuner,
+            )
+        log.warning(
+            f"binary_scanner - O_DIRECT unsupported for {source_path}, "
+            "dropping pages behind the cursor instead"
+        )
+        config = replace(config, io_policy=IO_POLICY_DROP_BEHIND)
+
+    drop_behind = config.io_policy == IO_POLICY_DROP_BEHIND
+    if drop_behind:
+        _fadvise(fd, 0, 0, "POSIX_FADV_SEQUENTIAL")
+
+    if config.backend == SCAN_BACKEND_MMAP and error_map is not None:
+        # A media error under a mapping is a SIGBUS, not a recoverable OSError.
+        log.info("binary_scanner - Read errors are tolerated, using read backend")
+    elif config.backend == SCAN_BACKEND_MMAP:
+        file_size = _get_mappable_size(fd)
+        if file_size > 0:
+            return _iter_mmap_windows(
+                fd=fd,
+                file_size=file_size,
+                read_ranges=read_ranges,
+                chunk_size=config.chunk_size,
+                drop_behind=drop_behind,
+            )
+        log.info(f"binary_scanner - {source_path} cannot be mapped, using read backend")
+
+    return _iter_read_windows(
+        fd=fd,
+        source_path=source_path,
+        read_ranges=read_ranges,
+        chunk_size=config.chunk_size,
+        tail_size=tail_size,
+        read_ahead=config.read_ahead,
+        drop_behind=drop_behind,
+        error_map=error_map,
+        chunk_tuner=chunk_tuner,
+    )
+
+
+def _iter_read_windows(
+    *,
+    fd: int,
+    source_path: str,
+    read_ranges: List[_ScanRange],
+    chunk_size: int,
+    tail_size: int,
+    read_ahead: int,
+    alignment: int = 1,
+    owns_fd: bool = False,
+    drop_behind: bool = False,
+    error_map: ScanErrorMap | None = None,
+    chunk_tuner: ChunkSizeTuner | None = None,
+    source_reader: VirtualSourceReader | None = None,
+) -> Generator[_ScanWindow, None, None]:
+    # Chunks are read in place into a fixed ring of `read_ahead + 1` slot
+    # buffers. Each slot reserves `head` bytes in front of its chunk for the
+    # bytes carried over from the previous chunk, so nothing is concatenated or
+    # re-sliced per chunk and only the small tail is ever copied.
+    #
+    # O_DIRECT reads need the buffer address, file offset and length aligned to
+    # the device sector size; anonymous mappings are page aligned, and `head`,
+    # the chunk size and read offsets are rounded to `alignment`.
+    #
+    # A tuned chunk size may change between reads, so slots are sized for the
+    # largest chunk the tuner may pick.
+    head = _align_up(tail_size, alignment)
+    chunk_size = _align_up(chunk_size, alignment)
+    capacity = chunk_size
+    if chunk_tuner is not None:
+        capacity = max(capacity, _align_up(chunk_tuner.max_chunk_size, alignment))
+    slots = [_allocate_slot(head + capacity, alignment) for _ in range(read_ahead + 1)]
+    views = [memoryview(slot) for slot in slots]
+    chunk_reads = _iter_chunk_reads(
+        fd=fd,
+        source_path=source_path,
+        views=views,
+        head=head,
+        chunk_size=chunk_size,
+        alignment=alignment,
+        read_ranges=read_ranges,
+        error_map=error_map,
+        sector_size=(
+            max(alignment, _get_sector_size(source_path)) if error_map is not None else 0
+        ),
+        chunk_tuner=chunk_tuner,
+        source_reader=source_reader,
+    )
+    if read_ahead > 0:
+        chunk_reads = _iter_read_ahead(chunk_reads, depth=len(slots))
+
+    tail_len = 0
+    range_index = 0
+    first_start = read_ranges[0][0]
+    dropped_until = first_start - first_start % alignment
+    try:
+        for chunk in chunk_reads:
+            if chunk.range_index != range_index:
+                # Ranges are read apart, nothing precedes their first chunk.
+                range_index = chunk.range_index
+                tail_len = 0
+            # Holes longer than a chunk only have their first chunk in memory.
+            resident_len = chunk.resident_len
+            yield _ScanWindow(
+                data=slots[chunk.slot],
+                view=views[chunk.slot],
+                base_offset=chunk.offset - head,
+                start_offset=chunk.offset - tail_len,
+                end_offset=chunk.offset + chunk.length,
+                available_end_offset=chunk.offset + resident_len,
+                is_final=chunk.is_final,
+                # At EOF a preview is naturally truncated, exactly like pread.
+                is_eof=chunk.is_eof,
+                zero_from=chunk.offset if chunk.is_zero else chunk.offset + chunk.length,
+                read_bytes=chunk.read_bytes,
+                range_index=chunk.range_index,
+            )
+            if chunk.is_final:
+                return
+
+            # Carry the end of this chunk over into the head of the next slot.
+            # The reader only writes past `head`, so this never races with a
+            # read already in flight for that slot. The tail of a hole is zeros,
+            # like any other part of it.
+            view = views[chunk.slot]
+            next_view = views[(chunk.slot + 1) % len(views)]
+            data_end = head + resident_len
+            new_tail_len = min(tail_size, tail_len + chunk.length)
+            next_view[head - new_tail_len : head] = view[data_end - new_tail_len : data_end]
+            tail_len = new_tail_len
+
+            if drop_behind:
+                # Everything before the carried-over tail has been searched.
+                # A zero length would advise the whole rest of the file.
+                drop_until = chunk.offset + chunk.length - tail_len
+                if drop_until > dropped_until:
+                    _fadvise(
+                        fd, dropped_until, drop_until - dropped_until, "POSIX_FADV_DONTNEED"
+                    )
+                    dropped_until = drop_until
+    finally:
+        # Stops the read-ahead thread before its buffers are released.
+        chunk_reads.close()
+        for view in views:
+            view.release()
+        for slot in slots:
+            if isinstance(slot, mmap.mmap):
+                slot.close()
+        if owns_fd:
+            os.close(fd)
+        if source_reader is not None:
+            source_reader.close()
+
+
+def _iter_stream_windows(
+    chunks: Iterator[StreamChunk], *, read_limit: int | None, tail_size: int
+) -> Generator[_ScanWindow, None, None]:
+    # Each window is the carried-over tail followed by the chunk; the tail is
+    # small, so the copy stays close to one chunk per window.
+    tail = b""
+    zero_chunk = b""
+    for chunk in chunks:
+        data = bytearray(tail)
+        data += chunk.data
+        chunk_end = chunk.offset + len(chunk.data)
+        is_final = chunk.is_eof or (read_limit is not None and chunk_end >= read_limit)
+        if len(zero_chunk) < len(chunk.data):
+            zero_chunk = bytes(len(chunk.data))
+        is_zero = len(chunk.data) > 0 and _is_zero(
+            memoryview(data), len(tail), len(chunk.data), zero_chunk
+        )
+        yield _ScanWindow(
+            data=data,
+            view=memoryview(data),
+            base_offset=chunk.offset - len(tail),
+            start_offset=chunk.offset - len(tail),
+            end_offset=chunk_end,
+            available_end_offset=chunk_end,
+            is_final=is_final,
+            is_eof=chunk.is_eof,
+            zero_from=chunk.offset if is_zero else chunk_end,
+            read_bytes=len(chunk.data),
+        )
+        if is_final:
+            return
+        tail = bytes(data[len(data) - min(tail_size, len(data)) :])
+
+
+def _iter_chunk_reads(
+    *,
+    fd: int,
+    source_path: str,
+    views: List[memoryview],
+    head: int,
+    chunk_size: int,
+    alignment: int,
+    read_ranges: List[_ScanRange],
+    error_map: ScanErrorMap | None = None,
+    sector_size: int = 0,
+    chunk_tuner: ChunkSizeTuner | None = None,
+    source_reader: VirtualSourceReader | None = None,
+) -> Generator[_ChunkRead, None, None]:
+    # Slots are filled in ring order; a slot is only read into again once the
+    # consumer has asked for the chunk after it.
+    slot = 0
+    smallest_chunk_size = chunk_size
+    if chunk_tuner is not None:
+        smallest_chunk_size = min(
+            chunk_size, _align_up(chunk_tuner.min_chunk_size, alignment)
+        )
+    zero_chunk = bytes(len(views[0]) - head)
+    zero_view = memoryview(zero_chunk)
+    # A hole is replaced by one chunk of zeros, which must cover the tail.
+    source_size = (
+        _get_hole_aware_size(fd)
+        if smallest_chunk_size >= head and source_reader is None
+        else None
+    )
+    last_range_index = len(read_ranges) - 1
+    for range_index, (start, read_limit) in enumerate(read_ranges):
+        offset = start - start % alignment
+        while True:
+            if chunk_tuner is not None:
+                chunk_size = _align_up(chunk_tuner.chunk_size, alignment)
+            hole_len = (
+                _get_hole_length(fd, offset, source_size, read_limit, alignment)
+                if source_size is not None
+                else 0
+            )
+            if source_size is not None and hole_len >= chunk_size:
+                views[slot][head : head + chunk_size] = zero_view[:chunk_size]
+                hole_end = offset + hole_len
+                range_end = source_size if read_limit is None else read_limit
+                is_eof = hole_end >= source_size
+                is_range_end = hole_end >= range_end
+                is_final = is_eof or (is_range_end and range_index == last_range_index)
+                yield _ChunkRead(
+                    slot,
+                    offset,
+                    hole_len,
+                    is_final,
+                    is_eof,
+                    is_zero=True,
+                    read_bytes=0,
+                    resident_len=chunk_size,
+                    range_index=range_index,
+                )
+                if is_final:
+                    return
+                slot = (slot + 1) % len(views)
+                if is_range_end:
+                    break
+                offset = hole_end
+                continue
+
+            remaining = chunk_size if read_limit is None else read_limit - offset
+            to_read = min(chunk_size, _align_up(max(0, remaining), alignment))
+            target = views[slot][head : head + to_read]
+            read_started_at = monotonic()
+            if to_read == 0:
+                read_len = 0
+            elif source_reader is not None:
+                read_len = _read_source_chunk_into(
+                    reader=source_reader,
+                    source_path=source_path,
+                    target=target,
+                    offset=offset,
+                )
+            elif error_map is not None:
+                read_len = _read_chunk_tolerant(
+                    fd=fd,
+                    source_path=source_path,
+                    target=target,
+                    offset=offset,
+                    sector_size=sector_size,
+                    error_map=error_map,
+                )
+            else:
+                read_len = _read_chunk_into(
+                    fd=fd, source_path=source_path, target=target, offset=offset
+                )
+            if chunk_tuner is not None:
+                chunk_tuner.record_read(read_len, monotonic() - read_started_at)
+            # A short read means the end of the source; with O_DIRECT the offset
+            # is no longer aligned afterwards, so no further read is attempted.
+            is_eof = read_len < to_read
+            is_range_end = read_len == 0 or (
+                read_limit is not None and offset + read_len >= read_limit
+            )
+            is_final = is_eof or (is_range_end and range_index == last_range_index)
+            yield _ChunkRead(
+                slot,
+                offset,
+                read_len,
+                is_final,
+                is_eof,
+                is_zero=read_len > 0 and _is_zero(views[slot], head, read_len, zero_chunk),
+                read_bytes=read_len,
+                resident_len=read_len,
+                range_index=range_index,
+            )
+            if is_final:
+                return
+            slot = (slot + 1) % len(views)
+            if is_range_end:
+                break
+            offset += read_len
+
+
+def _get_hole_aware_size(fd: int) -> Optional[int]:
+    """Size of a regular file on a file system reporting holes, else None."""
+    if not hasattr(os, "SEEK_DATA") or not stat.S_ISREG(os.fstat(fd).st_mode):
+        return None
+    try:
+        os.lseek(fd, 0, os.SEEK_DATA)
+    except OSError as error:
+        # ENXIO only means the file has no data at all.
+        if error.errno != errno.ENXIO:
+            return None
+    return os.fstat(fd).st_size
+
+
+def _get_hole_length(
+    fd: int, offset: int, source_size: int, read_limit: int | None, alignment: int
+) -> int:
+    try:
+        data_offset = os.lseek(fd, offset, os.SEEK_DATA)
+    except OSError as error:
+        if error.errno != errno.ENXIO:
+            return 0
+        # No data left: the rest of the file is a hole.
+        data_offset = source_size
+    hole_end = data_offset if read_limit is None else min(data_offset, read_limit)
+    hole_len = max(0, hole_end - offset)
+    return hole_len - hole_len % alignment
+
+
+def _is_zero(view: memoryview, start: int, length: int, zero_chunk: bytes) -> bool:
+    # Cheap rejection first: real data almost never starts and ends with NUL.
+    if view[start] or view[start + length - 1]:
+        return False
+    # A memoryview comparison is element-wise; `startswith` is one memcmp.
+    data = view.obj
+    if isinstance(data, bytearray):
+        return data.startswith(memoryview(zero_chunk)[:length], start)
+    return view[start : start + length].tobytes() == zero_chunk[:length]
+
+
+def _iter_read_ahead(
+    chunk_reads: Generator[_ChunkRead, None, None], *, depth: int
+) -> Generator[_ChunkRead, None, None]:
+    """Run `chunk_reads` in an I/O thread, at most `depth` chunks ahead.
+
+    `os.preadv` releases the GIL, so the device keeps reading while the caller
+    searches. A slot is handed back to the reader when the caller asks for the
+    next chunk, which keeps memory use bounded by the slot ring.
+    """
+    free_slots = Semaphore(depth)
+    results: "Queue[Union[_ChunkRead, BaseException]]" = Queue()
+    closing = Event()
+
+    def read_chunks() -> None:
+        try:
+            while True:
+                free_slots.acquire()
+                if closing.is_set():
+                    return
+                chunk = next(chunk_reads)
+                results.put(chunk)
+                if chunk.is_final:
+                    return
+        except BaseException as error:  # re-raised by the consumer
+            results.put(error)
+
+    reader = Thread(target=read_chunks, name="scan-read-ahead", daemon=True)
+    reader.start()
+    try:
+        while True:
+            result = results.get()
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+            if result.is_final:
+                return
+            free_slots.release()
+    finally:
+        closing.set()
+        free_slots.release()
+        reader.join()
+        chunk_reads.close()
+
+
+def _allocate_slot(size: int, alignment: int) -> Union[bytearray, mmap.mmap]:
+    return bytearray(size) if alignment == 1 else mmap.mmap(-1, size)
+
+
+def _iter_mmap_windows(
+    *,
+    fd: int,
+    file_size: int,
+    read_ranges: List[_ScanRange],
+    chunk_size: int,
+    drop_behind: bool = False,
+) -> Generator[_ScanWindow, None, None]:
+    mapping = mmap.mmap(fd, file_size, access=mmap.ACCESS_READ)
+    _advise_mapping(mapping)
+    view = memoryview(mapping)
+    first_start = read_ranges[0][0]
+    dropped_until = first_start - first_start % mmap.PAGESIZE
+    last_range_index = len(read_ranges) - 1
+    try:
+        # Windows only bound how much is searched between stop/pause checks;
+        # the whole mapping stays addressable, so no tail is ever copied and
+        # previews never need a fallback read.
+        for range_index, (start, read_limit) in enumerate(read_ranges):
+            limit = file_size if read_limit is None else min(read_limit, file_size)
+            window_start = min(start, limit)
+            while True:
+                window_end = min(window_start + chunk_size, limit)
+                is_final = window_end >= file_size or (
+                    window_end >= limit and range_index == last_range_index
+                )
+                yield _ScanWindow(
+                    data=mapping,
+                    view=view,
+                    base_offset=0,
+                    start_offset=0,
+                    end_offset=window_end,
+                    available_end_offset=file_size,
+                    is_final=is_final,
+                    is_eof=True,
+                    zero_from=window_end,
+                    read_bytes=window_end - window_start,
+                    range_index=range_index,
+                )
+                if is_final:
+                    return
+                window_start = window_end
+
+                if drop_behind:
+                    # Keep one chunk behind the cursor mapped for overlap and
+                    # previews; pages dropped too early would simply fault back in.
+                    drop_until = max(0, window_start - chunk_size)
+                    drop_until -= drop_until % mmap.PAGESIZE
+                    if drop_until > dropped_until:
+                        _drop_mapped_range(fd, mapping, dropped_until, drop_until)
+                        dropped_until = drop_until
+                if window_end >= limit:
+                    break
+    finally:
+        view.release()
+        mapping.close()
+
+
+def _get_mappable_size(fd: int) -> int:
+    file_stat = os.fstat(fd)
+    if not stat.S_ISREG(file_stat.st_mode):
+        return 0
+    return file_stat.st_size
+
+
+def _advise_mapping(mapping: mmap.mmap) -> None:
+    for advice_name in ("MADV_SEQUENTIAL", "MADV_HUGEPAGE"):
+        advice = getattr(mmap, advice_name, None)
+        if advice is None:
+            continue
+        try:
+            mapping.madvise(advice)
+        except OSError:
+            # Advice is best effort; e.g. huge pages may be unsupported for
+            # file mappings on this kernel.
+            continue
+
+
+def _drop_mapped_range(fd: int, mapping: mmap.mmap, start: int, end: int) -> None:
+    advice = getattr(mmap, "MADV_DONTNEED", None)
+    if advice is not None:
+        try:
+            mapping.madvise(advice, start, end - start)
+        except OSError:
+            return
+    # Pages are only evicted from the page cache once nothing maps them.
+    _fadvise(fd, start, end - start, "POSIX_FADV_DONTNEED")
+
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str) -> None:
+    advice = getattr(os, advice_name, None)
+    if advice is None or length < 0:
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        # Advice is best effort and unsupported on some file systems.
+        return
+
+
+def _open_direct_source(source_path: str) -> Optional[int]:
+    direct_flag = getattr(os, "O_DIRECT", None)
+    if direct_flag is None:
+        return None
+    try:
+        return os.open(source_path, os.O_RDONLY | direct_flag)
+    except OSError as error:
+        if error.errno == errno.EINVAL:
+            return None
+        raise ScanError(
+            f"Cannot open scan source {source_path}: {error}",
+            f"Cannot open {source_path}.",
+        ) from error
+
+
+def _get_direct_io_alignment(source_path: str) -> int:
+    try:
+        sector_size = get_physical_block_size(source_path)
+    except DeviceIOError:
+        sector_size = mmap.PAGESIZE
+    # Sector sizes and the page size are powers of two, so the larger one is a
+    # multiple of the other and satisfies both buffer and offset alignment.
+    return max(sector_size, mmap.PAGESIZE)
+
+
+def _align_up(value: int, alignment: int) -> int:
+    return -(-value // alignment) * alignment
+
+
+def _resolve_hits(
+    *,
+    fd: int,
+    window: _ScanWindow,
+    hits: List[_PendingHit],
+    error_map: ScanErrorMap | None = None,
+    virtual_source: VirtualSource | None = None,
+) -> Iterator[ScanHit]:
+    """Slice previews from the resident window, falling back to one batched
+    pread for the hits whose preview is not fully in memory."""
+    in_memory = [
+        hit.preview_start >= window.start_offset
+        and (hit.preview_end <= window.available_end_offset or window.is_eof)
+        for hit in hits
+    ]
+
+    fallback_data = b""
+    fallback_start = 0
+    if not all(in_memory):
+        fallback = [hit for hit, resident in zip(hits, in_memory) if not resident]
+        fallback_start = min(hit.preview_start for hit in fallback)
+        fallback_end = max(hit.preview_end for hit in fallback)
+        try:
+            if virtual_source is not None:
+                fallback_data = virtual_source.pread(
+                    fallback_end - fallback_start, fallback_start
+                )
+            else:
+                fallback_data = os.pread(fd, fallback_end - fallback_start, fallback_start)
+        except VIRTUAL_SOURCE_ERRORS as error:
+            raise ScanError(str(error), error.user_message) from error
+        except OSError as error:
+            if error_map is None or error.errno not in _MEDIA_ERRNOS:
+                raise
+            # The scanned bytes were readable; only the preview margin is not.
+            log.warning(f"binary_scanner - Preview read failed at {fallback_start}: {error}")
+    for hit, resident in zip(hits, in_memory):
+        if resident:
+            preview_end = min(hit.preview_end, window.available_end_offset)
+            preview = bytes(
+                window.view[
+                    hit.preview_start - window.base_offset : preview_end
+                    - window.base_offset
+                ]
+            )
+        else:
+            preview = fallback_data[
+                hit.preview_start - fallback_start : hit.preview_end - fallback_start
+            ]
+        yield ScanHit(
+            match_offset=hit.match_offset,
+            preview=preview,
+            pattern_index=hit.pattern_index,
+        )
+
+
+def _iter_parallel_scan_hits(
+    source_path: str,
+    matcher: PatternMatcher,
+    config: _ScanConfig,
+    *,
+    stop_event: Event | None,
+    pause_event: Event | None,
+    workers: int,
+    shard_size: int,
+    throttle: ScanThrottle | None = None,
+    error_map: ScanErrorMap | None = None,
+    progress_callback: Callable[[int], None] | None = None,
+    ranges: List[_ScanRange],
+) -> Iterator[ScanHit]:
+    shards = _iter_shards(ranges, _get_source_size(source_path), shard_size)
+    # Spawned workers avoid forking a process that already runs UI threads.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    # Shards are submitted in offset order and consumed from the head of the
+    # deque, so the merged stream stays ordered. Bounding in-flight shards keeps
+    # buffered results (and memory) proportional to the worker count.
+    pending: Deque[Future[_ShardResult]] = deque()
+    max_in_flight = workers * _SHARDS_IN_FLIGHT_PER_WORKER
+    shard_ends: Deque[int] = deque()
+
+    try:
+        while True:
+            while len(pending) < max_in_flight:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                shard_ends.append(shard[-1][1])
+                if throttle is not None:
+                    # Shards are paced as they are handed out, which bounds the
+                    # average bandwidth of all workers together.
+                    throttle.consume(_get_shard_bytes(shard), stop_event)
+                    if _should_stop(stop_event):
+                        return
+                pending.append(
+                    executor.submit(
+                        _scan_shard,
+                        source_path,
+                        matcher,
+                        config,
+                        shard,
+                    )
+                )
+
+            if not pending:
+                return
+
+            shard_result = _wait_for_shard(pending[0], stop_event)
+            if shard_result is None:
+                return
+            pending.popleft()
+            shard_hits, bad_ranges = shard_result
+            if error_map is not None:
+                for bad_start, bad_end in bad_ranges:
+                    error_map.add(bad_start, bad_end)
+
+            _wait_if_paused(stop_event=stop_event, pause_event=pause_event)
+            for hit in shard_hits:
+                if _should_stop(stop_event):
+                    return
+                yield hit
+            if progress_callback is not None:
+                progress_callback(shard_ends.popleft())
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_shards(
+    ranges: List[_ScanRange], source_size: int, shard_size: int
+) -> Iterator[List[ByteRange]]:
+    """`ranges` cut into shards of `shard_size` scanned bytes. Small ranges
+    share shards, so a fragmented range list does not cost a task per range."""
+    shard: List[ByteRange] = []
+    shard_bytes = 0
+    for start, end in ranges:
+        scan_end = source_size if end is None else min(end, source_size)
+        while start < scan_end:
+            piece_end = min(scan_end, start + shard_size - shard_bytes)
+            shard.append((start, piece_end))
+            shard_bytes += piece_end - start
+            start = piece_end
+            if shard_bytes >= shard_size:
+                yield shard
+                shard, shard_bytes = [], 0
+    if shard:
+        yield shard
+
+
+def _get_shard_bytes(shard: List[ByteRange]) -> int:
+    return sum(end - start for start, end in shard)
+
+
+def _scan_shard(
+    source_path: str,
+    matcher: PatternMatcher,
+    config: _ScanConfig,
+    ranges: List[ByteRange],
+) -> _ShardResult:
+    # Error maps hold a lock and cannot cross processes; each shard collects its
+    # own and the parent merges the ranges.
+    error_map = ScanErrorMap() if config.tolerate_read_errors else None
+    fd = _open_scan_source(source_path)
+    try:
+        hits = list(
+            _iter_range_hits(
+                fd=fd,
+                source_path=source_path,
+                matcher=matcher,
+                config=config,
+                ranges=ranges,
+                stop_event=None,
+                pause_event=None,
+                error_map=error_map,
+                virtual_source=open_virtual_source(source_path),
+            )
+        )
+        return hits, error_map.get_ranges() if error_map is not None else []
     finally:
         os.close(fd)
 
 
+def _wait_for_shard(
+    future: Future[_ShardResult], stop_event: Event | None
+) -> Optional[_ShardResult]:
+    while not _should_stop(stop_event):
+        try:
+            return future.result(timeout=PAUSE_POLL_INTERVAL_SECONDS)
+        except FutureTimeoutError:
+            continue
+    return None
+
+
 def _validate_scan_params(
     *,
-    needle: bytes,
     chunk_size: int,
     preview_before: int,
     preview_after: int,
     max_preview_len: int,
+    workers: int,
+    shard_size: int,
+    backend: str,
+    io_policy: str,
+    read_ahead: int,
+    start_offset: int,
+    end_offset: int | None,
+    ranges: Sequence[ByteRange] | None,
 ) -> None:
-    if not needle:
-        raise ValueError("needle must not be empty")
     if chunk_size <= 0:
         raise ValueError("chunk_size must be > 0")
     if preview_before < 0 or preview_after < 0:
         raise ValueError("preview sizes must be >= 0")
     if max_preview_len <= 0:
         raise ValueError("max_preview_len must be > 0")
+    if workers <= 0:
+        raise ValueError("workers must be > 0")
+    if shard_size <= 0:
+        raise ValueError("shard_size must be > 0")
+    if backend not in SCAN_BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(SCAN_BACKENDS)}")
+    if io_policy not in IO_POLICIES:
+        raise ValueError(f"io_policy must be one of {', '.join(IO_POLICIES)}")
+    if read_ahead < 0:
+        raise ValueError("read_ahead must be >= 0")
+    if start_offset < 0:
+        raise ValueError("start_offset must be >= 0")
+    if end_offset is not None and end_offset < start_offset:
+        raise ValueError("end_offset must be >= start_offset")
+    if ranges is not None and any(start < 0 or end < start for start, end in ranges):
+        raise ValueError("ranges must be (start, end) pairs with 0 <= start <= end")
+
+
+def _get_scan_ranges(
+    start_offset: int, end_offset: int | None, ranges: Sequence[ByteRange] | None
+) -> List[_ScanRange]:
+    """`ranges` clipped to [start_offset, end_offset), sorted and merged."""
+    if ranges is None:
+        return [(start_offset, end_offset)]
+    merged: List[ByteRange] = []
+    for start, end in sorted(ranges):
+        start = max(start, start_offset)
+        if end_offset is not None:
+            end = min(end, end_offset)
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [(start, end) for start, end in merged]
 
 
 def _open_scan_source(source_path: str) -> int:
@@ -133,9 +1447,23 @@ def _open_scan_source(source_path: str) -> int:
         ) from error
 
 
-def _read_chunk(*, fd: int, source_path: str, chunk_size: int) -> bytes:
+def _get_source_size(source_path: str) -> int:
+    virtual_source = open_virtual_source(source_path)
+    if virtual_source is not None:
+        return virtual_source.estimate_size()
+    fd = _open_scan_source(source_path)
+    try:
+        # SEEK_END works for both regular files and block devices.
+        return os.lseek(fd, 0, os.SEEK_END)
+    finally:
+        os.close(fd)
+
+
+def _read_chunk_into(
+    *, fd: int, source_path: str, target: memoryview, offset: int
+) -> int:
     try:
-        return os.read(fd, chunk_size)
+        return os.preadv(fd, [target], offset)
     except PermissionError as error:
         raise ScanError(
             f"Permission denied while reading {source_path}: {error}",
@@ -148,6 +1476,86 @@ def _read_chunk(*, fd: int, source_path: str, chunk_size: int) -> bytes:
         ) from error
 
 
+def _open_source_reader(virtual_source: VirtualSource) -> VirtualSourceReader:
+    try:
+        return virtual_source.open_reader()
+    except VIRTUAL_SOURCE_ERRORS as error:
+        raise ScanError(str(error), error.user_message) from error
+
+
+def _read_source_chunk_into(
+    *, reader: VirtualSourceReader, source_path: str, target: memoryview, offset: int
+) -> int:
+    try:
+        return reader.readinto(target, offset)
+    except VIRTUAL_SOURCE_ERRORS as error:
+        raise ScanError(
+            f"Cannot read {source_path}: {error}", error.user_message
+        ) from error
+
+
+def _read_chunk_tolerant(
+    *,
+    fd: int,
+    source_path: str,
+    target: memoryview,
+    offset: int,
+    sector_size: int,
+    error_map: ScanErrorMap,
+) -> int:
+    try:
+        return _read_chunk_into(fd=fd, source_path=source_path, target=target, offset=offset)
+    except ScanError as error:
+        if not _is_media_error(error):
+            raise
+        log.warning(f"binary_scanner - {error}, retrying by sector")
+
+    # Like ddrescue, retry the chunk one sector at a time. Unreadable sectors
+    # are zero-filled and recorded; each consecutive failure doubles the skip
+    # so a large bad area costs a few reads rather than one per sector.
+    position = 0
+    skip = sector_size
+    while position < len(target):
+        # Retries stay sector aligned, which O_DIRECT requires.
+        sector_end = min(
+            len(target), position + sector_size - (offset + position) % sector_size
+        )
+        try:
+            read_len = _read_chunk_into(
+                fd=fd,
+                source_path=source_path,
+                target=target[position:sector_end],
+                offset=offset + position,
+            )
+        except ScanError as error:
+            if not _is_media_error(error):
+                raise
+            bad_end = min(len(target), position + skip)
+            target[position:bad_end] = bytes(bad_end - position)
+            error_map.add(offset + position, offset + bad_end)
+            position = bad_end
+            skip *= 2
+            continue
+
+        if read_len == 0:
+            break
+        position += read_len
+        skip = sector_size
+    return position
+
+
+def _is_media_error(error: ScanError) -> bool:
+    cause = error.__cause__
+    return isinstance(cause, OSError) and cause.errno in _MEDIA_ERRNOS
+
+
+def _get_sector_size(source_path: str) -> int:
+    try:
+        return get_physical_block_size(source_path)
+    except DeviceIOError:
+        return mmap.PAGESIZE
+
+
 def _should_stop(stop_event: Event | None) -> bool:
     return bool(stop_event and stop_event.is_set())
 
@@ -159,41 +1567,14 @@ def _wait_if_paused(*, stop_event: Event | None, pause_event: Event | None) -> N
         sleep(PAUSE_POLL_INTERVAL_SECONDS)
 
 
-def _iter_match_offsets(
-    *,
-    buffer: bytes,
-    needle: bytes,
-    buffer_start_offset: int,
-    min_new_match_offset: int,
-) -> Iterator[int]:
-    search_index = 0
-    while True:
-        match_index = buffer.find(needle, search_index)
-        if match_index < 0:
-            return
-
-        absolute_match_offset = buffer_start_offset + match_index
-        search_index = match_index + 1
-
-        # Skip offsets that belong to the previous chunk overlap;
-        # this prevents duplicate hits while preserving boundary matches.
-        if absolute_match_offset < min_new_match_offset:
-            continue
-
-        yield absolute_match_offset
-
-
-def _read_preview(
+def _get_preview_span(
     *,
-    fd: int,
     match_offset: int,
     before: int,
     after: int,
     max_len: int,
-) -> bytes:
+) -> Tuple[int, int]:
     preview_start = max(0, match_offset - before)
     preview_end = match_offset + after
     to_read = max(0, min(max_len, preview_end - preview_start))
-    if to_read <= 0:
-        return b""
-    return os.pread(fd, to_read, preview_start)
+    return preview_start, preview_start + to_read
@@ -0,0 +1,290 @@
+"""
+Persistent map of the content class of every block of a device.
+
+A one-time classification pass reads the device and records four statistics
+per `CLASS_BLOCK_SIZE` block, each quantized to one byte: the Shannon entropy
+of its bytes, the share of bytes found in text (printable ASCII, whitespace and
+bytes >= 0x80, which occur in UTF-8 text), the share of zero bytes, and the
+share of its 64-byte lines holding a zero byte, which tells NULs spread through
+binary structures from zero padding after text.
+
+Text-only searches then skip the blocks that cannot hold plain text: nearly
+random ones (compressed, encrypted or media data), those mostly made of control
+bytes, and those whose NULs are spread everywhere between few text bytes.
+Zero padding and UTF-16 text are kept. Matches starting in a skipped block are
+not reported.
+
+Maps are cached per device fingerprint and, like trigram indexes, are not used
+for mounted devices, whose blocks may have changed since the map was built.
+They need NumPy, installed with the `index` extra.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Event
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from recoverpy.lib.storage.block_device_inventory import is_mounted
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     open_sequential_reader)
+from recoverpy.lib.storage.device_cache import (CACHE_HEADER_SIZE,
+                                                DeviceCacheError,
+                                                decode_cache_header,
+                                                get_cache_path,
+                                                get_device_fingerprint,
+                                                get_flagged_ranges,
+                                                import_numpy, write_cache_file)
+from recoverpy.log.logger import log
+from recoverpy.models.scan_range import ByteRange
+
+CLASS_MAP_SUFFIX = ".classes"
+CLASS_BLOCK_SIZE = 4096
+# Columns of the map.
+STAT_ENTROPY = 0
+STAT_PRINTABLE_RATIO = 1
+STAT_ZERO_RATIO = 2
+STAT_NUL_DENSITY = 3
+_STAT_COUNT = 4
+# Entropy is stored in 1/32 bit steps, ratios in 1/255 steps.
+_ENTROPY_SCALE = 32
+_RATIO_SCALE = 255
+
+# Random 4 KiB blocks measure about 7.95 bits per byte; text, including
+# UTF-8 encoded CJK text, stays well below.
+TEXT_MAX_ENTROPY = 7.5
+# Share of text bytes among the non-zero bytes of a text block.
+TEXT_MIN_PRINTABLE_RATIO = 0.75
+# Blocks whose lines nearly all hold a NUL need more text bytes to be kept.
+_SPREAD_NUL_DENSITY = 0.9
+_SPREAD_NUL_MIN_PRINTABLE_RATIO = 0.9
+
+_MAP_VERSION = 1
+_MAGIC = b"RPYCLASS"
+_READ_SIZE = 1024 * 1024
+_NUL_LINE_SIZE = 64
+# Blocks turned into ranges at once when reading a map.
+_SLICE_BLOCKS = 1 << 22
+_FEATURE = "Block classification"
+
+
+class BlockClassificationError(DeviceCacheError):
+    pass
+
+
+def build_block_class_map(
+    source_path: str,
+    *,
+    map_path: Optional[Path] = None,
+    progress_callback: Callable[[int], None] | None = None,
+    stop_event: Event | None = None,
+) -> Optional[Path]:
+    """Classify the blocks of `source_path` and return the map path, None if
+    stopped.
+
+    `progress_callback` receives the number of bytes classified so far.
+    """
+    import_numpy(_FEATURE)
+    fingerprint = get_device_fingerprint(source_path)
+    if map_path is None:
+        map_path = get_cache_path(fingerprint, CLASS_MAP_SUFFIX)
+
+    def write_map(map_file: BinaryIO) -> Optional[Dict[str, Any]]:
+        source_size = _write_stats(
+            source_path, map_file, progress_callback, stop_event
+        )
+        if source_size is None:
+            return None
+        return {
+            "version": _MAP_VERSION,
+            "fingerprint": fingerprint,
+            "source_path": source_path,
+            "source_size": source_size,
+            "block_size": CLASS_BLOCK_SIZE,
+        }
+
+    if not write_cache_file(map_path, _MAGIC, "block map", write_map):
+        return None
+    log.info(f"block_classification - Classified {source_path} blocks in {map_path}")
+    return map_path
+
+
+def get_text_ranges(
+    source_path: str, start_offset: int = 0, end_offset: Optional[int] = None
+) -> Optional[List[ByteRange]]:
+    """Ranges of [start_offset, end_offset) made of blocks that may hold text,
+    None when the device has no current block map."""
+    try:
+        import_numpy(_FEATURE)
+    except DeviceCacheError:
+        log.warning(
+            "block_classification - NumPy is not installed, scanning all blocks"
+        )
+        return None
+    if is_mounted(source_path):
+        log.warning(
+            f"block_classification - {source_path} is mounted, its block map may "
+            "be stale: scanning all blocks"
+        )
+        return None
+    try:
+        fingerprint = get_device_fingerprint(source_path)
+        class_map = BlockClassMap(get_cache_path(fingerprint, CLASS_MAP_SUFFIX))
+    except DeviceCacheError as error:
+        log.info(f"block_classification - No usable map for {source_path}: {error}")
+        return None
+    if class_map.fingerprint != fingerprint:
+        log.info(f"block_classification - Block map of {source_path} is stale")
+        return None
+
+    scan_end = class_map.source_size if end_offset is None else end_offset
+    ranges: List[ByteRange] = []
+    for first_block in range(0, class_map.block_count, _SLICE_BLOCKS):
+        slice_start = first_block * class_map.block_size
+        text_blocks = get_text_blocks(
+            class_map.stats[first_block : first_block + _SLICE_BLOCKS]
+        )
+        for start, end in get_flagged_ranges(
+            text_blocks,
+            class_map.block_size,
+            max(0, start_offset - slice_start),
+            scan_end - slice_start,
+        ):
+            if ranges and ranges[-1][1] == slice_start + start:
+                ranges[-1] = (ranges[-1][0], slice_start + end)
+            else:
+                ranges.append((slice_start + start, slice_start + end))
+    log.info(
+        f"block_classification - {sum(end - start for start, end in ranges)} of "
+        f"{max(0, scan_end - start_offset)} bytes of {source_path} may hold text"
+    )
+    return ranges
+
+
+class BlockClassMap:
+    def __init__(self, path: Path):
+        np = import_numpy(_FEATURE)
+        try:
+            with open(path, "rb") as map_file:
+                header = decode_cache_header(_MAGIC, map_file.read(CACHE_HEADER_SIZE))
+            if header.get("version") != _MAP_VERSION:
+                raise ValueError(f"unsupported version {header.get('version')}")
+            self.fingerprint: str = header["fingerprint"]
+            self.source_size: int = header["source_size"]
+            self.block_size: int = header["block_size"]
+            self.block_count = -(-self.source_size // self.block_size)
+            # One row of statistics per block, read from the file on demand.
+            self.stats: Any = (
+                np.memmap(
+                    path,
+                    dtype=np.uint8,
+                    mode="r",
+                    offset=CACHE_HEADER_SIZE,
+                    shape=(self.block_count, _STAT_COUNT),
+                )
+                if self.block_count
+                else np.zeros((0, _STAT_COUNT), dtype=np.uint8)
+            )
+        except OSError as error:
+            raise BlockClassificationError(
+                f"Cannot open block map {path}: {error}",
+                f"Cannot open block map file {path}.",
+            ) from error
+        except (ValueError, KeyError, TypeError) as error:
+            raise BlockClassificationError(
+                f"Invalid block map {path}: {error}",
+                f"Block map file {path} is damaged.",
+            ) from error
+
+
+def classify_blocks(data: bytes) -> Any:
+    """Statistics rows of the `CLASS_BLOCK_SIZE` blocks of `data`, the last
+    one possibly partial."""
+    np = import_numpy(_FEATURE)
+    padding = -len(data) % CLASS_BLOCK_SIZE
+    blocks = np.frombuffer(data + b"\0" * padding, dtype=np.uint8).reshape(
+        -1, CLASS_BLOCK_SIZE
+    )
+    block_count = blocks.shape[0]
+    # Byte histograms of all the blocks in one pass.
+    keys = blocks + (np.arange(block_count, dtype=np.intp)[:, None] << 8)
+    counts = np.bincount(keys.ravel(), minlength=block_count * 256).reshape(
+        block_count, 256
+    )
+    # Padding zeros are not part of the last block.
+    counts[-1, 0] -= padding
+    sizes = counts.sum(axis=1)
+    shares = counts / sizes[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(counts > 0, shares * np.log2(shares), 0.0).sum(axis=1)
+    printable = counts @ _get_text_bytes().astype(np.int64)
+    lines = blocks.reshape(block_count, -1, _NUL_LINE_SIZE)
+    nul_density = (lines == 0).any(axis=2).mean(axis=1)
+    if padding:
+        full_lines = -(-(CLASS_BLOCK_SIZE - padding) // _NUL_LINE_SIZE)
+        nul_density[-1] = (lines[-1, :full_lines] == 0).any(axis=1).mean()
+
+    stats = np.empty((block_count, _STAT_COUNT), dtype=np.uint8)
+    stats[:, STAT_ENTROPY] = np.minimum(np.rint(entropy * _ENTROPY_SCALE), 255)
+    stats[:, STAT_PRINTABLE_RATIO] = np.rint(printable / sizes * _RATIO_SCALE)
+    stats[:, STAT_ZERO_RATIO] = np.rint(counts[:, 0] / sizes * _RATIO_SCALE)
+    stats[:, STAT_NUL_DENSITY] = np.rint(nul_density * _RATIO_SCALE)
+    return stats
+
+
+def get_text_blocks(stats: Any) -> Any:
+    """Boolean array of the blocks that may hold text."""
+    np = import_numpy(_FEATURE)
+    entropy = stats[:, STAT_ENTROPY] / _ENTROPY_SCALE
+    non_zero = _RATIO_SCALE - stats[:, STAT_ZERO_RATIO].astype(np.int32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        printable = np.where(
+            non_zero > 0, stats[:, STAT_PRINTABLE_RATIO] / non_zero, 0.0
+        )
+    spread_nuls = stats[:, STAT_NUL_DENSITY] / _RATIO_SCALE >= _SPREAD_NUL_DENSITY
+    return (
+        (non_zero > 0)
+        & (entropy <= TEXT_MAX_ENTROPY)
+        & (printable >= TEXT_MIN_PRINTABLE_RATIO)
+        & (~spread_nuls | (printable >= _SPREAD_NUL_MIN_PRINTABLE_RATIO))
+    )
+
+
+def _write_stats(
+    source_path: str,
+    map_file: BinaryIO,
+    progress_callback: Callable[[int], None] | None,
+    stop_event: Event | None,
+) -> Optional[int]:
+    """Write the statistics of every block; the source size, None if stopped."""
+    try:
+        pread, close = open_sequential_reader(source_path)
+    except BlockExtractionError as error:
+        raise BlockClassificationError(str(error), error.user_message) from error
+    offset = 0
+    try:
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return None
+            data = pread(_READ_SIZE, offset)
+            if not data:
+                return offset
+            map_file.write(classify_blocks(data).tobytes())
+            offset += len(data)
+            if progress_callback is not None:
+                progress_callback(offset)
+            if len(data) % CLASS_BLOCK_SIZE:
+                return offset
+    except BlockExtractionError as error:
+        raise BlockClassificationError(str(error), error.user_message) from error
+    finally:
+        close()
+
+
+def _get_text_bytes() -> Any:
+    np = import_numpy(_FEATURE)
+    text_bytes = np.zeros(256, dtype=np.bool_)
+    text_bytes[0x20:0x7F] = True
+    text_bytes[0x80:] = True
+    text_bytes[[0x09, 0x0A, 0x0C, 0x0D]] = True
+    return text_bytes
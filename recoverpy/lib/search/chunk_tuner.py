@@ -0,0 +1,147 @@
+"""
+Online tuning of the scan chunk size.
+
+The starting size comes from the queue hints of the device: spinning disks
+stream best with large requests, and chunks are kept multiples of the optimal
+I/O size and at least as large as the kernel read-ahead. The size is then
+doubled while the measured throughput keeps improving, and halved whenever a
+single chunk takes long enough to make stop and pause requests sluggish.
+
+Every decision is logged with the device hints, so the winning size for a
+device class can be read from a debug log and pinned.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from recoverpy.lib.storage.block_device_inventory import BlockQueueHints
+from recoverpy.log.logger import log
+
+MIN_TUNED_CHUNK_SIZE = 1024 * 1024
+MAX_TUNED_CHUNK_SIZE = 32 * 1024 * 1024
+_SOLID_STATE_CHUNK_SIZE = 8 * 1024 * 1024
+_ROTATIONAL_CHUNK_SIZE = 16 * 1024 * 1024
+# Full chunks measured before each size decision.
+_SAMPLE_CHUNKS = 4
+# Throughput gain a larger size must bring to be kept.
+_MIN_THROUGHPUT_GAIN = 1.05
+# Slower chunks delay stop and pause requests noticeably.
+_MAX_CHUNK_LATENCY_SECONDS = 0.5
+
+
+class ChunkSizeTuner:
+    """Chunk size of a sequential scan, adjusted from measured reads.
+
+    Not thread-safe: reads are recorded by the thread that issues them.
+    """
+
+    def __init__(
+        self,
+        source_path: str,
+        hints: Optional[BlockQueueHints],
+        *,
+        min_chunk_size: int = MIN_TUNED_CHUNK_SIZE,
+        max_chunk_size: int = MAX_TUNED_CHUNK_SIZE,
+    ):
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self._source_path = source_path
+        self._hints = hints
+        self.chunk_size = self._get_initial_chunk_size()
+        self._is_settled = False
+        self._best_chunk_size = self.chunk_size
+        self._best_bytes_per_second = 0.0
+        self._sample_chunks = 0
+        self._sample_bytes = 0
+        self._sample_seconds = 0.0
+        self._log(f"starting with {_format_size(self.chunk_size)} chunks")
+
+    def record_read(self, byte_count: int, seconds: float) -> None:
+        """Account for one chunk read of `byte_count` bytes taking `seconds`."""
+        # Short reads at the end of the source or a range say nothing.
+        if byte_count < self.chunk_size:
+            return
+
+        if seconds > _MAX_CHUNK_LATENCY_SECONDS and self.chunk_size > self.min_chunk_size:
+            # Never grow back to a size that was too slow.
+            self.max_chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
+            self._best_chunk_size = min(self._best_chunk_size, self.max_chunk_size)
+            self._set_chunk_size(
+                self.max_chunk_size,
+                f"chunk took {seconds:.2f} s, over {_MAX_CHUNK_LATENCY_SECONDS} s",
+            )
+            return
+
+        self._sample_chunks += 1
+        self._sample_bytes += byte_count
+        self._sample_seconds += seconds
+        if self._sample_chunks < _SAMPLE_CHUNKS or self._is_settled:
+            return
+        bytes_per_second = self._sample_bytes / max(self._sample_seconds, 1e-9)
+        self._reset_sample()
+
+        if bytes_per_second < self._best_bytes_per_second * _MIN_THROUGHPUT_GAIN:
+            self._settle(
+                f"{_format_size(self.chunk_size)} reached {_format_rate(bytes_per_second)}, "
+                f"no better than {_format_rate(self._best_bytes_per_second)}"
+            )
+            return
+
+        self._best_chunk_size = self.chunk_size
+        self._best_bytes_per_second = bytes_per_second
+        if self.chunk_size * 2 > self.max_chunk_size:
+            self._settle(f"largest size reached at {_format_rate(bytes_per_second)}")
+            return
+        self._set_chunk_size(self.chunk_size * 2, f"{_format_rate(bytes_per_second)}")
+
+    def _get_initial_chunk_size(self) -> int:
+        if self._hints is None:
+            chunk_size = _SOLID_STATE_CHUNK_SIZE
+        else:
+            chunk_size = (
+                _ROTATIONAL_CHUNK_SIZE if self._hints.rotational else _SOLID_STATE_CHUNK_SIZE
+            )
+            chunk_size = max(chunk_size, self._hints.read_ahead_kb * 1024)
+            optimal_io_size = self._hints.optimal_io_size
+            if optimal_io_size > 0:
+                chunk_size = -(-chunk_size // optimal_io_size) * optimal_io_size
+        return max(self.min_chunk_size, min(chunk_size, self.max_chunk_size))
+
+    def _settle(self, reason: str) -> None:
+        self._is_settled = True
+        self._set_chunk_size(self._best_chunk_size, f"settled: {reason}")
+
+    def _set_chunk_size(self, chunk_size: int, reason: str) -> None:
+        if chunk_size == self.chunk_size:
+            self._log(f"keeping {_format_size(chunk_size)} chunks ({reason})")
+        else:
+            self._log(
+                f"{_format_size(self.chunk_size)} -> {_format_size(chunk_size)} chunks ({reason})"
+            )
+        self.chunk_size = chunk_size
+        self._reset_sample()
+
+    def _reset_sample(self) -> None:
+        self._sample_chunks = 0
+        self._sample_bytes = 0
+        self._sample_seconds = 0.0
+
+    def _log(self, message: str) -> None:
+        if self._hints is None:
+            hints = "no queue hints"
+        else:
+            hints = (
+                f"rotational={int(self._hints.rotational)} "
+                f"optimal_io_size={self._hints.optimal_io_size} "
+                f"read_ahead_kb={self._hints.read_ahead_kb}"
+            )
+        log.info(f"chunk_tuner - {self._source_path} [{hints}]: {message}")
+
+
+def _format_size(byte_count: int) -> str:
+    return f"{byte_count / (1024 * 1024):g} MiB"
+
+
+def _format_rate(bytes_per_second: float) -> str:
+    return f"{bytes_per_second / (1000 * 1000):.1f} MB/s"
@@ -0,0 +1,304 @@
+"""
+Persistent trigram index of a device, so repeated searches read a fraction of it.
+
+An opt-in indexing pass reads the whole device once and records, for every
+region of `region_size` bytes, a Bloom filter of the byte trigrams starting in
+it: one bit out of `_FILTER_BITS` per hashed trigram. Filters are stored bit
+sliced, as in signature files: for each filter bit, one bitmap over the regions
+holding it, so a query reads one row per trigram of its needles instead of
+every filter.
+
+A region is a candidate for a needle when each needle trigram is set in its
+filter or in the next region's, since a match starting in a region ends in the
+next one at the latest. Candidate regions are then scanned with the normal
+matcher, so Bloom false positives cost reads but never produce wrong results,
+and no match is missed while the index matches the device.
+
+Indexes are cached per device fingerprint. A device modified through its file
+system gets a new fingerprint and is scanned in full until it is indexed
+again, but writes the fingerprint misses make the index stale, and matches in
+regions written since are then missed without notice. Mounted devices, which
+may change at any time, are always scanned in full. Regular expressions and
+needles shorter than a trigram always use a full scan too.
+
+Indexing needs NumPy, installed with the `index` extra.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from threading import Event
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Pattern
+
+from recoverpy.lib.search.pattern_matcher import ScanPatterns
+from recoverpy.lib.storage.block_device_inventory import is_mounted
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     open_sequential_reader)
+from recoverpy.lib.storage.device_cache import (CACHE_HEADER_SIZE,
+                                                DeviceCacheError,
+                                                decode_cache_header,
+                                                get_cache_path,
+                                                get_device_fingerprint,
+                                                get_flagged_ranges,
+                                                import_numpy, write_cache_file)
+from recoverpy.log.logger import log
+from recoverpy.models.scan_range import ByteRange
+
+INDEX_SUFFIX = ".ngram"
+DEFAULT_REGION_SIZE = 1024 * 1024
+_INDEX_VERSION = 1
+_MAGIC = b"RPYNGRM1"
+_FILTER_BITS = 1 << 16
+# Regions sliced together; one group row is `_GROUP_REGIONS // 8` bytes.
+_GROUP_REGIONS = 1024
+# Filter bits transposed at once, bounding the memory used by a flush.
+_TRANSPOSE_BITS = 8192
+_TRIGRAM_HASH_MULTIPLIER = 0x9E3779B1
+_FEATURE = "Indexing"
+
+
+class NgramIndexError(DeviceCacheError):
+    pass
+
+
+def get_index_path(source_path: str) -> Path:
+    return get_cache_path(get_device_fingerprint(source_path), INDEX_SUFFIX)
+
+
+def build_ngram_index(
+    source_path: str,
+    *,
+    region_size: int = DEFAULT_REGION_SIZE,
+    index_path: Optional[Path] = None,
+    progress_callback: Callable[[int], None] | None = None,
+    stop_event: Event | None = None,
+) -> Optional[Path]:
+    """Index `source_path` and return the index path, None if stopped.
+
+    `progress_callback` receives the number of bytes indexed so far.
+    """
+    import_numpy(_FEATURE)
+    if region_size <= 0 or region_size % 8:
+        raise NgramIndexError(
+            f"Invalid index region size: {region_size}",
+            "Index region size must be a positive multiple of 8.",
+        )
+    fingerprint = get_device_fingerprint(source_path)
+    if index_path is None:
+        index_path = get_cache_path(fingerprint, INDEX_SUFFIX)
+
+    def write_index(index_file: BinaryIO) -> Optional[Dict[str, Any]]:
+        source_size = _write_groups(
+            source_path, index_file, region_size, progress_callback, stop_event
+        )
+        if source_size is None:
+            return None
+        return {
+            "version": _INDEX_VERSION,
+            "fingerprint": fingerprint,
+            "source_path": source_path,
+            "source_size": source_size,
+            "region_size": region_size,
+            "filter_bits": _FILTER_BITS,
+            "group_regions": _GROUP_REGIONS,
+        }
+
+    if not write_cache_file(index_path, _MAGIC, "index", write_index):
+        return None
+    log.info(
+        f"ngram_index - Indexed {source_path} in {index_path}"
+    )
+    return index_path
+
+
+def get_indexed_ranges(
+    source_path: str,
+    patterns: ScanPatterns,
+    start_offset: int = 0,
+    end_offset: Optional[int] = None,
+) -> Optional[List[ByteRange]]:
+    """Ranges of [start_offset, end_offset) that may hold matches of `patterns`.
+
+    None when no usable index exists or the patterns cannot use one, in
+    which case the whole range must be scanned.
+    """
+    try:
+        import_numpy(_FEATURE)
+    except DeviceCacheError:
+        log.warning("ngram_index - NumPy is not installed, searching without index")
+        return None
+    if isinstance(patterns, Pattern):
+        log.info("ngram_index - Regular expressions are searched without index")
+        return None
+    if is_mounted(source_path):
+        log.warning(
+            f"ngram_index - {source_path} is mounted, its index may be stale: "
+            "searching without index"
+        )
+        return None
+    needles = [patterns] if isinstance(patterns, bytes) else list(patterns)
+    try:
+        fingerprint = get_device_fingerprint(source_path)
+        index = NgramIndex(get_cache_path(fingerprint, INDEX_SUFFIX))
+    except DeviceCacheError as error:
+        log.info(f"ngram_index - No usable index for {source_path}: {error}")
+        return None
+    try:
+        if index.fingerprint != fingerprint:
+            log.info(f"ngram_index - Index of {source_path} is stale")
+            return None
+        candidates = index.get_candidate_regions(needles)
+    finally:
+        index.close()
+    if candidates is None:
+        log.info("ngram_index - Needle too short for the index, searching without it")
+        return None
+
+    scan_end = index.source_size if end_offset is None else end_offset
+    ranges = get_flagged_ranges(candidates, index.region_size, start_offset, scan_end)
+    log.info(
+        f"ngram_index - {sum(end - start for start, end in ranges)} of "
+        f"{max(0, scan_end - start_offset)} bytes of {source_path} are candidates"
+    )
+    return ranges
+
+
+class NgramIndex:
+    def __init__(self, path: Path):
+        import_numpy(_FEATURE)
+        try:
+            self._fd = os.open(path, os.O_RDONLY)
+        except OSError as error:
+            raise NgramIndexError(
+                f"Cannot open index {path}: {error}",
+                f"Cannot open index file {path}.",
+            ) from error
+        try:
+            header = decode_cache_header(
+                _MAGIC, os.pread(self._fd, CACHE_HEADER_SIZE, 0)
+            )
+            if header.get("version") != _INDEX_VERSION:
+                raise ValueError(f"unsupported version {header.get('version')}")
+            self.fingerprint: str = header["fingerprint"]
+            self.source_size: int = header["source_size"]
+            self.region_size: int = header["region_size"]
+            self._filter_bits: int = header["filter_bits"]
+            self._group_regions: int = header["group_regions"]
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            os.close(self._fd)
+            raise NgramIndexError(
+                f"Invalid index {path}: {error}",
+                f"Index file {path} is damaged.",
+            ) from error
+        self.region_count = -(-self.source_size // self.region_size)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def get_candidate_regions(self, needles: List[bytes]) -> Optional[Any]:
+        """Boolean array of the regions where a needle may start, None if a
+        needle cannot be looked up."""
+        np = import_numpy(_FEATURE)
+        candidates = np.zeros(self.region_count, dtype=np.bool_)
+        for needle in needles:
+            if len(needle) < 3 or len(needle) - 3 > self.region_size:
+                return None
+            needle_candidates = np.ones(self.region_count, dtype=np.bool_)
+            for bit in np.unique(_hash_trigrams(needle, self._filter_bits)):
+                present = self._read_bit_row(int(bit))
+                present[:-1] |= present[1:].copy()
+                needle_candidates &= present
+            candidates |= needle_candidates
+        return candidates
+
+    def _read_bit_row(self, bit: int) -> Any:
+        np = import_numpy(_FEATURE)
+        row_bytes = self._group_regions // 8
+        group_bytes = self._filter_bits * row_bytes
+        group_count = -(-self.region_count // self._group_regions)
+        rows = [
+            os.pread(
+                self._fd,
+                row_bytes,
+                CACHE_HEADER_SIZE + group * group_bytes + bit * row_bytes,
+            )
+            for group in range(group_count)
+        ]
+        row = np.unpackbits(np.frombuffer(b"".join(rows), dtype=np.uint8))
+        return row[: self.region_count].astype(np.bool_)
+
+
+def _write_groups(
+    source_path: str,
+    index_file: BinaryIO,
+    region_size: int,
+    progress_callback: Callable[[int], None] | None,
+    stop_event: Event | None,
+) -> Optional[int]:
+    """Write the sliced filters of every region; the source size, None if stopped."""
+    np = import_numpy(_FEATURE)
+    try:
+        pread, close = open_sequential_reader(source_path)
+    except BlockExtractionError as error:
+        raise NgramIndexError(str(error), error.user_message) from error
+    filters = np.zeros((_GROUP_REGIONS, _FILTER_BITS // 8), dtype=np.uint8)
+    group_size = 0
+    offset = 0
+    try:
+        pending = pread(region_size, 0)
+        while pending:
+            if stop_event is not None and stop_event.is_set():
+                return None
+            following = pread(region_size, offset + len(pending))
+            # Trigrams starting in a region may end in the next one.
+            filters[group_size] = _get_region_filter(pending + following[:2])
+            group_size += 1
+            offset += len(pending)
+            if group_size == _GROUP_REGIONS:
+                _write_group(index_file, filters)
+                group_size = 0
+            if progress_callback is not None:
+                progress_callback(offset)
+            pending = following
+    except BlockExtractionError as error:
+        raise NgramIndexError(str(error), error.user_message) from error
+    finally:
+        close()
+    if group_size:
+        filters[group_size:] = 0
+        _write_group(index_file, filters)
+    return offset
+
+
+def _write_group(index_file: BinaryIO, filters: Any) -> None:
+    """Write filters region-major as rows of one bit over all the regions."""
+    np = import_numpy(_FEATURE)
+    for first_byte in range(0, _FILTER_BITS // 8, _TRANSPOSE_BITS // 8):
+        bits = np.unpackbits(
+            filters[:, first_byte : first_byte + _TRANSPOSE_BITS // 8], axis=1
+        )
+        index_file.write(np.packbits(np.ascontiguousarray(bits.T), axis=1).tobytes())
+
+
+def _get_region_filter(data: bytes) -> Any:
+    np = import_numpy(_FEATURE)
+    bits = np.zeros(_FILTER_BITS, dtype=np.bool_)
+    bits[_hash_trigrams(data, _FILTER_BITS)] = True
+    return np.packbits(bits)
+
+
+def _hash_trigrams(data: bytes, filter_bits: int) -> Any:
+    np = import_numpy(_FEATURE)
+    if len(data) < 3:
+        return np.zeros(0, dtype=np.uint32)
+    # Each trigram is read as the three high bytes of an unaligned big endian
+    # word; the padding byte completes the last word.
+    trigrams = np.ndarray(
+        shape=(len(data) - 2,), dtype=">u4", buffer=data + b"\0", strides=(1,)
+    ).astype(np.uint32)
+    trigrams >>= np.uint32(8)
+    # Multiplicative hashing keeps the high bits, which mix all trigram bytes.
+    trigrams *= np.uint32(_TRIGRAM_HASH_MULTIPLIER)
+    trigrams >>= np.uint32(32 - (filter_bits - 1).bit_length())
+    return trigrams
@@ -0,0 +1,273 @@
+"""
+Byte-pattern matchers used by the binary scanner.
+
+A matcher reports every `(match_index, match_end, pattern_index)` triple whose
+match starts at or after `pos` and ends at or before `endpos` in a buffer, in
+ascending start order. `max_match_len` bounds the length of any match so the
+scanner can size the overlap it keeps between consecutive chunks.
+
+Literal matchers report overlapping matches. Regex matches follow `re.finditer`
+semantics and never overlap, so the scanner resumes after the previous match end.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+from abc import ABC, abstractmethod
+from importlib import import_module
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Pattern, Sequence, Tuple, Union, cast)
+
+try:
+    _sre_parse = import_module("re._parser")
+except ImportError:  # pragma: no cover - Python < 3.11
+    _sre_parse = import_module("sre_parse")
+
+Buffer = Union[bytes, bytearray, mmap.mmap]
+MatchSpan = Tuple[int, int, int]
+ScanPatterns = Union[bytes, Sequence[bytes], "Pattern[bytes]"]
+
+
+class PatternMatcher(ABC):
+    max_match_len: int = 0
+    overlapping: bool = True
+
+    @abstractmethod
+    def iter_matches(self, buffer: Buffer, pos: int, endpos: int) -> Iterator[MatchSpan]:
+        """Matches starting in [pos, endpos) and ending by `endpos`."""
+
+
+class LiteralMatcher(PatternMatcher):
+    def __init__(self, needle: bytes):
+        if not needle:
+            raise ValueError("needle must not be empty")
+        self.needle = needle
+        self.max_match_len = len(needle)
+
+    def iter_matches(self, buffer: Buffer, pos: int, endpos: int) -> Iterator[MatchSpan]:
+        search_index = pos
+        while True:
+            match_index = buffer.find(self.needle, search_index, endpos)
+            if match_index < 0:
+                return
+            yield match_index, match_index + self.max_match_len, 0
+            search_index = match_index + 1
+
+
+class MultiPatternMatcher(PatternMatcher):
+    """
+    Single-pass matcher for many literal patterns.
+
+    Patterns are folded into a byte trie which is compiled into one regular
+    expression, so the automaton walk runs inside the C regex engine instead of
+    a per-byte Python loop. At each candidate position the greedy trie yields the
+    longest pattern; shorter patterns matching at the same position are always
+    prefixes of it and are resolved with a dictionary lookup.
+    """
+
+    def __init__(self, patterns: Sequence[bytes]):
+        if not patterns:
+            raise ValueError("patterns must not be empty")
+        if any(not pattern for pattern in patterns):
+            raise ValueError("patterns must not be empty")
+
+        self._pattern_indexes: Dict[bytes, int] = {}
+        for index, pattern in enumerate(patterns):
+            # Duplicates report the first occurrence's index.
+            self._pattern_indexes.setdefault(pattern, index)
+
+        self._lengths = sorted({len(pattern) for pattern in self._pattern_indexes})
+        self.max_match_len = self._lengths[-1]
+        self._regex = re.compile(_build_trie_regex(list(self._pattern_indexes)), re.DOTALL)
+
+    def iter_matches(self, buffer: Buffer, pos: int, endpos: int) -> Iterator[MatchSpan]:
+        search_index = pos
+        while True:
+            match = self._regex.search(buffer, search_index, endpos)
+            if match is None:
+                return
+
+            match_index = match.start()
+            longest = match.group()
+            for length in self._lengths:
+                if length > len(longest):
+                    break
+                pattern_index = self._pattern_indexes.get(bytes(longest[:length]))
+                if pattern_index is not None:
+                    yield match_index, match_index + length, pattern_index
+
+            # Restart right after the match start so overlapping occurrences of
+            # other patterns are still reported.
+            search_index = match_index + 1
+
+
+class RegexMatcher(PatternMatcher):
+    """
+    Compiled bytes regex matcher with a literal prefilter.
+
+    The longest literal run the regex requires is located with `bytes.find`
+    first; the regex engine then only runs in windows of `max_match_len` bytes
+    around those candidates. Matches are expected to be at most `max_match_len`
+    bytes long; longer ones may be cut at chunk edges.
+    """
+
+    overlapping = False
+
+    def __init__(self, regex: Pattern[bytes], max_match_len: int):
+        if max_match_len <= 0:
+            raise ValueError("max_match_len must be > 0")
+        self._regex = regex
+        self.max_match_len = max_match_len
+
+        literal, is_prefix = extract_required_literal(regex)
+        self._literal = literal if len(literal) <= max_match_len else b""
+        # A prefix literal pins the match start; otherwise the match may begin
+        # up to `max_match_len - len(literal)` bytes before the literal.
+        self._lookbehind = 0 if is_prefix else max_match_len - len(self._literal)
+
+    def iter_matches(self, buffer: Buffer, pos: int, endpos: int) -> Iterator[MatchSpan]:
+        if not self._literal:
+            yield from self._iter_window_matches(buffer, pos, endpos)
+            return
+
+        window_start = window_end = -1
+        search_index = pos
+        while True:
+            literal_index = buffer.find(self._literal, search_index, endpos)
+            if literal_index < 0:
+                break
+            search_index = literal_index + 1
+
+            candidate_start = max(pos, literal_index - self._lookbehind)
+            candidate_end = min(endpos, literal_index + self.max_match_len)
+            if candidate_start <= window_end:
+                window_end = max(window_end, candidate_end)
+                continue
+
+            if window_end > 0:
+                yield from self._iter_window_matches(buffer, window_start, window_end)
+            window_start, window_end = candidate_start, candidate_end
+
+        if window_end > 0:
+            yield from self._iter_window_matches(buffer, window_start, window_end)
+
+    def _iter_window_matches(
+        self, buffer: Buffer, pos: int, endpos: int
+    ) -> Iterator[MatchSpan]:
+        for match in self._regex.finditer(buffer, pos, endpos):
+            # Zero-length matches carry no recoverable content.
+            if match.end() > match.start():
+                yield match.start(), match.end(), 0
+
+
+def build_matcher(
+    patterns: ScanPatterns, max_match_len: Optional[int] = None
+) -> PatternMatcher:
+    if isinstance(patterns, re.Pattern):
+        if max_match_len is None:
+            raise ValueError("max_match_len is required for regex scans")
+        return RegexMatcher(patterns, max_match_len)
+    if isinstance(patterns, (bytes, bytearray)):
+        return LiteralMatcher(bytes(patterns))
+    if len(patterns) == 1:
+        return LiteralMatcher(patterns[0])
+    return MultiPatternMatcher(patterns)
+
+
+def extract_required_literal(regex: Pattern[bytes]) -> Tuple[bytes, bool]:
+    """Return the longest literal run every match must contain, and whether it
+    is the prefix of the match."""
+    if regex.flags & re.IGNORECASE:
+        return b"", False
+
+    try:
+        items = _flatten_groups(_parse_regex(regex))
+    except (re.error, TypeError, ValueError):
+        return b"", False
+
+    best = b""
+    best_is_prefix = False
+    run = bytearray()
+    run_start = 0
+    for index, (opcode, argument) in enumerate(items + [(None, None)]):
+        if opcode is _LITERAL:
+            if not run:
+                run_start = index
+            run.append(cast(int, argument))
+            continue
+        if len(run) > len(best):
+            best = bytes(run)
+            best_is_prefix = run_start == 0
+        run = bytearray()
+
+    return best, best_is_prefix
+
+
+# The parser of the `re` module is internal and untyped: its items are
+# `(opcode, argument)` pairs, opcodes being constants compared by identity.
+_ParsedItem = Tuple[object, object]
+_LITERAL = cast(object, getattr(_sre_parse, "LITERAL"))
+_SUBPATTERN = cast(object, getattr(_sre_parse, "SUBPATTERN"))
+
+
+def _parse_regex(regex: Pattern[bytes]) -> List[_ParsedItem]:
+    parse = cast(
+        Callable[[bytes, int], Iterable[_ParsedItem]], getattr(_sre_parse, "parse")
+    )
+    return list(parse(regex.pattern, regex.flags))
+
+
+def _flatten_groups(items: List[_ParsedItem]) -> List[_ParsedItem]:
+    # Plain capture groups do not change what is required; inline their
+    # content so literals split across groups still form one run.
+    flattened: List[_ParsedItem] = []
+    for opcode, argument in items:
+        if opcode is _SUBPATTERN:
+            _group, add_flags, del_flags, subpattern = cast(
+                Tuple[object, int, int, Iterable[_ParsedItem]], argument
+            )
+            if not add_flags and not del_flags:
+                flattened.extend(_flatten_groups(list(subpattern)))
+                continue
+        flattened.append((opcode, argument))
+    return flattened
+
+
+_TrieNode = Dict[int, "_TrieNode"]
+_TERMINAL = -1
+
+
+def _build_trie_regex(patterns: List[bytes]) -> bytes:
+    root: _TrieNode = {}
+    for pattern in patterns:
+        node = root
+        for byte in pattern:
+            node = node.setdefault(byte, {})
+        node[_TERMINAL] = {}
+    return _trie_node_to_regex(root)
+
+
+def _trie_node_to_regex(node: _TrieNode) -> bytes:
+    branches: List[bytes] = []
+    for byte in sorted(key for key in node if key != _TERMINAL):
+        literal = bytearray([byte])
+        child = node[byte]
+        # Collapse single-child chains into one literal run to keep the
+        # compiled expression shallow for long patterns.
+        while len(child) == 1 and _TERMINAL not in child:
+            next_byte = next(iter(child))
+            literal.append(next_byte)
+            child = child[next_byte]
+        branches.append(re.escape(bytes(literal)) + _trie_node_to_regex(child))
+
+    if not branches:
+        return b""
+
+    alternation = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+    if _TERMINAL in node:
+        # The greedy optional makes the regex prefer the longest pattern.
+        if len(branches) == 1:
+            alternation = b"(?:" + alternation + b")"
+        return alternation + b"?"
+    return alternation
@@ -0,0 +1,87 @@
+"""
+Hand-off of formatted search results from the converter thread to the UI loop.
+
+The converter formats hits in batches and puts each batch at once. A consumer
+coroutine running in another event loop, the Textual app's, takes as many
+results at a time as it can show. Putting a batch only takes a lock and, when
+the consumer is waiting, schedules one wakeup in its loop with
+`call_soon_threadsafe`: nothing is awaited per result, and the converter
+needs no event loop of its own.
+
+Results are delivered in order to a single consumer coroutine. Batch jobs,
+which run no event loop, drain the queue with `get_batch_nowait`.
+"""
+
+from __future__ import annotations
+
+from asyncio import AbstractEventLoop, Future, QueueEmpty, get_running_loop
+from collections import deque
+from threading import Lock
+from typing import Deque, List, Optional
+
+from recoverpy.models.search_result import SearchResult
+
+
+class SearchResultQueue:
+    def __init__(self) -> None:
+        self._results: Deque[SearchResult] = deque()
+        self._lock = Lock()
+        self._waiter: Optional[Future[None]] = None
+        self._waiter_loop: Optional[AbstractEventLoop] = None
+
+    def qsize(self) -> int:
+        return len(self._results)
+
+    def empty(self) -> bool:
+        return not self._results
+
+    def put_batch(self, results: List[SearchResult]) -> None:
+        """Append `results`, waking the waiting consumer. Thread-safe."""
+        if not results:
+            return
+        with self._lock:
+            self._results.extend(results)
+            waiter, loop = self._waiter, self._waiter_loop
+            self._waiter = self._waiter_loop = None
+        if waiter is None or loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(_wake, waiter)
+        except RuntimeError:
+            # The consumer's loop has been closed.
+            pass
+
+    async def get_batch(self, max_items: int) -> List[SearchResult]:
+        """The next results, at least one and at most `max_items`."""
+        loop = get_running_loop()
+        while True:
+            with self._lock:
+                if self._results:
+                    return self._pop_results(max_items)
+                waiter: Future[None] = loop.create_future()
+                self._waiter, self._waiter_loop = waiter, loop
+            await waiter
+
+    def get_batch_nowait(self, max_items: Optional[int] = None) -> List[SearchResult]:
+        """The results available now, at most `max_items` of them."""
+        with self._lock:
+            return self._pop_results(
+                len(self._results) if max_items is None else max_items
+            )
+
+    def get_nowait(self) -> SearchResult:
+        """The next result; QueueEmpty if there is none yet."""
+        with self._lock:
+            if not self._results:
+                raise QueueEmpty
+            return self._results.popleft()
+
+    def _pop_results(self, max_items: int) -> List[SearchResult]:
+        count = min(max_items, len(self._results))
+        return [self._results.popleft() for _ in range(count)]
+
+
+def _wake(waiter: Future[None]) -> None:
+    # The consumer may have been cancelled in the meantime.
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,207 @@
+"""
+On-disk checkpoints letting an interrupted scan resume where it stopped.
+
+A checkpoint records the scanned device identity, the search parameters and
+the offset below which every hit has been emitted. Resuming scans from that
+offset, so no hit is lost or reported twice.
+
+The hits themselves go to an append-only log next to the checkpoint, the
+`.hits` file, so that saving a checkpoint only syncs the log and rewrites a
+small JSON file whatever the number of hits. The JSON file records how many
+bytes of the log were written when the scan reached its offset: hits logged
+after that, or starting past the offset, are found again when resuming.
+A resumed scan writes a fresh log, starting with the hits it replays, which
+replaces the previous one when the checkpoint is first saved.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+from dataclasses import asdict, dataclass, replace
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+from recoverpy.lib.search.binary_scanner import ScanHit
+from recoverpy.lib.storage.block_device_metadata import DeviceInfo
+from recoverpy.models.scan_range import ScanOffset
+from recoverpy.models.search_options import SearchOptions
+
+_CHECKPOINT_VERSION = 2
+# Match offset, pattern index and preview length, followed by the preview.
+_HIT_RECORD = struct.Struct("<QII")
+
+
+class CheckpointError(Exception):
+    def __init__(self, message: str, user_message: str):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+@dataclass
+class ScanCheckpoint:
+    device_path: str
+    device_size_bytes: int
+    sector_size: int
+    # See `get_device_identity`, None when the device could not be identified.
+    device_identity: Optional[str]
+    search_string: str
+    keywords: List[str]
+    regex: bool
+    max_match_len: int
+    # Scanned byte range, end None meaning the end of the device.
+    start_offset: int = 0
+    end_offset: Optional[int] = None
+    # Every hit starting below this offset is in the first `hits_size` bytes
+    # of the hit log, `hit_count` hits having been logged by then.
+    scanned_offset: int = 0
+    hits_size: int = 0
+    hit_count: int = 0
+    completed: bool = False
+
+    def restore_options(self, options: SearchOptions, checkpoint_path: str) -> SearchOptions:
+        """Return `options` with the needle parameters of this checkpoint."""
+        return replace(
+            options,
+            keywords=list(self.keywords),
+            regex=self.regex,
+            max_match_len=self.max_match_len,
+            resume_from=checkpoint_path,
+            scan_start=ScanOffset(self.start_offset),
+            scan_end=ScanOffset(self.end_offset) if self.end_offset is not None else None,
+        )
+
+    def check_device(
+        self, device_path: str, device_info: DeviceInfo, device_identity: Optional[str]
+    ) -> None:
+        if os.path.realpath(device_path) != os.path.realpath(self.device_path):
+            raise CheckpointError(
+                f"Checkpoint of {self.device_path} used for {device_path}",
+                f"This checkpoint was taken on {self.device_path}, not {device_path}.",
+            )
+        if (
+            device_identity is not None
+            and self.device_identity is not None
+            and device_identity != self.device_identity
+        ):
+            raise CheckpointError(
+                f"Device {self.device_path} changed since checkpoint: "
+                f"{device_identity} instead of {self.device_identity}",
+                f"{self.device_path} is not the device this checkpoint was taken on.",
+            )
+        if (
+            device_info.size_bytes != self.device_size_bytes
+            or device_info.logical_sector_size != self.sector_size
+        ):
+            raise CheckpointError(
+                f"Device {self.device_path} changed since checkpoint: "
+                f"{device_info.size_bytes} bytes, {device_info.logical_sector_size} "
+                f"byte sectors instead of {self.device_size_bytes} bytes, "
+                f"{self.sector_size} byte sectors",
+                f"{self.device_path} is not the device this checkpoint was taken on.",
+            )
+
+
+class CheckpointHitLog:
+    """Hit log being written for the checkpoint at `path`."""
+
+    def __init__(self, path: str) -> None:
+        self._path = get_hit_log_path(path)
+        self._temporary_path = f"{self._path}.tmp"
+        self._file: IO[bytes] = open(self._temporary_path, "wb")
+        self._renamed = False
+        self.size = 0
+        self.hit_count = 0
+
+    def append(self, hit: ScanHit) -> None:
+        self._file.write(
+            _HIT_RECORD.pack(hit.match_offset, hit.pattern_index, len(hit.preview))
+        )
+        self._file.write(hit.preview)
+        self.size += _HIT_RECORD.size + len(hit.preview)
+        self.hit_count += 1
+
+    def sync(self) -> None:
+        """Make the logged hits durable, before saving the checkpoint."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if not self._renamed:
+            # Hits are still appended through the open file after the rename.
+            os.replace(self._temporary_path, self._path)
+            self._renamed = True
+
+    def close(self) -> None:
+        self._file.close()
+
+    def discard(self) -> None:
+        """Close the log without replacing the one of the previous checkpoint."""
+        self._file.close()
+        if not self._renamed:
+            os.remove(self._temporary_path)
+
+
+def get_hit_log_path(path: str) -> str:
+    return f"{path}.hits"
+
+
+def iter_checkpoint_hits(path: str, checkpoint: ScanCheckpoint) -> Iterator[ScanHit]:
+    """The hits logged for `checkpoint` up to its scanned offset, read from disk."""
+    if not checkpoint.hits_size:
+        return
+    hit_log_path = get_hit_log_path(path)
+    try:
+        with open(hit_log_path, "rb") as hit_log:
+            remaining = checkpoint.hits_size
+            while remaining >= _HIT_RECORD.size:
+                header = hit_log.read(_HIT_RECORD.size)
+                if len(header) < _HIT_RECORD.size:
+                    break
+                offset, pattern_index, preview_len = _HIT_RECORD.unpack(header)
+                remaining -= _HIT_RECORD.size + preview_len
+                preview = hit_log.read(preview_len)
+                if remaining < 0 or len(preview) < preview_len:
+                    # Written after the checkpoint was saved.
+                    break
+                if offset < checkpoint.scanned_offset:
+                    yield ScanHit(
+                        match_offset=offset, preview=preview, pattern_index=pattern_index
+                    )
+    except OSError as error:
+        raise CheckpointError(
+            f"Cannot read checkpoint hits {hit_log_path}: {error}",
+            f"Cannot read checkpoint hits {hit_log_path}.",
+        ) from error
+
+
+def save_checkpoint(path: str, checkpoint: ScanCheckpoint) -> None:
+    content: Dict[str, Any] = asdict(checkpoint)
+    content["version"] = _CHECKPOINT_VERSION
+    # Write-then-rename so a crash mid-write leaves the previous checkpoint.
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(content, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+def load_checkpoint(path: str) -> ScanCheckpoint:
+    try:
+        with open(path, "r") as checkpoint_file:
+            content = json.load(checkpoint_file)
+    except (OSError, ValueError) as error:
+        raise CheckpointError(
+            f"Cannot read checkpoint {path}: {error}",
+            f"Cannot read checkpoint {path}.",
+        ) from error
+
+    if not isinstance(content, dict) or content.pop("version", None) != _CHECKPOINT_VERSION:
+        raise CheckpointError(
+            f"Unsupported checkpoint format in {path}",
+            f"{path} is not a RecoverPy checkpoint.",
+        )
+    try:
+        return ScanCheckpoint(**content)
+    except TypeError as error:
+        raise CheckpointError(
+            f"Malformed checkpoint {path}: {error}",
+            f"{path} is not a RecoverPy checkpoint.",
+        ) from error
@@ -0,0 +1,63 @@
+"""
+Map of unreadable byte ranges met while scanning failing media.
+
+Ranges are kept sorted and merged. `export` writes them in GNU ddrescue mapfile
+notation (`pos size status`, `-` marking bad sectors) so the map can be read
+back by imaging tools.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import List, Tuple
+
+ByteRange = Tuple[int, int]
+
+
+class ScanErrorMap:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._ranges: List[ByteRange] = []
+
+    def add(self, start: int, end: int) -> None:
+        """Record [start, end) as unreadable, merging touching ranges."""
+        if end <= start:
+            return
+        with self._lock:
+            index = bisect_left(self._ranges, (start, end))
+            # The previous range may reach into the new one.
+            if index > 0 and self._ranges[index - 1][1] >= start:
+                index -= 1
+            merge_end = index
+            while merge_end < len(self._ranges) and self._ranges[merge_end][0] <= end:
+                start = min(start, self._ranges[merge_end][0])
+                end = max(end, self._ranges[merge_end][1])
+                merge_end += 1
+            self._ranges[index:merge_end] = [(start, end)]
+
+    def get_ranges(self) -> List[ByteRange]:
+        with self._lock:
+            return list(self._ranges)
+
+    def get_bad_bytes(self) -> int:
+        with self._lock:
+            return sum(end - start for start, end in self._ranges)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ranges)
+
+    def export(self, path: Path) -> None:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lines = [
+            f"# Error map created by RecoverPy on {timestamp}",
+            "#      pos        size  status",
+        ]
+        lines.extend(
+            f"0x{start:08X}  0x{end - start:08X}  -" for start, end in self.get_ranges()
+        )
+        with open(path, "w") as map_file:
+            map_file.write("\n".join(lines) + "\n")
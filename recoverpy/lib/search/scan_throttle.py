@@ -0,0 +1,137 @@
+"""
+Limits for scans running on hosts that still serve traffic.
+
+`ScanThrottle` is a token bucket capping the bytes a scan reads per second. Its
+rate may be changed at any time from another thread, e.g. the UI. The I/O
+scheduling class and CPU niceness of the scanning thread are set with
+`set_scan_thread_priority`; threads and processes started by the scan afterwards
+inherit them.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import platform
+from threading import Event, Lock, get_native_id
+from time import monotonic, sleep
+from typing import Optional
+
+from recoverpy.log.logger import log
+
+BYTES_PER_MB = 1000 * 1000
+IO_CLASS_BEST_EFFORT = "best-effort"
+IO_CLASS_IDLE = "idle"
+IO_CLASSES = (IO_CLASS_BEST_EFFORT, IO_CLASS_IDLE)
+
+# Longest single sleep, so stop requests and rate changes are noticed quickly.
+_MAX_THROTTLE_SLEEP_SECONDS = 0.25
+# The bucket holds at most one second worth of reads.
+_BURST_SECONDS = 1.0
+
+# linux/ioprio.h
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_CLASS_BE = 2
+_IOPRIO_CLASS_IDLE = 3
+# Lowest best-effort priority level.
+_IOPRIO_BE_LOWEST_LEVEL = 7
+_IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "aarch64": 30,
+    "i386": 289,
+    "i686": 289,
+    "armv7l": 314,
+    "ppc64le": 273,
+    "riscv64": 30,
+}
+
+
+class ScanThrottle:
+    def __init__(self, rate_bytes_per_second: int = 0):
+        self._lock = Lock()
+        self._rate = 0
+        self._tokens = 0.0
+        self._updated_at = monotonic()
+        self.set_rate(rate_bytes_per_second)
+
+    @property
+    def rate(self) -> int:
+        """Current cap in bytes per second, 0 meaning unlimited."""
+        return self._rate
+
+    def set_rate(self, rate_bytes_per_second: int) -> None:
+        if rate_bytes_per_second < 0:
+            raise ValueError("rate_bytes_per_second must be >= 0")
+        with self._lock:
+            self._rate = rate_bytes_per_second
+            # Debt accumulated under the previous rate is forgiven.
+            self._tokens = 0.0
+            self._updated_at = monotonic()
+
+    def consume(self, byte_count: int, stop_event: Event | None = None) -> None:
+        """Account for `byte_count` bytes read, sleeping while over the cap."""
+        with self._lock:
+            if self._rate <= 0:
+                return
+            self._refill()
+            self._tokens -= byte_count
+
+        while stop_event is None or not stop_event.is_set():
+            with self._lock:
+                if self._rate <= 0:
+                    return
+                self._refill()
+                # Sub-byte debt is rounding noise from the refill arithmetic.
+                if self._tokens > -1:
+                    return
+                wait_seconds = -self._tokens / self._rate
+            sleep(min(wait_seconds, _MAX_THROTTLE_SLEEP_SECONDS))
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(
+            self._rate * _BURST_SECONDS,
+            self._tokens + (now - self._updated_at) * self._rate,
+        )
+        self._updated_at = now
+
+
+def set_scan_thread_priority(
+    io_class: Optional[str] = None, niceness: Optional[int] = None
+) -> None:
+    """Lower the I/O class and CPU priority of the calling thread.
+
+    Failures are logged and ignored: a scan still runs, only less politely.
+    """
+    if io_class is not None:
+        _set_io_priority(io_class)
+    if niceness is not None:
+        try:
+            # On Linux the priority of a thread id applies to that thread only.
+            os.setpriority(os.PRIO_PROCESS, get_native_id(), niceness)
+        except OSError as error:
+            log.warning(f"scan_throttle - Cannot set niceness {niceness}: {error}")
+
+
+def _set_io_priority(io_class: str) -> None:
+    if io_class not in IO_CLASSES:
+        raise ValueError(f"io_class must be one of {', '.join(IO_CLASSES)}")
+
+    syscall_number = _IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if syscall_number is None:
+        log.warning(f"scan_throttle - ioprio_set unsupported on {platform.machine()}")
+        return
+
+    if io_class == IO_CLASS_IDLE:
+        ioprio = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+    else:
+        ioprio = (_IOPRIO_CLASS_BE << _IOPRIO_CLASS_SHIFT) | _IOPRIO_BE_LOWEST_LEVEL
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    # Who 0 is the calling thread.
+    if libc.syscall(syscall_number, _IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+        error_number = ctypes.get_errno()
+        log.warning(
+            f"scan_throttle - Cannot set I/O class {io_class}: {os.strerror(error_number)}"
+        )
@@ -4,22 +4,45 @@ SearchEngine orchestrates native scan workers and streams formatted results to t
 
 from __future__ import annotations
 
-from asyncio import AbstractEventLoop
-from asyncio import Queue as AsyncQueue
-from asyncio import new_event_loop
 from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
 from queue import Empty, Full, Queue
+from re import compile as compile_regex
+from re import error as RegexError
 from threading import Event, Thread
 from time import monotonic
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, List, Optional, Pattern, Union
 
+from recoverpy.lib.filesystem.allocation_map import get_unallocated_ranges
+from recoverpy.lib.filesystem.ext4_owners import (Ext4OwnerMap,
+                                                  get_ext4_owner_map)
 from recoverpy.lib.search.binary_scanner import (ScanError, ScanHit,
                                                  iter_scan_hits)
-from recoverpy.lib.storage.block_device_metadata import get_device_info
+from recoverpy.lib.search.block_classification import get_text_ranges
+from recoverpy.lib.search.ngram_index import get_indexed_ranges
+from recoverpy.lib.search.result_queue import SearchResultQueue
+from recoverpy.lib.search.scan_checkpoint import (CheckpointError,
+                                                  CheckpointHitLog,
+                                                  ScanCheckpoint,
+                                                  iter_checkpoint_hits,
+                                                  load_checkpoint,
+                                                  save_checkpoint)
+from recoverpy.lib.search.scan_error_map import ScanErrorMap
+from recoverpy.lib.search.scan_throttle import (BYTES_PER_MB, ScanThrottle,
+                                                set_scan_thread_priority)
+from recoverpy.lib.search.shared_scan import get_shared_scan_session
+from recoverpy.lib.storage.block_device_inventory import get_device_identity
+from recoverpy.lib.storage.block_device_metadata import (DeviceInfo,
+                                                         get_device_info)
 from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
                                                      read_block)
+from recoverpy.lib.storage.compressed_image import open_compressed_image
 from recoverpy.lib.text.text_processing import decode_result, get_printable
 from recoverpy.log.logger import log
+from recoverpy.models.scan_range import (ByteRange, intersect_ranges,
+                                         merge_close_ranges)
+from recoverpy.models.search_options import SearchOptions
 from recoverpy.models.search_params import SearchParams
 from recoverpy.models.search_progress import SearchProgress
 from recoverpy.models.search_result import SearchResult
@@ -32,26 +55,57 @@ _QUEUE_PUT_TIMEOUT_SECONDS = 0.1
 _QUEUE_GET_MIN_TIMEOUT_SECONDS = 0.01
 _WORKER_JOIN_TIMEOUT_SECONDS = 1.0
 _MULTILINE_VALIDATION_BLOCK_SPAN = 8
+_CHECKPOINT_INTERVAL_SECONDS = 30.0
+# Reading through a gap this small costs less than starting another scan.
+_RANGE_MERGE_GAP_BYTES = 1024 * 1024
 
 
 class SearchEngine:
-    def __init__(self, partition: str, searched_string: str):
-        self.search_params = SearchParams(partition, searched_string)
+    def __init__(
+        self,
+        partition: str,
+        searched_string: str,
+        options: Optional[SearchOptions] = None,
+    ):
+        device_info = get_device_info(partition)
+        self.search_params = SearchParams(
+            partition, searched_string, options, device_info.size_bytes
+        )
         self.search_progress = SearchProgress()
-        self.formatted_results_queue: AsyncQueue[SearchResult] = AsyncQueue()
+        self.formatted_results_queue = SearchResultQueue()
         # Bounded queue enforces backpressure from producer to converter so
         # memory usage remains bounded on high-hit scans.
         self.raw_scan_hits_queue: Queue[Optional[ScanHit]] = Queue(
             maxsize=_RAW_HITS_QUEUE_MAXSIZE
         )
 
-        device_info = get_device_info(partition)
         self._source_size_bytes = max(1, device_info.size_bytes)
+        self._compressed_image = open_compressed_image(partition)
+        self._scan_end = (
+            self.search_params.end_offset
+            if self.search_params.end_offset is not None
+            else self._source_size_bytes
+        )
         self._stop_event = Event()
         self._pause_event = Event()
+        self._throttle = ScanThrottle(
+            self.search_params.options.bandwidth_limit_mb * BYTES_PER_MB
+        )
+        self.error_map: Optional[ScanErrorMap] = (
+            ScanErrorMap()
+            if self.search_params.options.tolerate_read_errors
+            and not self.search_params.options.shared_scan
+            else None
+        )
+        self._checkpoint = self._open_checkpoint(device_info)
+        self._checkpoint_saved_at = 0.0
+        self._hit_log: Optional[CheckpointHitLog] = None
         self._scan_thread: Thread | None = None
         self._convert_thread: Thread | None = None
         self._recent_blocks: OrderedDict[int, None] = OrderedDict()
+        # Loaded by the scanner thread before it scans, for searches skipping
+        # live files: hits only reach the converter once it is ready.
+        self._owner_map: Optional[Ext4OwnerMap] = None
 
     async def start_search(self) -> None:
         self._start_workers()
@@ -65,6 +119,17 @@ class SearchEngine:
         if self._convert_thread and self._convert_thread.is_alive():
             self._convert_thread.join(timeout=_WORKER_JOIN_TIMEOUT_SECONDS)
 
+    def wait_for_completion(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every hit has been converted; False if `timeout` expired."""
+        deadline = None if timeout is None else monotonic() + timeout
+        for thread in (self._scan_thread, self._convert_thread):
+            if thread is None:
+                continue
+            thread.join(None if deadline is None else max(0.0, deadline - monotonic()))
+            if thread.is_alive():
+                return False
+        return True
+
     def pause_search(self) -> None:
         self._pause_event.set()
 
@@ -74,6 +139,29 @@ class SearchEngine:
     def is_paused(self) -> bool:
         return self._pause_event.is_set()
 
+    def set_bandwidth_limit(self, limit_mb: int) -> None:
+        """Cap scan reads at `limit_mb` MB/s, 0 meaning unlimited."""
+        self._throttle.set_rate(limit_mb * BYTES_PER_MB)
+
+    def get_bandwidth_limit(self) -> int:
+        return self._throttle.rate // BYTES_PER_MB
+
+    def export_error_map(self, path: Optional[Path] = None) -> Path:
+        """Write the unreadable ranges met so far and return the file path."""
+        if self.error_map is None:
+            raise ValueError("read errors are not tolerated in this search")
+        if path is None:
+            error_map_path = self.search_params.options.error_map_path
+            path = (
+                Path(error_map_path)
+                if error_map_path
+                else Path.cwd()
+                / datetime.now().strftime("recoverpy-errormap-%Y-%m-%d-%H%M%S")
+            )
+        self.error_map.export(path)
+        log.info(f"search_engine - Exported {len(self.error_map)} bad ranges to {path}")
+        return path
+
     def _start_workers(self) -> None:
         self._scan_thread = Thread(
             target=self._scan_hits_worker,
@@ -88,39 +176,75 @@ class SearchEngine:
         self._scan_thread.start()
         self._convert_thread.start()
 
+    def _open_checkpoint(self, device_info: DeviceInfo) -> Optional[ScanCheckpoint]:
+        options = self.search_params.options
+        if options.shared_scan and (options.resume_from or options.checkpoint_path):
+            # A shared search may wrap around, so no single offset splits
+            # what it has scanned from what it has not.
+            log.warning("search_engine - Checkpoints are ignored by shared scans")
+            return None
+        device_identity = get_device_identity(self.search_params.partition)
+        if options.resume_from:
+            checkpoint = load_checkpoint(options.resume_from)
+            checkpoint.check_device(
+                self.search_params.partition, device_info, device_identity
+            )
+            log.info(
+                f"search_engine - Resuming {checkpoint.device_path} from offset "
+                f"{checkpoint.scanned_offset} with {checkpoint.hit_count} logged hits"
+            )
+            return checkpoint
+        if options.checkpoint_path:
+            return ScanCheckpoint(
+                device_path=self.search_params.partition,
+                device_size_bytes=device_info.size_bytes,
+                sector_size=device_info.logical_sector_size,
+                device_identity=device_identity,
+                search_string=self.search_params.search_string,
+                keywords=list(options.keywords),
+                regex=options.regex,
+                max_match_len=options.max_match_len,
+                start_offset=self.search_params.start_offset,
+                end_offset=self.search_params.end_offset,
+                scanned_offset=self.search_params.start_offset,
+            )
+        return None
+
     def _scan_hits_worker(self) -> None:
-        needle = self.search_params.searched_lines[0].encode("utf-8")
-        bytes_read = 0
-        last_progress_update = 0.0
+        self.search_progress.start(self._scan_end - self.search_params.start_offset)
+        start_offset = self.search_params.start_offset
+        completed = False
         try:
-            for hit in iter_scan_hits(
-                self.search_params.partition,
-                needle,
-                stop_event=self._stop_event,
-                pause_event=self._pause_event,
-            ):
+            self._load_owner_map()
+            if self._checkpoint is not None:
+                start_offset = max(start_offset, self._checkpoint.scanned_offset)
+                self.search_progress.update_bytes_scanned(
+                    start_offset - self.search_params.start_offset
+                )
+                self._replay_checkpoint_hits()
+            # Threads and shard processes started by the scanner inherit these.
+            set_scan_thread_priority(
+                self.search_params.options.io_class,
+                self.search_params.options.niceness,
+            )
+            for hit in self._iter_hits(start_offset):
                 if self._stop_event.is_set():
                     break
 
-                while not self._stop_event.is_set():
-                    try:
-                        self.raw_scan_hits_queue.put(
-                            hit, timeout=_QUEUE_PUT_TIMEOUT_SECONDS
-                        )
-                        break
-                    except Full:
-                        continue
+                self.search_progress.record_hit()
+                if self._hit_log is not None:
+                    self._hit_log.append(hit)
+                self._put_raw_hit(hit)
 
-                # Approximate native progress: scanner is sequential so the furthest
-                # match offset is a lower bound of bytes already read.
-                bytes_read = max(bytes_read, hit.match_offset + len(needle))
-                now = monotonic()
-                if now - last_progress_update >= 0.2:
-                    self._set_progress(bytes_read)
-                    last_progress_update = now
-
-            self._set_progress(self._source_size_bytes)
-        except ScanError as error:
+            completed = not self._stop_event.is_set()
+            self.search_progress.update_bytes_scanned(
+                self._scan_end - self.search_params.start_offset
+            )
+        except RegexError as error:
+            log.error(f"search_engine - Invalid regular expression: {error}")
+            self.search_progress.error_message = f"Invalid regular expression: {error}"
+            self.search_progress.progress_percent = 100.0
+        except (ScanError, CheckpointError) as error:
             log.error(f"search_engine - {error}")
             self.search_progress.error_message = error.user_message
             self.search_progress.progress_percent = 100.0
@@ -129,8 +253,170 @@ class SearchEngine:
             self.search_progress.error_message = "Unexpected scanning error."
             self.search_progress.progress_percent = 100.0
         finally:
+            self._save_checkpoint(completed)
+            if self._hit_log is not None:
+                self._hit_log.close()
+            self._export_error_map_on_completion()
             self._enqueue_sentinel()
 
+    def _replay_checkpoint_hits(self) -> None:
+        """Show the hits found before the interruption again, first.
+
+        They start the hit log of this scan, the one that is resumed being
+        replaced when the checkpoint is first saved.
+        """
+        checkpoint_path = self._get_checkpoint_path()
+        if self._checkpoint is None or checkpoint_path is None:
+            return
+        try:
+            self._hit_log = CheckpointHitLog(checkpoint_path)
+        except OSError as error:
+            log.error(f"search_engine - Cannot write checkpoint hits: {error}")
+        resume_from = self.search_params.options.resume_from
+        try:
+            if resume_from:
+                for hit in iter_checkpoint_hits(resume_from, self._checkpoint):
+                    if self._hit_log is not None:
+                        self._hit_log.append(hit)
+                    self._put_raw_hit(hit)
+        except CheckpointError:
+            # Keep the resumed checkpoint untouched.
+            if self._hit_log is not None:
+                self._hit_log.discard()
+                self._hit_log = None
+            raise
+        self._record_logged_hits()
+        self._checkpoint_saved_at = monotonic()
+
+    def _record_logged_hits(self) -> None:
+        if self._checkpoint is None or self._hit_log is None:
+            return
+        self._checkpoint.hits_size = self._hit_log.size
+        self._checkpoint.hit_count = self._hit_log.hit_count
+
+    def _iter_hits(self, start_offset: int) -> Iterator[ScanHit]:
+        options = self.search_params.options
+        if options.shared_scan:
+            session = get_shared_scan_session(self.search_params.partition)
+            return session.iter_hits(
+                self._get_scan_patterns(),
+                stop_event=self._stop_event,
+                pause_event=self._pause_event,
+                max_match_len=options.max_match_len,
+                throttle=self._throttle,
+                # Bytes of the range covered so far, in whatever order.
+                progress_callback=lambda covered: self._on_scan_progress(
+                    start_offset + covered
+                ),
+                start_offset=start_offset,
+                end_offset=self.search_params.end_offset,
+            )
+        return iter_scan_hits(
+            self.search_params.partition,
+            self._get_scan_patterns(),
+            stop_event=self._stop_event,
+            pause_event=self._pause_event,
+            workers=options.scan_workers,
+            max_match_len=options.max_match_len,
+            backend=options.scan_backend,
+            io_policy=options.io_policy,
+            auto_chunk_size=options.auto_chunk_size,
+            throttle=self._throttle,
+            error_map=self.error_map,
+            # Called once per scanned chunk with the offset scanned through,
+            # skipped holes and zero chunks included. Ranges are scanned in
+            # offset order and the bytes between them count as scanned, so
+            # checkpoints still split scanned offsets from the others.
+            progress_callback=self._on_scan_progress,
+            start_offset=start_offset,
+            end_offset=self.search_params.end_offset,
+            ranges=self._get_scan_ranges(start_offset),
+        )
+
+    def _get_scan_ranges(self, start_offset: int) -> Optional[List[ByteRange]]:
+        """Parts of the range worth scanning, None meaning all of it."""
+        options = self.search_params.options
+        partition = self.search_params.partition
+        end_offset = self.search_params.end_offset
+        ranges = None
+        if options.use_index:
+            ranges = get_indexed_ranges(
+                partition, self._get_scan_patterns(), start_offset, end_offset
+            )
+        if options.text_only:
+            ranges = _intersect_optional_ranges(
+                ranges, get_text_ranges(partition, start_offset, end_offset)
+            )
+        if options.unallocated_only:
+            ranges = _intersect_optional_ranges(
+                ranges, get_unallocated_ranges(partition, start_offset, end_offset)
+            )
+        if ranges is None:
+            return None
+        return merge_close_ranges(ranges, _RANGE_MERGE_GAP_BYTES)
+
+    def _put_raw_hit(self, hit: ScanHit) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.raw_scan_hits_queue.put(hit, timeout=_QUEUE_PUT_TIMEOUT_SECONDS)
+                return
+            except Full:
+                continue
+
+    def _on_scan_progress(self, scanned_offset: int) -> None:
+        if self._compressed_image is not None and self.search_params.end_offset is None:
+            # The decoded size of gzip and bz2 images is estimated until the
+            # scan reaches their end.
+            self._scan_end = max(1, self._compressed_image.estimate_size())
+            self.search_progress.total_bytes = (
+                self._scan_end - self.search_params.start_offset
+            )
+        self.search_progress.update_bytes_scanned(
+            scanned_offset - self.search_params.start_offset
+        )
+        if self._checkpoint is None:
+            return
+        # Every hit below `scanned_offset` has already been logged.
+        self._checkpoint.scanned_offset = scanned_offset
+        self._record_logged_hits()
+        if monotonic() - self._checkpoint_saved_at >= _CHECKPOINT_INTERVAL_SECONDS:
+            self._save_checkpoint()
+
+    def _get_checkpoint_path(self) -> Optional[str]:
+        return (
+            self.search_params.options.checkpoint_path
+            or self.search_params.options.resume_from
+        )
+
+    def _save_checkpoint(self, completed: bool = False) -> None:
+        checkpoint_path = self._get_checkpoint_path()
+        if self._checkpoint is None or self._hit_log is None or not checkpoint_path:
+            return
+        if completed:
+            self._checkpoint.completed = True
+            self._checkpoint.scanned_offset = self._scan_end
+            self._record_logged_hits()
+        try:
+            self._hit_log.sync()
+            save_checkpoint(checkpoint_path, self._checkpoint)
+        except OSError as error:
+            log.error(f"search_engine - Cannot save checkpoint: {error}")
+        self._checkpoint_saved_at = monotonic()
+
+    def _export_error_map_on_completion(self) -> None:
+        if self.error_map is None or not self.search_params.options.error_map_path:
+            return
+        try:
+            self.export_error_map()
+        except OSError as error:
+            log.error(f"search_engine - Cannot export error map: {error}")
+
+    def _get_scan_patterns(self) -> Union[List[bytes], Pattern[bytes]]:
+        patterns = [pattern.encode("utf-8") for pattern in self.search_params.patterns]
+        if self.search_params.is_regex_search:
+            return compile_regex(patterns[0])
+        return patterns
+
     def _enqueue_sentinel(self) -> None:
         while True:
             try:
@@ -143,15 +429,7 @@ class SearchEngine:
                 except Empty:
                     continue
 
-    def _set_progress(self, bytes_read: int) -> None:
-        if self._source_size_bytes <= 0:
-            self.search_progress.progress_percent = 100.0
-            return
-        ratio = min(1.0, max(0.0, bytes_read / self._source_size_bytes))
-        self.search_progress.progress_percent = ratio * 100
-
     def _convert_hits_worker(self) -> None:
-        loop = new_event_loop()
         producer_done = False
         try:
             while not producer_done:
@@ -171,39 +449,60 @@ class SearchEngine:
                     batch.append(item)
 
                 if batch:
-                    self._process_hits_batch(batch, loop)
+                    self._process_hits_batch(batch)
         except Exception as error:  # pragma: no cover - safety net
             log.error(f"search_engine - Unexpected converter error: {error}")
             self.search_progress.error_message = "Unexpected result processing error."
         finally:
             self.search_progress.progress_percent = 100.0
 
-    def _process_hits_batch(
-        self, hits: Iterable[ScanHit], loop: AbstractEventLoop
-    ) -> None:
+    def _process_hits_batch(self, hits: Iterable[ScanHit]) -> None:
+        results: List[SearchResult] = []
         for hit in hits:
             inode = hit.match_offset // self.search_params.block_size
 
             # Recent-block dedup intentionally stays bounded to avoid unbounded
             # memory growth while still reducing noisy near-duplicate hits.
-            if self._is_recent_block(inode):
+            if self._is_recent_block(inode) or self._is_in_live_file(hit):
                 continue
 
-            if self.search_params.is_multi_line and not self._is_hit_valid_multiline(hit):
+            if (
+                self.search_params.is_multi_line
+                and not self.search_params.is_keyword_search
+                and not self.search_params.is_regex_search
+                and not self._is_hit_valid_multiline(hit)
+            ):
                 continue
 
-            preview_line = self._format_preview(hit.preview)
+            preview_line = self._format_preview(hit)
             search_result = SearchResult(preview_line, inode=inode)
             search_result.css_class = (
                 "search-result-odd"
-                if self.search_progress.result_count % 2 == 0
+                if (self.search_progress.result_count + len(results)) % 2 == 0
                 else "search-result-even"
             )
-
-            loop.run_until_complete(self.formatted_results_queue.put(search_result))
-            self.search_progress.result_count += 1
+            results.append(search_result)
             self._mark_recent_block(inode)
 
+        # One hand-off per batch: the UI loop is woken once, not per result.
+        self.formatted_results_queue.put_batch(results)
+        self.search_progress.result_count += len(results)
+
+    def _load_owner_map(self) -> None:
+        if not self.search_params.options.skip_live_files:
+            return
+        self._owner_map = get_ext4_owner_map(self.search_params.partition)
+        if self._owner_map is None:
+            log.info(
+                "search_engine - No ext2/3/4 owner map, hits in live files are kept"
+            )
+
+    def _is_in_live_file(self, hit: ScanHit) -> bool:
+        return (
+            self._owner_map is not None
+            and self._owner_map.find_owner(hit.match_offset) is not None
+        )
+
     def _is_hit_valid_multiline(self, hit: ScanHit) -> bool:
         # Multi-line validation reads a wider window than a single logical block
         # so patterns split across adjacent blocks are still validated.
@@ -230,8 +529,12 @@ class SearchEngine:
         content = decode_result(current_block) + decode_result(next_block)
         return all(line in content for line in self.search_params.searched_lines)
 
-    def _format_preview(self, preview: bytes) -> str:
-        return get_printable(decode_result(preview))
+    def _format_preview(self, hit: ScanHit) -> str:
+        preview = get_printable(decode_result(hit.preview))
+        if self.search_params.is_keyword_search:
+            # Keyword searches match many patterns at once; show which one hit.
+            return f"[{self.search_params.patterns[hit.pattern_index]}] {preview}"
+        return preview
 
     def _is_recent_block(self, block_index: int) -> bool:
         return block_index in self._recent_blocks
@@ -241,3 +544,14 @@ class SearchEngine:
         self._recent_blocks.move_to_end(block_index)
         if len(self._recent_blocks) > _RECENT_BLOCKS_MAXSIZE:
             self._recent_blocks.popitem(last=False)
+
+
+def _intersect_optional_ranges(
+    first: Optional[List[ByteRange]], second: Optional[List[ByteRange]]
+) -> Optional[List[ByteRange]]:
+    """Intersection of two range lists, None standing for the whole device."""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return intersect_ranges(first, second)
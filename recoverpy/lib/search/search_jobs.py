@@ -0,0 +1,439 @@
+"""
+Unattended searches over many devices, described in a JSON job file.
+
+Each job names a device, a search string and options overriding the command
+line ones:
+
+    {"jobs": [{"name": "home", "device": "/dev/sda2", "search": "BEGIN RSA",
+               "options": {"io_policy": "drop-behind", "scan_end": "50%"}}]}
+
+Jobs run through `SearchEngine`. A physical disk serves one job at a time, so
+the heads of a spinning disk never alternate between two sequential scans,
+while jobs on different disks run in parallel. Jobs sharing a disk start in
+job file order. Jobs with the `shared_scan` option on the same device run
+together, reading it once. The results of each job are written to a JSON report, along
+with a summary of every job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass, field, fields, replace
+from datetime import datetime
+from queue import Empty, Queue
+from threading import Event, Thread
+from time import monotonic
+from typing import (Any, Dict, List, Optional, Tuple, Union, cast, get_args,
+                    get_origin, get_type_hints)
+
+from recoverpy.lib.search.binary_scanner import IO_POLICIES, SCAN_BACKENDS
+from recoverpy.lib.search.scan_checkpoint import CheckpointError
+from recoverpy.lib.search.scan_throttle import IO_CLASSES
+from recoverpy.lib.search.search_engine import SearchEngine
+from recoverpy.lib.storage.block_device_inventory import (DeviceDiscoveryError,
+                                                          get_partitions,
+                                                          get_physical_disks)
+from recoverpy.lib.storage.block_device_metadata import DeviceIOError
+from recoverpy.log.logger import log
+from recoverpy.models.scan_range import ScanRangeError, parse_scan_offset
+from recoverpy.models.search_options import SearchOptions
+from recoverpy.models.search_result import SearchResult
+
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_STOPPED = "stopped"
+JOB_STATUS_SKIPPED = "skipped"
+SUMMARY_REPORT_NAME = "summary.json"
+_POLL_INTERVAL_SECONDS = 0.25
+# Options a job may set; the offsets are parsed from strings.
+_SCAN_RANGE_OPTIONS = ("scan_start", "scan_end")
+_JOB_OPTIONS = frozenset(
+    option.name for option in fields(SearchOptions) if option.name != "image_paths"
+)
+_PER_DEVICE_FILE_OPTIONS = ("checkpoint_path", "resume_from", "error_map_path")
+_OPTION_TYPES = get_type_hints(SearchOptions)
+_OPTION_CHOICES: Dict[str, Tuple[str, ...]] = {
+    "scan_backend": SCAN_BACKENDS,
+    "io_policy": IO_POLICIES,
+    "io_class": IO_CLASSES,
+}
+# Smallest and largest values of numeric options, None when unbounded.
+_OPTION_BOUNDS: Dict[str, Tuple[int, Optional[int]]] = {
+    "scan_workers": (1, None),
+    "max_match_len": (1, None),
+    "bandwidth_limit_mb": (0, None),
+    "niceness": (-20, 19),
+}
+_UNSAFE_NAME_CHARACTERS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class SearchJobError(Exception):
+    def __init__(self, message: str, user_message: str):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+@dataclass
+class SearchJob:
+    name: str
+    device_path: str
+    search_string: str
+    options: SearchOptions
+
+
+@dataclass
+class SearchJobReport:
+    job: SearchJob
+    status: str
+    physical_disks: Tuple[str, ...] = ()
+    error_message: Optional[str] = None
+    started_at: Optional[datetime] = None
+    duration_seconds: float = 0.0
+    bytes_scanned: int = 0
+    total_bytes: int = 0
+    block_size: int = 0
+    results: List[SearchResult] = field(default_factory=lambda: [])
+    report_path: Optional[str] = None
+
+
+def load_search_jobs(path: str, base_options: SearchOptions) -> List[SearchJob]:
+    """Read a job file; job options override `base_options`."""
+    try:
+        with open(path, "r", encoding="utf-8") as jobs_file:
+            content: object = json.load(jobs_file)
+    except (OSError, ValueError) as error:
+        raise SearchJobError(
+            f"Cannot read job file {path}: {error}",
+            f"Cannot read job file {path}.",
+        ) from error
+
+    job_file = _as_json_object(content)
+    entries = job_file.get("jobs") if job_file is not None else None
+    if not isinstance(entries, list) or not entries:
+        raise SearchJobError(
+            f"No job list in {path}",
+            f"{path} must hold a non-empty `jobs` list.",
+        )
+    jobs = [
+        _parse_job(entry, index, base_options)
+        for index, entry in enumerate(cast(List[object], entries))
+    ]
+    names = [job.name for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise SearchJobError(
+            f"Duplicate job names in {path}: {duplicates}",
+            f"Job names must be unique: {', '.join(duplicates)}.",
+        )
+    return jobs
+
+
+def run_search_jobs(
+    jobs: List[SearchJob], report_dir: str, stop_event: Optional[Event] = None
+) -> List[SearchJobReport]:
+    """Run `jobs`, at most one per physical disk, and write their reports.
+
+    Setting `stop_event` stops running jobs and skips the pending ones.
+    """
+    stop_event = stop_event or Event()
+    os.makedirs(report_dir, exist_ok=True)
+    job_disks = _get_job_disks(jobs)
+    reports: Dict[str, SearchJobReport] = {}
+    pending = list(jobs)
+    # Disk -> job or shared scan using it, and the number of jobs running there.
+    busy_disks: Dict[str, Tuple[str, int]] = {}
+    finished: Queue[SearchJobReport] = Queue()
+    running = 0
+
+    while pending or running:
+        if stop_event.is_set():
+            for job in pending:
+                reports[job.name] = SearchJobReport(
+                    job, JOB_STATUS_SKIPPED, physical_disks=job_disks[job.name]
+                )
+            pending = []
+        # A job waiting for a disk keeps it from later jobs, so jobs sharing
+        # a disk run in job file order.
+        claimed_disks: Dict[str, Optional[str]] = {
+            disk: owner for disk, (owner, _) in busy_disks.items()
+        }
+        for job in list(pending):
+            disks = job_disks[job.name]
+            owner = _get_disk_owner(job)
+            if any(claimed_disks.get(disk, owner) != owner for disk in disks):
+                claimed_disks.update(dict.fromkeys(disks))
+                continue
+            claimed_disks.update(dict.fromkeys(disks, owner))
+            for disk in disks:
+                busy_disks[disk] = (owner, busy_disks.get(disk, (owner, 0))[1] + 1)
+            pending.remove(job)
+            running += 1
+            log.info(f"search_jobs - Starting job {job.name} on {', '.join(disks)}")
+            Thread(
+                target=_report_job,
+                args=(job, disks, stop_event, finished),
+                daemon=True,
+                name=f"search-job-{job.name}",
+            ).start()
+
+        if not running:
+            continue
+        try:
+            report = finished.get(timeout=_POLL_INTERVAL_SECONDS)
+        except Empty:
+            continue
+        except KeyboardInterrupt:
+            log.info("search_jobs - Interrupted, stopping running jobs")
+            stop_event.set()
+            continue
+        running -= 1
+        for disk in report.physical_disks:
+            owner, job_count = busy_disks.pop(disk)
+            if job_count > 1:
+                busy_disks[disk] = (owner, job_count - 1)
+        reports[report.job.name] = report
+        log.info(
+            f"search_jobs - Job {report.job.name} {report.status} with "
+            f"{len(report.results)} results"
+        )
+
+    ordered_reports = [reports[job.name] for job in jobs]
+    for report in ordered_reports:
+        _write_job_report(report, report_dir)
+    _write_summary(ordered_reports, report_dir)
+    return ordered_reports
+
+
+def _parse_job(entry: object, index: int, base_options: SearchOptions) -> SearchJob:
+    job_entry = _as_json_object(entry)
+    if job_entry is None:
+        raise SearchJobError(
+            f"Job {index + 1} is not an object: {entry!r}",
+            f"Job {index + 1} must be an object.",
+        )
+    device_path = job_entry.get("device")
+    search_string = job_entry.get("search")
+    if not isinstance(device_path, str) or not isinstance(search_string, str):
+        raise SearchJobError(
+            f"Job {index + 1} lacks a device or search string: {entry!r}",
+            f"Job {index + 1} needs a `device` and a `search` string.",
+        )
+    name = job_entry.get("name") or f"job{index + 1}-{os.path.basename(device_path)}"
+    name = _UNSAFE_NAME_CHARACTERS.sub("_", str(name))
+
+    job_options = _as_json_object(job_entry.get("options", {}))
+    if job_options is None:
+        raise SearchJobError(
+            f"Options of job {name} are not an object: {job_entry.get('options')!r}",
+            f"Options of job {name} must be an object.",
+        )
+    unknown = sorted(set(job_options) - _JOB_OPTIONS)
+    if unknown:
+        raise SearchJobError(
+            f"Unknown options for job {name}: {unknown}",
+            f"Unknown options for job {name}: {', '.join(unknown)}.",
+        )
+    overrides = dict(job_options)
+    for option, value in job_options.items():
+        _check_option(name, option, value)
+    try:
+        for option in _SCAN_RANGE_OPTIONS:
+            if option in overrides:
+                overrides[option] = parse_scan_offset(str(overrides[option]))
+    except ScanRangeError as error:
+        raise SearchJobError(
+            f"Job {name}: {error}", f"Job {name}: {error.user_message}"
+        ) from error
+    return SearchJob(
+        name=name,
+        device_path=device_path,
+        search_string=search_string,
+        # Files written for one device are never shared between jobs.
+        options=replace(
+            base_options,
+            **{**dict.fromkeys(_PER_DEVICE_FILE_OPTIONS), **overrides},
+        ),
+    )
+
+
+def _as_json_object(value: object) -> Optional[Dict[str, object]]:
+    """`value` if it is a parsed JSON object, whose keys are strings."""
+    return cast(Dict[str, object], value) if isinstance(value, dict) else None
+
+
+def _check_option(job_name: str, option: str, value: object) -> None:
+    """Raise SearchJobError unless `value` suits the SearchOptions field
+    `option`, so bad job files fail when loaded rather than mid-scan."""
+    if option in _SCAN_RANGE_OPTIONS:
+        # Offsets are written as in the UI, as strings or byte counts.
+        expected: object = Union[str, int, None]
+    else:
+        expected = _OPTION_TYPES[option]
+    if not _has_type(value, expected):
+        raise SearchJobError(
+            f"Job {job_name}: invalid {option} {value!r}",
+            f"Job {job_name}: invalid value {value!r} for option {option}.",
+        )
+    choices = _OPTION_CHOICES.get(option)
+    if choices is not None and value is not None and value not in choices:
+        raise SearchJobError(
+            f"Job {job_name}: invalid {option} {value!r}",
+            f"Job {job_name}: {option} must be one of {', '.join(choices)}.",
+        )
+    bounds = _OPTION_BOUNDS.get(option)
+    if bounds is not None and isinstance(value, int):
+        lowest, highest = bounds
+        if value < lowest or (highest is not None and value > highest):
+            limits = f"at least {lowest}" if highest is None else f"in [{lowest}, {highest}]"
+            raise SearchJobError(
+                f"Job {job_name}: {option} {value} out of range",
+                f"Job {job_name}: {option} must be {limits}.",
+            )
+
+
+def _has_type(value: object, expected: object) -> bool:
+    origin = get_origin(expected)
+    if origin is Union:
+        return any(_has_type(value, member) for member in get_args(expected))
+    if origin is list:
+        (item_type,) = get_args(expected)
+        return isinstance(value, list) and all(
+            _has_type(item, item_type) for item in cast(List[object], value)
+        )
+    if expected is type(None):
+        return value is None
+    if expected is int:
+        # JSON true and false are bools, which are ints to Python.
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(expected, type) and isinstance(value, expected)
+
+
+def _get_disk_owner(job: SearchJob) -> str:
+    """Jobs with the same owner may use a disk together: shared scans of one
+    device read it once for all of them."""
+    if job.options.shared_scan:
+        return f"shared:{os.path.realpath(job.device_path)}"
+    return f"job:{job.name}"
+
+
+def _get_job_disks(jobs: List[SearchJob]) -> Dict[str, Tuple[str, ...]]:
+    """Physical disks of each job's device, the device itself when unknown."""
+    try:
+        partition_disks = {
+            partition.get_full_name(): partition.physical_disks
+            for partition in get_partitions(filtered=False)
+        }
+    except DeviceDiscoveryError as error:
+        log.warning(f"search_jobs - {error}")
+        partition_disks = {}
+    job_disks: Dict[str, Tuple[str, ...]] = {}
+    for job in jobs:
+        disks = partition_disks.get(job.device_path) or get_physical_disks(
+            job.device_path
+        )
+        job_disks[job.name] = disks or (os.path.realpath(job.device_path),)
+    return job_disks
+
+
+def _report_job(
+    job: SearchJob,
+    disks: Tuple[str, ...],
+    stop_event: Event,
+    finished: Queue[SearchJobReport],
+) -> None:
+    finished.put(_run_job(job, disks, stop_event))
+
+
+def _run_job(
+    job: SearchJob, disks: Tuple[str, ...], stop_event: Event
+) -> SearchJobReport:
+    report = SearchJobReport(
+        job, JOB_STATUS_FAILED, physical_disks=disks, started_at=datetime.now()
+    )
+    try:
+        _run_engine(report, stop_event)
+    except (DeviceIOError, ScanRangeError, CheckpointError) as error:
+        log.error(f"search_jobs - Job {job.name}: {error}")
+        report.error_message = error.user_message
+    except Exception as error:  # pragma: no cover - safety net
+        log.error(f"search_jobs - Unexpected error in job {job.name}: {error}")
+        report.status = JOB_STATUS_FAILED
+        report.error_message = "Unexpected search error."
+    return report
+
+
+def _run_engine(report: SearchJobReport, stop_event: Event) -> None:
+    job = report.job
+    started_at = monotonic()
+    engine = SearchEngine(job.device_path, job.search_string, job.options)
+    asyncio.run(engine.start_search())
+    while not engine.wait_for_completion(_POLL_INTERVAL_SECONDS):
+        if stop_event.is_set():
+            engine.stop_search()
+        _drain_results(engine, report.results)
+    _drain_results(engine, report.results)
+
+    progress = engine.search_progress
+    report.duration_seconds = monotonic() - started_at
+    report.bytes_scanned = progress.bytes_scanned
+    report.total_bytes = progress.total_bytes
+    report.block_size = engine.search_params.block_size
+    report.error_message = progress.error_message
+    if progress.error_message is not None:
+        report.status = JOB_STATUS_FAILED
+    elif stop_event.is_set():
+        report.status = JOB_STATUS_STOPPED
+    else:
+        report.status = JOB_STATUS_COMPLETED
+
+
+def _drain_results(engine: SearchEngine, results: List[SearchResult]) -> None:
+    results.extend(engine.formatted_results_queue.get_batch_nowait())
+
+
+def _write_job_report(report: SearchJobReport, report_dir: str) -> None:
+    report.report_path = os.path.join(report_dir, f"{report.job.name}.json")
+    content = _get_report_header(report)
+    content["search_string"] = report.job.search_string
+    content["results"] = [
+        {
+            "block": result.inode,
+            "offset": (result.inode or 0) * report.block_size,
+            "preview": result.line,
+        }
+        for result in report.results
+    ]
+    _write_json(report.report_path, content)
+
+
+def _write_summary(reports: List[SearchJobReport], report_dir: str) -> None:
+    content = {"jobs": [_get_report_header(report) for report in reports]}
+    _write_json(os.path.join(report_dir, SUMMARY_REPORT_NAME), content)
+
+
+def _get_report_header(report: SearchJobReport) -> Dict[str, Any]:
+    return {
+        "name": report.job.name,
+        "device": report.job.device_path,
+        "physical_disks": list(report.physical_disks),
+        "status": report.status,
+        "error": report.error_message,
+        "started_at": report.started_at.isoformat() if report.started_at else None,
+        "duration_seconds": round(report.duration_seconds, 3),
+        "bytes_scanned": report.bytes_scanned,
+        "total_bytes": report.total_bytes,
+        "block_size": report.block_size,
+        "result_count": len(report.results),
+        "report": report.report_path,
+    }
+
+
+def _write_json(path: str, content: Dict[str, Any]) -> None:
+    try:
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(content, report_file, indent=2)
+    except OSError as error:
+        log.error(f"search_jobs - Cannot write report {path}: {error}")
@@ -0,0 +1,311 @@
+"""
+One device read shared by several concurrent searches.
+
+A `SharedScanSession` reads its source once, chunk by chunk, in a reader
+thread and hands every chunk to each registered search, which runs its own
+matcher on it through `iter_stream_hits`. A search registered while the reader
+is already past the start of its range first follows the reader to the end of
+the range, then wraps around to cover the offsets it missed; the reader reads
+them again only for it. Bytes nobody needs are never read: the reader jumps to
+the next offset wanted by a search, wrapping at the end of the source.
+
+Searches are consumed at the pace of the slowest one, as chunks are only kept
+`_CHUNKS_AHEAD` ahead of each search. Pausing one search pauses the reads of the
+whole session.
+"""
+
+from __future__ import annotations
+
+import os
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from recoverpy.lib.search.binary_scanner import (DEFAULT_MAX_PREVIEW_BYTES,
+                                                 DEFAULT_PREVIEW_AFTER_BYTES,
+                                                 DEFAULT_PREVIEW_BEFORE_BYTES,
+                                                 DEFAULT_SCAN_CHUNK_SIZE,
+                                                 ScanError, ScanHit,
+                                                 StreamChunk, iter_stream_hits)
+from recoverpy.lib.search.pattern_matcher import ScanPatterns, build_matcher
+from recoverpy.lib.search.scan_throttle import ScanThrottle
+from recoverpy.lib.storage.virtual_source import (VIRTUAL_SOURCE_ERRORS,
+                                                  open_virtual_source)
+from recoverpy.log.logger import log
+
+# Chunks queued for a search before the reader waits for it.
+_CHUNKS_AHEAD = 2
+_QUEUE_TIMEOUT_SECONDS = 0.25
+
+_sessions: Dict[str, "SharedScanSession"] = {}
+_sessions_lock = Lock()
+
+# A chunk and whether it ends the current pass of the receiving search, the
+# end of the stream (None) or the error that stopped the reader.
+_Delivery = Union[Tuple[StreamChunk, bool], None, ScanError]
+# [start, end) ranges, end None meaning the end of the source.
+_Pass = Tuple[int, Optional[int]]
+
+
+def get_shared_scan_session(source_path: str) -> SharedScanSession:
+    """The session reading `source_path`, shared by every search in the process."""
+    key = os.path.realpath(source_path)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = SharedScanSession(source_path)
+            _sessions[key] = session
+        return session
+
+
+class _Subscriber:
+    def __init__(self, passes: List[_Pass], overlap: int):
+        self.passes = passes
+        self.overlap = overlap
+        self.deliveries: Queue[_Delivery] = Queue(maxsize=_CHUNKS_AHEAD)
+        self.closed = Event()
+        # Reader side, under the session lock: the pass being fed and the
+        # offset the next chunk for it must contain.
+        self.pass_index = 0
+        self.next_offset: Optional[int] = passes[0][0]
+
+    def get_read_limit(self) -> Optional[int]:
+        end = self.passes[self.pass_index][1]
+        return None if end is None else end + self.overlap
+
+
+class SharedScanSession:
+    def __init__(self, source_path: str, *, chunk_size: int = DEFAULT_SCAN_CHUNK_SIZE):
+        self.source_path = source_path
+        self.chunk_size = chunk_size
+        # Bytes read from the source since the session was created.
+        self.bytes_read = 0
+        self._lock = Lock()
+        self._subscribers: List[_Subscriber] = []
+        self._reader_thread: Optional[Thread] = None
+        # Offset of the next read.
+        self._cursor = 0
+
+    def iter_hits(
+        self,
+        needle: ScanPatterns,
+        *,
+        preview_before: int = DEFAULT_PREVIEW_BEFORE_BYTES,
+        preview_after: int = DEFAULT_PREVIEW_AFTER_BYTES,
+        max_preview_len: int = DEFAULT_MAX_PREVIEW_BYTES,
+        stop_event: Event | None = None,
+        pause_event: Event | None = None,
+        max_match_len: int | None = None,
+        throttle: ScanThrottle | None = None,
+        progress_callback: Callable[[int], None] | None = None,
+        start_offset: int = 0,
+        end_offset: int | None = None,
+    ) -> Iterator[ScanHit]:
+        """Hits of [start_offset, end_offset), as `iter_scan_hits` reports them.
+
+        Hits are yielded in offset order within each pass, so a search joining
+        midway reports the end of its range before its start.
+        `progress_callback` receives the number of bytes of the range covered.
+        """
+        overlap = max(0, build_matcher(needle, max_match_len).max_match_len - 1)
+        subscriber = self._register(start_offset, end_offset, overlap)
+        covered = 0
+        try:
+            for pass_start, pass_end in subscriber.passes:
+                scanned = [pass_start]
+
+                def on_progress(
+                    offset: int, covered: int = covered, pass_start: int = pass_start
+                ) -> None:
+                    scanned[0] = max(scanned[0], offset)
+                    if progress_callback is not None:
+                        progress_callback(covered + scanned[0] - pass_start)
+
+                chunks = self._iter_pass_chunks(subscriber, stop_event)
+                yield from iter_stream_hits(
+                    self.source_path,
+                    needle,
+                    chunks,
+                    start_offset=pass_start,
+                    end_offset=pass_end,
+                    preview_before=preview_before,
+                    preview_after=preview_after,
+                    max_preview_len=max_preview_len,
+                    stop_event=stop_event,
+                    pause_event=pause_event,
+                    max_match_len=max_match_len,
+                    throttle=throttle,
+                    progress_callback=on_progress,
+                )
+                if stop_event is not None and stop_event.is_set():
+                    return
+                # Chunks the matcher did not need still end this pass.
+                for _ in chunks:
+                    pass
+                covered += scanned[0] - pass_start
+        finally:
+            self._unregister(subscriber)
+
+    def _register(
+        self, start_offset: int, end_offset: Optional[int], overlap: int
+    ) -> _Subscriber:
+        with self._lock:
+            join_offset = self._cursor
+            if self._reader_thread is not None and start_offset < join_offset and (
+                end_offset is None or join_offset < end_offset
+            ):
+                passes: List[_Pass] = [
+                    (join_offset, end_offset),
+                    (start_offset, join_offset),
+                ]
+                log.info(
+                    f"shared_scan - Search joins {self.source_path} at {join_offset}, "
+                    f"wrapping around to {start_offset} afterwards"
+                )
+            else:
+                passes = [(start_offset, end_offset)]
+            subscriber = _Subscriber(passes, overlap)
+            self._subscribers.append(subscriber)
+            if self._reader_thread is None:
+                self._cursor = start_offset
+                self._reader_thread = Thread(
+                    target=self._read_loop, daemon=True, name="shared-scan-reader"
+                )
+                self._reader_thread.start()
+            return subscriber
+
+    def _unregister(self, subscriber: _Subscriber) -> None:
+        subscriber.closed.set()
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _iter_pass_chunks(
+        self, subscriber: _Subscriber, stop_event: Event | None
+    ) -> Iterator[StreamChunk]:
+        while stop_event is None or not stop_event.is_set():
+            try:
+                delivery = subscriber.deliveries.get(timeout=_QUEUE_TIMEOUT_SECONDS)
+            except Empty:
+                continue
+            if delivery is None:
+                return
+            if isinstance(delivery, ScanError):
+                raise delivery
+            chunk, ends_pass = delivery
+            yield chunk
+            if ends_pass:
+                return
+
+    def _read_loop(self) -> None:
+        try:
+            pread, close = self._open_source()
+        except ScanError as error:
+            self._fail(error)
+            return
+        try:
+            while True:
+                with self._lock:
+                    offset = self._get_next_read_offset()
+                    if offset is None:
+                        self._reader_thread = None
+                        return
+                data = pread(self.chunk_size, offset)
+                chunk = StreamChunk(offset, data, is_eof=len(data) < self.chunk_size)
+                self.bytes_read += len(data)
+                with self._lock:
+                    deliveries = self._get_deliveries(chunk)
+                    self._cursor = 0 if chunk.is_eof else offset + len(data)
+                for subscriber, ends_pass in deliveries:
+                    self._deliver(subscriber, (chunk, ends_pass))
+        except ScanError as error:
+            self._fail(error)
+        finally:
+            close()
+
+    def _fail(self, error: ScanError) -> None:
+        log.error(f"shared_scan - {error}")
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+            self._reader_thread = None
+        for subscriber in subscribers:
+            self._deliver(subscriber, error)
+
+    def _get_next_read_offset(self) -> Optional[int]:
+        """The cursor if a search needs the chunk there, else the closest
+        offset a search needs after it, wrapping at the end of the source."""
+        wanted = [
+            subscriber.next_offset
+            for subscriber in self._subscribers
+            if subscriber.next_offset is not None
+        ]
+        if not wanted:
+            return None
+        cursor = self._cursor
+        if any(cursor <= offset < cursor + self.chunk_size for offset in wanted):
+            return cursor
+        ahead = [offset for offset in wanted if offset > cursor]
+        return min(ahead) if ahead else min(wanted)
+
+    def _get_deliveries(self, chunk: StreamChunk) -> List[Tuple[_Subscriber, bool]]:
+        chunk_end = chunk.offset + len(chunk.data)
+        deliveries: List[Tuple[_Subscriber, bool]] = []
+        for subscriber in self._subscribers:
+            next_offset = subscriber.next_offset
+            if next_offset is None or next_offset < chunk.offset:
+                continue
+            if next_offset >= chunk_end and not chunk.is_eof:
+                continue
+            read_limit = subscriber.get_read_limit()
+            ends_pass = chunk.is_eof or (read_limit is not None and chunk_end >= read_limit)
+            deliveries.append((subscriber, ends_pass))
+            if not ends_pass:
+                subscriber.next_offset = chunk_end
+                continue
+            subscriber.pass_index += 1
+            subscriber.next_offset = (
+                subscriber.passes[subscriber.pass_index][0]
+                if subscriber.pass_index < len(subscriber.passes)
+                else None
+            )
+        return deliveries
+
+    def _deliver(self, subscriber: _Subscriber, delivery: _Delivery) -> None:
+        while not subscriber.closed.is_set():
+            try:
+                subscriber.deliveries.put(delivery, timeout=_QUEUE_TIMEOUT_SECONDS)
+                return
+            except Full:
+                continue
+
+    def _open_source(self) -> Tuple[Callable[[int, int], bytes], Callable[[], None]]:
+        virtual_source = open_virtual_source(self.source_path)
+        if virtual_source is not None:
+
+            def virtual_pread(size: int, offset: int) -> bytes:
+                try:
+                    return virtual_source.pread(size, offset)
+                except VIRTUAL_SOURCE_ERRORS as error:
+                    raise ScanError(str(error), error.user_message) from error
+
+            return virtual_pread, lambda: None
+
+        try:
+            fd = os.open(self.source_path, os.O_RDONLY)
+        except OSError as error:
+            raise ScanError(
+                f"Cannot open scan source {self.source_path}: {error}",
+                f"Cannot open {self.source_path}.",
+            ) from error
+
+        def fd_pread(size: int, offset: int) -> bytes:
+            try:
+                return os.pread(fd, size, offset)
+            except OSError as error:
+                raise ScanError(
+                    f"I/O error while reading {self.source_path}: {error}",
+                    f"I/O error reading {self.source_path}.",
+                ) from error
+
+        return fd_pread, lambda: os.close(fd)
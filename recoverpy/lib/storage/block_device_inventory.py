@@ -1,11 +1,18 @@
 """Linux block device and partition inventory discovery."""
 
+import os
+import stat
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+from recoverpy.lib.storage.compressed_image import get_compression
+from recoverpy.lib.storage.split_image import get_split_segments
 from recoverpy.models.partition import Partition
 
 _SECTOR_SIZE = 512
+_SYS_CLASS_BLOCK = Path("/sys/class/block")
+_SYS_DEV_BLOCK = Path("/sys/dev/block")
 _IGNORED_PARTITION_TYPES: Tuple[str, str] = ("loop", "swap")
 
 
@@ -13,6 +20,16 @@ class DeviceDiscoveryError(Exception):
     """Raised when block device discovery fails."""
 
 
+@dataclass(frozen=True)
+class BlockQueueHints:
+    """I/O hints the kernel exposes for the request queue of a device."""
+
+    # Preferred request size in bytes, 0 when the device does not report one.
+    optimal_io_size: int
+    rotational: bool
+    read_ahead_kb: int
+
+
 def get_partitions(filtered: bool) -> List[Partition]:
     try:
         mount_info = _read_proc_mounts()
@@ -35,6 +52,185 @@ def get_partitions(filtered: bool) -> List[Partition]:
     return partitions
 
 
+def get_image_partition(image_path: str) -> Partition:
+    """Describe a disk image file given on the command line as a partition."""
+    segment_paths = get_split_segments(image_path)
+    compression = None if segment_paths else get_compression(image_path)
+    try:
+        size_bytes = sum(
+            os.stat(path).st_size for path in segment_paths or [image_path]
+        )
+    except OSError:
+        size_bytes = 0
+    if segment_paths:
+        device_type = f"split image ({len(segment_paths)} segments)"
+    else:
+        device_type = f"{compression} image" if compression else "image"
+    return Partition(
+        name=os.path.basename(image_path),
+        fs_type="unknown",
+        is_mounted=False,
+        mount_point=None,
+        size_bytes=size_bytes,
+        device_type=device_type,
+        device_path=os.path.abspath(image_path),
+        physical_disks=get_physical_disks(image_path),
+    )
+
+
+def get_physical_disks(path: str) -> Tuple[str, ...]:
+    """Names of the whole disks holding a device or a file, empty if unknown.
+
+    Partitions resolve to their parent disk, device-mapper and md devices to
+    the disks below them and files to the disks of their file system.
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return ()
+    if stat.S_ISBLK(path_stat.st_mode):
+        return _get_disks_below(Path(os.path.realpath(path)).name)
+    device = path_stat.st_dev
+    device_dir = _SYS_DEV_BLOCK / f"{os.major(device)}:{os.minor(device)}"
+    if not device_dir.exists():
+        # tmpfs, overlay and network file systems have no block device.
+        return ()
+    return _get_disks_below(device_dir.resolve().name)
+
+
+def get_device_identity(path: str) -> Optional[str]:
+    """Identifier of the medium behind a device or a file, None if unknown.
+
+    Disks are named by the serial number or WWID the kernel reports, so a
+    disk keeps its identity when it shows up under another name, and
+    partitions by their disk and start sector. Device-mapper devices use their
+    UUID, loop devices their backing file and files their inode number.
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISBLK(path_stat.st_mode):
+        return f"inode:{path_stat.st_ino}"
+
+    device = path_stat.st_rdev
+    device_dir = (_SYS_DEV_BLOCK / f"{os.major(device)}:{os.minor(device)}").resolve()
+    partition_suffix = ""
+    if (device_dir / "partition").exists():
+        try:
+            partition_suffix = f"@{_read_int(device_dir / 'start')}"
+        except (OSError, ValueError):
+            return None
+        device_dir = device_dir.parent
+    for name in ("wwid", "device/wwid", "device/serial", "dm/uuid", "loop/backing_file"):
+        try:
+            value = (device_dir / name).read_text(encoding="utf-8").strip()
+        except (OSError, UnicodeDecodeError):
+            continue
+        if value:
+            return f"{name}:{value}{partition_suffix}"
+    # Device numbers may change across reboots, but nothing better is known.
+    return f"dev:{os.major(device)}:{os.minor(device)}{partition_suffix}"
+
+
+def is_mounted(path: str) -> bool:
+    """Whether a file system on a device or an image file is mounted.
+
+    Counts file systems mounted from the device itself, from its partitions
+    and from the device-mapper or md devices stacked on them, and for image
+    files those mounted through a loop device backed by the file.
+    """
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.S_ISBLK(path_stat.st_mode):
+        devices = [path_stat.st_rdev]
+    else:
+        devices = _get_loop_devices(os.path.realpath(path))
+    try:
+        mounted = _read_mounted_devices()
+    except OSError:
+        return False
+    return any(
+        used in mounted for device in devices for used in _get_devices_above(device)
+    )
+
+
+def _get_loop_devices(backing_path: str) -> List[int]:
+    devices: List[int] = []
+    for loop_dir in _SYS_CLASS_BLOCK.glob("loop*"):
+        try:
+            backing_file = (loop_dir / "loop" / "backing_file").read_text(
+                encoding="utf-8"
+            )
+            if backing_file.strip() == backing_path:
+                devices.append(_read_device_number(loop_dir / "dev"))
+        except (OSError, ValueError):
+            continue
+    return devices
+
+
+def _get_devices_above(device: int) -> Set[int]:
+    """`device`, its partitions and the devices stacked on any of them."""
+    device_dir = (_SYS_DEV_BLOCK / f"{os.major(device)}:{os.minor(device)}").resolve()
+    devices = {device}
+    children = [path.parent for path in device_dir.glob("*/partition")]
+    holders_dir = device_dir / "holders"
+    if holders_dir.is_dir():
+        children.extend(
+            (_SYS_CLASS_BLOCK / holder.name) for holder in holders_dir.iterdir()
+        )
+    for child in children:
+        try:
+            devices |= _get_devices_above(_read_device_number(child / "dev"))
+        except (OSError, ValueError):
+            continue
+    return devices
+
+
+def _read_mounted_devices() -> Set[int]:
+    # mountinfo gives the device number even when no node exists for it in
+    # /dev, but btrfs reports an anonymous one: stat the mount sources too.
+    devices: Set[int] = set()
+    with open("/proc/self/mountinfo", "r", encoding="utf-8") as mountinfo_file:
+        for line in mountinfo_file:
+            values = line.split()
+            if len(values) < 3 or ":" not in values[2]:
+                continue
+            major, minor = values[2].split(":", maxsplit=1)
+            if major.isdigit() and minor.isdigit():
+                devices.add(os.makedev(int(major), int(minor)))
+    for source in _read_proc_mounts():
+        try:
+            source_stat = os.stat(source)
+        except OSError:
+            continue
+        if stat.S_ISBLK(source_stat.st_mode):
+            devices.add(source_stat.st_rdev)
+    return devices
+
+
+def _read_device_number(path: Path) -> int:
+    major, minor = path.read_text(encoding="utf-8").strip().split(":")
+    return os.makedev(int(major), int(minor))
+
+
+def _get_disks_below(name: str) -> Tuple[str, ...]:
+    device_dir = (_SYS_CLASS_BLOCK / name).resolve()
+    if not device_dir.is_dir():
+        return ()
+    if (device_dir / "partition").exists():
+        device_dir = device_dir.parent
+    slaves_dir = device_dir / "slaves"
+    slaves = sorted(slaves_dir.iterdir()) if slaves_dir.is_dir() else []
+    if not slaves:
+        return (device_dir.name,)
+    return tuple(
+        sorted({disk for slave in slaves for disk in _get_disks_below(slave.name)})
+    )
+
+
 def _read_proc_mounts() -> Dict[str, List[Tuple[str, str]]]:
     mounts: Dict[str, List[Tuple[str, str]]] = {}
     with open("/proc/mounts", "r", encoding="utf-8") as mounts_file:
@@ -69,7 +265,7 @@ def _read_proc_partition_sizes() -> Dict[str, int]:
 
 
 def _list_block_devices() -> List[str]:
-    return sorted(path.name for path in Path("/sys/class/block").iterdir())
+    return sorted(path.name for path in _SYS_CLASS_BLOCK.iterdir())
 
 
 def _build_partition(
@@ -98,11 +294,12 @@ def _build_partition(
         size_bytes=size_bytes,
         device_type=device_type,
         device_path=device_path,
+        physical_disks=_get_disks_below(name),
     )
 
 
 def _read_device_type(name: str) -> Optional[str]:
-    uevent_path = Path("/sys/class/block") / name / "uevent"
+    uevent_path = _SYS_CLASS_BLOCK / name / "uevent"
     try:
         with open(uevent_path, "r", encoding="utf-8") as uevent_file:
             for line in uevent_file:
@@ -114,7 +311,7 @@ def _read_device_type(name: str) -> Optional[str]:
 
 
 def _read_size_bytes(name: str, proc_sizes: Dict[str, int]) -> int:
-    size_path = Path("/sys/class/block") / name / "size"
+    size_path = _SYS_CLASS_BLOCK / name / "size"
     try:
         with open(size_path, "r", encoding="utf-8") as size_file:
             sectors = int(size_file.read().strip())
@@ -129,3 +326,31 @@ def _is_ignored(partition: Partition) -> bool:
     if partition.fs_type == _IGNORED_PARTITION_TYPES[1]:
         return True
     return False
+
+
+def get_queue_hints(device_path: str) -> Optional[BlockQueueHints]:
+    """Read the queue hints of a block device, None for files and unknown devices."""
+    try:
+        if not stat.S_ISBLK(os.stat(device_path).st_mode):
+            return None
+    except OSError:
+        return None
+
+    device_dir = _SYS_CLASS_BLOCK / Path(os.path.realpath(device_path)).name
+    queue_dir = device_dir / "queue"
+    if not queue_dir.is_dir():
+        # Partitions share the request queue of their parent disk.
+        queue_dir = device_dir.resolve().parent / "queue"
+    try:
+        return BlockQueueHints(
+            optimal_io_size=_read_int(queue_dir / "optimal_io_size"),
+            rotational=_read_int(queue_dir / "rotational") == 1,
+            read_ahead_kb=_read_int(queue_dir / "read_ahead_kb"),
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def _read_int(path: Path) -> int:
+    with open(path, "r", encoding="utf-8") as value_file:
+        return int(value_file.read().strip())
@@ -6,6 +6,8 @@ import stat
 import struct
 from dataclasses import dataclass
 
+from recoverpy.lib.storage.virtual_source import open_virtual_source
+
 # Linux block ioctl request numbers.
 # They are stable kernel ABI constants and intentionally kept explicit here.
 BLKGETSIZE64 = 0x80081272
@@ -35,6 +37,10 @@ def get_logical_block_size(path: str) -> int:
     return get_device_info(path).logical_sector_size
 
 
+def get_physical_block_size(path: str) -> int:
+    return get_device_info(path).physical_sector_size
+
+
 def get_device_info(path: str) -> DeviceInfo:
     fd = _open_read_only(path)
     try:
@@ -108,6 +114,12 @@ def _get_file_fallback_info(path: str) -> DeviceInfo:
             f"Cannot access {path}.",
         ) from error
 
+    virtual_source = open_virtual_source(path)
+    if virtual_source is not None:
+        # Size of all segments, or the uncompressed size, estimated until the
+        # image has been decoded once.
+        file_size = virtual_source.estimate_size()
+
     return DeviceInfo(
         size_bytes=file_size,
         logical_sector_size=_DEFAULT_SECTOR_SIZE,
@@ -1,8 +1,17 @@
-"""Bounded byte-range extraction and block reads for devices and disk images."""
+"""Bounded byte-range extraction and block reads for devices and disk images.
+
+Compressed disk images are read at uncompressed offsets through the seek-point
+index of their shared `CompressedImage`, and split images through the pooled
+segment descriptors of their shared `SplitImage`.
+"""
 
 import errno
 import os
 from pathlib import Path
+from typing import Callable, Tuple
+
+from recoverpy.lib.storage.virtual_source import (VIRTUAL_SOURCE_ERRORS,
+                                                  open_virtual_source)
 
 
 class BlockExtractionError(Exception):
@@ -20,7 +29,7 @@ def extract_range(
     chunk_size: int = 1024 * 1024,
 ) -> None:
     _validate_range(offset, length, chunk_size)
-    source_fd = _open_source(source_path)
+    pread, close = _open_reader(source_path)
     position = offset
     remaining = length
 
@@ -28,7 +37,7 @@ def extract_range(
         with open(output_path, "wb") as output_file:
             while remaining > 0:
                 to_read = min(chunk_size, remaining)
-                chunk = _safe_pread(source_fd, to_read, position, source_path)
+                chunk = pread(to_read, position)
                 if not chunk:
                     break
                 output_file.write(chunk)
@@ -46,7 +55,7 @@ def extract_range(
             f"Cannot write output file {output_path}.",
         ) from error
     finally:
-        os.close(source_fd)
+        close()
 
     if remaining > 0:
         # Partial reads at EOF/device end are treated as explicit failures so
@@ -75,7 +84,7 @@ def read_range(
     source_path: str, offset: int, length: int, *, chunk_size: int = 1024 * 1024
 ) -> bytes:
     _validate_range(offset, length, chunk_size)
-    source_fd = _open_source(source_path)
+    pread, close = _open_reader(source_path)
     position = offset
     remaining = length
     chunks: list[bytes] = []
@@ -83,7 +92,7 @@ def read_range(
     try:
         while remaining > 0:
             to_read = min(chunk_size, remaining)
-            chunk = _safe_pread(source_fd, to_read, position, source_path)
+            chunk = pread(to_read, position)
             if not chunk:
                 break
             chunks.append(chunk)
@@ -91,7 +100,7 @@ def read_range(
             remaining -= read_len
             position += read_len
     finally:
-        os.close(source_fd)
+        close()
 
     if remaining > 0:
         raise BlockExtractionError(
@@ -102,6 +111,54 @@ def read_range(
     return b"".join(chunks)
 
 
+def open_sequential_reader(
+    source_path: str,
+) -> Tuple[Callable[[int, int], bytes], Callable[[], None]]:
+    """Return `pread(size, offset)` and `close()` callables for reads in
+    offset order, such as whole-device passes.
+
+    Compressed images are decoded in one stream instead of from the closest
+    seek point at every read.
+    """
+    virtual_source = open_virtual_source(source_path)
+    if virtual_source is None:
+        return _open_reader(source_path)
+    try:
+        reader = virtual_source.open_reader()
+    except VIRTUAL_SOURCE_ERRORS as error:
+        raise BlockExtractionError(str(error), error.user_message) from error
+
+    def reader_pread(size: int, offset: int) -> bytes:
+        try:
+            return reader.pread(size, offset)
+        except VIRTUAL_SOURCE_ERRORS as error:
+            raise BlockExtractionError(str(error), error.user_message) from error
+
+    return reader_pread, reader.close
+
+
+def _open_reader(
+    source_path: str,
+) -> Tuple[Callable[[int, int], bytes], Callable[[], None]]:
+    """Return `pread(size, offset)` and `close()` callables for the source."""
+    virtual_source = open_virtual_source(source_path)
+    if virtual_source is not None:
+
+        def virtual_pread(size: int, offset: int) -> bytes:
+            try:
+                return virtual_source.pread(size, offset)
+            except VIRTUAL_SOURCE_ERRORS as error:
+                raise BlockExtractionError(str(error), error.user_message) from error
+
+        return virtual_pread, lambda: None
+
+    source_fd = _open_source(source_path)
+    return (
+        lambda size, offset: _safe_pread(source_fd, size, offset, source_path),
+        lambda: os.close(source_fd),
+    )
+
+
 def _open_source(source_path: str) -> int:
     try:
         return os.open(source_path, os.O_RDONLY)
@@ -0,0 +1,425 @@
+"""
+Random access to gzip, xz and bz2 compressed disk images.
+
+Images are decoded as a stream and addressed with uncompressed offsets. While
+decoding, seek points are recorded in an index shared by every reader of the
+image, so a later read at an arbitrary offset only decodes from the closest
+point before it. Gzip points snapshot the decoder state (zlib decompressors can
+be copied) every `SEEK_POINT_INTERVAL` bytes. Each snapshot holds a 32 KiB
+window, so past `MAX_DECODER_SEEK_POINTS` of them every other one is dropped
+and the interval doubled, bounding their memory on images of any size. xz and
+bz2 decoders cannot be copied; they only get points where a new compressed
+stream starts, as in images written by pxz or pbzip2.
+
+The last `_MAX_CACHED_IMAGES` images opened stay cached with their seek points.
+"""
+
+from __future__ import annotations
+
+import bz2
+import lzma
+import os
+import stat
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from recoverpy.log.logger import log
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_XZ = "xz"
+COMPRESSION_BZ2 = "bz2"
+SEEK_POINT_INTERVAL = 64 * 1024 * 1024
+MAX_DECODER_SEEK_POINTS = 256
+# Small reads keep the input pending in a decoder snapshot small.
+_COMPRESSED_READ_SIZE = 64 * 1024
+_SKIP_READ_SIZE = 1024 * 1024
+_MAGIC_NUMBERS = (
+    (b"\x1f\x8b", COMPRESSION_GZIP),
+    (b"\xfd7zXZ\x00", COMPRESSION_XZ),
+    (b"BZh", COMPRESSION_BZ2),
+)
+_MAGIC_LENGTH = max(len(magic) for magic, _ in _MAGIC_NUMBERS)
+_DECODING_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError)
+_XZ_FOOTER_SIZE = 12
+_XZ_HEADER_SIZE = 12
+
+_MAX_CACHED_IMAGES = 8
+
+_images: OrderedDict[Tuple[str, int, int], CompressedImage] = OrderedDict()
+_images_lock = Lock()
+
+
+class CompressedImageError(Exception):
+    def __init__(self, message: str, user_message: str):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+class _SeekPoint(NamedTuple):
+    uncompressed_offset: int
+    compressed_offset: int
+    # Decoder state at this point, None where a new stream starts.
+    decompressor: Optional[Any]
+
+
+def get_compression(path: str) -> Optional[str]:
+    """Compression format of a regular file, from its magic number."""
+    try:
+        if not stat.S_ISREG(os.stat(path).st_mode):
+            return None
+        with open(path, "rb") as image_file:
+            header = image_file.read(_MAGIC_LENGTH)
+    except OSError:
+        return None
+    return _get_compression_from_magic(header)
+
+
+def open_compressed_image(path: str) -> Optional[CompressedImage]:
+    """Shared image for a compressed file, None for any other source.
+
+    Images are cached per file, so seek points found by a scan serve later reads.
+    """
+    compression = get_compression(path)
+    if compression is None:
+        return None
+    file_stat = os.stat(path)
+    key = (os.path.realpath(path), file_stat.st_size, file_stat.st_mtime_ns)
+    with _images_lock:
+        image = _images.get(key)
+        if image is not None:
+            _images.move_to_end(key)
+            return image
+        image = CompressedImage(path, compression, file_stat.st_size)
+        # Images of an earlier version of the file are stale.
+        for stale_key in [cached for cached in _images if cached[0] == key[0]]:
+            _images.pop(stale_key).close()
+        _images[key] = image
+        while len(_images) > _MAX_CACHED_IMAGES:
+            _images.popitem(last=False)[1].close()
+        return image
+
+
+class CompressedImage:
+    def __init__(self, path: str, compression: str, compressed_size: int):
+        self.path = path
+        self.compression = compression
+        self.compressed_size = compressed_size
+        self._lock = Lock()
+        self._seek_points = [_SeekPoint(0, 0, None)]
+        self.seek_point_interval = SEEK_POINT_INTERVAL
+        self._size = _read_xz_size(path) if compression == COMPRESSION_XZ else None
+        # Furthest position decoded so far, for size estimates.
+        self._decoded_offsets = (0, 0)
+        self._shared_reader: Optional[CompressedReader] = None
+        self._shared_reader_lock = Lock()
+
+    @property
+    def size(self) -> Optional[int]:
+        """Uncompressed size, None until known."""
+        return self._size
+
+    def estimate_size(self) -> int:
+        if self._size is not None:
+            return self._size
+        uncompressed_offset, compressed_offset = self._decoded_offsets
+        if compressed_offset == 0:
+            return self.compressed_size
+        # Extrapolate the compression ratio seen so far.
+        return max(
+            uncompressed_offset,
+            self.compressed_size * uncompressed_offset // compressed_offset,
+        )
+
+    def open_reader(self) -> CompressedReader:
+        return CompressedReader(self)
+
+    def pread(self, length: int, offset: int) -> bytes:
+        """Random access read; short only at the end of the image."""
+        with self._shared_reader_lock:
+            if self._shared_reader is None:
+                self._shared_reader = self.open_reader()
+            return self._shared_reader.pread(length, offset)
+
+    def close(self) -> None:
+        """Release the file of the shared reader; `pread` reopens it."""
+        with self._shared_reader_lock:
+            if self._shared_reader is not None:
+                self._shared_reader.close()
+                self._shared_reader = None
+
+    def get_seek_point(self, offset: int) -> _SeekPoint:
+        with self._lock:
+            index = bisect_right(
+                [point.uncompressed_offset for point in self._seek_points], offset
+            )
+            return self._seek_points[index - 1]
+
+    def add_seek_point(self, point: _SeekPoint) -> None:
+        with self._lock:
+            offsets = [existing.uncompressed_offset for existing in self._seek_points]
+            index = bisect_right(offsets, point.uncompressed_offset)
+            previous = self._seek_points[index - 1]
+            # Readers decoding the same region find the same points.
+            if (
+                point.decompressor is not None
+                and point.uncompressed_offset - previous.uncompressed_offset
+                < self.seek_point_interval
+            ):
+                return
+            if previous.uncompressed_offset == point.uncompressed_offset:
+                return
+            self._seek_points.insert(index, point)
+            while (
+                sum(1 for kept in self._seek_points if kept.decompressor is not None)
+                > MAX_DECODER_SEEK_POINTS
+            ):
+                self._thin_seek_points()
+
+    def _thin_seek_points(self) -> None:
+        """Double the interval, keeping the decoder points spaced by it."""
+        self.seek_point_interval *= 2
+        kept: List[_SeekPoint] = []
+        for point in self._seek_points:
+            if (
+                point.decompressor is not None
+                and point.uncompressed_offset - kept[-1].uncompressed_offset
+                < self.seek_point_interval
+            ):
+                continue
+            kept.append(point)
+        self._seek_points = kept
+
+    def record_decoded(self, uncompressed_offset: int, compressed_offset: int) -> None:
+        if uncompressed_offset > self._decoded_offsets[0]:
+            self._decoded_offsets = (uncompressed_offset, compressed_offset)
+
+    def record_end(self, size: int) -> None:
+        if self._size is None:
+            log.info(f"compressed_image - {self.path} decodes to {size} bytes")
+        self._size = size
+
+
+class CompressedReader:
+    """Decoder over an image with its own position.
+
+    Sequential reads continue where the previous one stopped; other reads restart
+    from the closest seek point. Not thread-safe.
+    """
+
+    def __init__(self, image: CompressedImage):
+        self._image = image
+        try:
+            self._fd = os.open(image.path, os.O_RDONLY)
+        except OSError as error:
+            raise CompressedImageError(
+                f"Cannot open compressed image {image.path}: {error}",
+                f"Cannot open {image.path}.",
+            ) from error
+        self._start_at(_SeekPoint(0, 0, None))
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def pread(self, length: int, offset: int) -> bytes:
+        point = self._image.get_seek_point(offset)
+        if offset < self._position or point.uncompressed_offset > self._position:
+            self._start_at(point)
+        while self._position < offset:
+            if not self._read(min(offset - self._position, _SKIP_READ_SIZE)):
+                return b""
+        return self._read(length)
+
+    def readinto(self, target: memoryview, offset: int) -> int:
+        data = self.pread(len(target), offset)
+        target[: len(data)] = data
+        return len(data)
+
+    def _start_at(self, point: _SeekPoint) -> None:
+        self._position = point.uncompressed_offset
+        self._compressed_offset = point.compressed_offset
+        self._decompressor = (
+            _new_decompressor(self._image.compression)
+            if point.decompressor is None
+            else point.decompressor.copy()
+        )
+        self._input = b""
+        self._needs_input = True
+        self._next_seek_point = self._get_next_seek_point()
+
+    def _read(self, length: int) -> bytes:
+        chunks: List[bytes] = []
+        remaining = length
+        while remaining > 0:
+            output = self._decode(remaining)
+            if not output:
+                break
+            chunks.append(output)
+            remaining -= len(output)
+            self._position += len(output)
+        return b"".join(chunks)
+
+    def _decode(self, max_length: int) -> bytes:
+        """Up to `max_length` decoded bytes, empty at the end of the image."""
+        while True:
+            if self._decompressor.eof:
+                if not self._start_next_stream():
+                    return b""
+                continue
+
+            if self._needs_input and not self._input:
+                if not self._read_input():
+                    log.warning(
+                        f"compressed_image - {self._image.path} is truncated at "
+                        f"uncompressed offset {self._position}"
+                    )
+                    self._image.record_end(self._position)
+                    return b""
+                continue
+
+            try:
+                output = self._decompressor.decompress(self._input, max_length)
+            except _DECODING_ERRORS as error:
+                raise CompressedImageError(
+                    f"Cannot decode {self._image.path} at uncompressed offset "
+                    f"{self._position}: {error}",
+                    f"{self._image.path} is corrupted at offset {self._position}.",
+                ) from error
+            if self._image.compression == COMPRESSION_GZIP:
+                # zlib keeps the input it could not use yet in `unconsumed_tail`,
+                # which past the end of a member is also in `unused_data`.
+                self._input = (
+                    b"" if self._decompressor.eof else self._decompressor.unconsumed_tail
+                )
+                self._needs_input = len(output) < max_length
+            else:
+                self._input = b""
+                self._needs_input = self._decompressor.needs_input
+            if output:
+                return output
+
+    def _read_input(self) -> bool:
+        if self._position >= self._next_seek_point and self._image.compression == COMPRESSION_GZIP:
+            # No input is pending here, so the decoder copy is the whole state.
+            self._image.add_seek_point(
+                _SeekPoint(self._position, self._compressed_offset, self._decompressor.copy())
+            )
+            self._next_seek_point = self._get_next_seek_point()
+        data = self._pread_compressed(_COMPRESSED_READ_SIZE)
+        if not data:
+            return False
+        self._compressed_offset += len(data)
+        self._input = data
+        self._image.record_decoded(self._position, self._compressed_offset)
+        return True
+
+    def _get_next_seek_point(self) -> int:
+        interval = self._image.seek_point_interval
+        return (self._position // interval + 1) * interval
+
+    def _start_next_stream(self) -> bool:
+        """Continue with the next concatenated stream, False at the end."""
+        rest = self._decompressor.unused_data + self._input
+        while len(rest) < _MAGIC_LENGTH:
+            data = self._pread_compressed(_COMPRESSED_READ_SIZE)
+            if not data:
+                break
+            self._compressed_offset += len(data)
+            rest += data
+        if _get_compression_from_magic(rest) != self._image.compression:
+            # Trailing zero padding or garbage after the last stream.
+            self._image.record_end(self._position)
+            return False
+
+        stream_offset = self._compressed_offset - len(rest)
+        self._image.add_seek_point(_SeekPoint(self._position, stream_offset, None))
+        self._decompressor = _new_decompressor(self._image.compression)
+        self._input = rest
+        self._needs_input = False
+        return True
+
+    def _pread_compressed(self, length: int) -> bytes:
+        try:
+            return os.pread(self._fd, length, self._compressed_offset)
+        except OSError as error:
+            raise CompressedImageError(
+                f"Cannot read compressed image {self._image.path}: {error}",
+                f"Cannot read from {self._image.path}.",
+            ) from error
+
+
+def _get_compression_from_magic(header: bytes) -> Optional[str]:
+    for magic, compression in _MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def _new_decompressor(compression: str) -> Any:
+    if compression == COMPRESSION_GZIP:
+        # 16 + MAX_WBITS: gzip header and trailer.
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == COMPRESSION_XZ:
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    return bz2.BZ2Decompressor()
+
+
+def _read_xz_size(path: str) -> Optional[int]:
+    """Uncompressed size from the indexes of every stream, None if unreadable.
+
+    Streams are walked backwards from the end of the file: each footer gives the
+    size of the index before it, whose records give the size of each block.
+    """
+    try:
+        with open(path, "rb") as image_file:
+            position = image_file.seek(0, os.SEEK_END)
+            total = 0
+            while position > 0:
+                # Stream padding is made of 4-byte groups of zeros.
+                image_file.seek(position - 4)
+                if image_file.read(4) == bytes(4):
+                    position -= 4
+                    continue
+                image_file.seek(position - _XZ_FOOTER_SIZE)
+                footer = image_file.read(_XZ_FOOTER_SIZE)
+                if footer[-2:] != b"YZ":
+                    return None
+                index_size = (int.from_bytes(footer[4:8], "little") + 1) * 4
+                index_start = position - _XZ_FOOTER_SIZE - index_size
+                image_file.seek(index_start)
+                blocks_size, stream_size = _parse_xz_index(image_file.read(index_size))
+                total += stream_size
+                position = index_start - blocks_size - _XZ_HEADER_SIZE
+            return total if position == 0 else None
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _parse_xz_index(index: bytes) -> Tuple[int, int]:
+    """Compressed size of the blocks and uncompressed size of a stream."""
+    if index[0] != 0:
+        raise ValueError("not an xz index")
+    position = 1
+    record_count, position = _read_xz_varint(index, position)
+    blocks_size = 0
+    uncompressed_size = 0
+    for _ in range(record_count):
+        unpadded_size, position = _read_xz_varint(index, position)
+        record_size, position = _read_xz_varint(index, position)
+        blocks_size += (unpadded_size + 3) // 4 * 4
+        uncompressed_size += record_size
+    return blocks_size, uncompressed_size
+
+
+def _read_xz_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
@@ -0,0 +1,186 @@
+"""
+Files derived from a device's content and kept across runs, such as indexes.
+
+A fingerprint hashes the size and modification time of the backing files of
+image files and, for block devices and raw images, the device size, sector
+size, the first megabyte of the device and a few blocks sampled across it. The
+first megabyte holds the superblocks of common file systems, with their write
+time, mount count and free block count, and for ext2/3/4 the group
+descriptors, whose free block counts change with every allocation and release
+written back. A rewritten image, a reformatted partition or a file system
+modified since through its driver therefore gets a new fingerprint, and
+whatever was cached for the old one is no longer used.
+
+Writes that bypass the file system metadata, such as overwrites of file data
+in place, or writes by a mounted file system not yet flushed, go unnoticed:
+data cached for a device may then be stale, and a search narrowed by it may
+miss matches in the blocks written since. Users of the cache therefore do not
+reuse data cached for a device that is mounted, see
+`block_device_inventory.is_mounted`.
+
+Cached files live in `$XDG_CACHE_HOME/recoverpy`, named after the fingerprint.
+They start with a fixed-size header: a magic string identifying the kind of
+file, then JSON metadata. They are written to a temporary file renamed once
+complete, so a stopped or failed build leaves no partial cache file.
+"""
+
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+from types import ModuleType
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, cast
+
+from recoverpy.lib.storage.block_device_metadata import (DeviceIOError,
+                                                         get_device_info)
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     read_range)
+from recoverpy.lib.storage.split_image import get_split_segments
+from recoverpy.lib.storage.virtual_source import open_virtual_source
+from recoverpy.models.scan_range import ByteRange
+
+CACHE_HEADER_SIZE = 4096
+_SAMPLE_COUNT = 64
+_SAMPLE_SIZE = 4096
+_METADATA_SIZE = 1024 * 1024
+
+
+class DeviceCacheError(Exception):
+    def __init__(self, message: str, user_message: str):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+def get_device_fingerprint(path: str) -> str:
+    try:
+        return _hash_device(path)
+    except (OSError, DeviceIOError, BlockExtractionError) as error:
+        message = getattr(error, "user_message", f"Cannot read {path}.")
+        raise DeviceCacheError(f"Cannot fingerprint {path}: {error}", message) from error
+
+
+def _hash_device(path: str) -> str:
+    if open_virtual_source(path) is not None:
+        # The decoded size of compressed images is only estimated, and
+        # sampling them would decode them up to each sample.
+        digest = sha256(b"virtual")
+    else:
+        info = get_device_info(path)
+        digest = sha256(f"{info.size_bytes}:{info.logical_sector_size}".encode())
+        if info.size_bytes > 0:
+            digest.update(
+                read_range(path, 0, min(_METADATA_SIZE, info.size_bytes))
+            )
+        for offset in _get_sample_offsets(info.size_bytes):
+            length = min(_SAMPLE_SIZE, info.size_bytes - offset)
+            digest.update(read_range(path, offset, length))
+        if info.is_block_device:
+            return digest.hexdigest()
+    for backing_path in get_split_segments(path) or [path]:
+        backing_stat = os.stat(backing_path)
+        digest.update(f":{backing_stat.st_size}:{backing_stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def get_cache_path(fingerprint: str, suffix: str) -> Path:
+    """Cache file of `suffix` kind for the device with this fingerprint."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(cache_home) / "recoverpy" / f"{fingerprint[:32]}{suffix}"
+
+
+def write_cache_file(
+    cache_path: Path,
+    magic: bytes,
+    kind: str,
+    write_content: Callable[[BinaryIO], Optional[Dict[str, Any]]],
+) -> bool:
+    """Write a cache file of `kind` through a temporary file; False if
+    `write_content` gave up.
+
+    `write_content` writes what follows the header and returns the header
+    metadata, None to give up.
+    """
+    temporary_path = cache_path.with_name(f"{cache_path.name}.partial")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(b"\0" * CACHE_HEADER_SIZE)
+            header = write_content(cache_file)
+            if header is None:
+                return False
+            cache_file.seek(0)
+            cache_file.write(encode_cache_header(magic, header))
+        os.replace(temporary_path, cache_path)
+    except OSError as error:
+        raise DeviceCacheError(
+            f"Cannot write {kind} {cache_path}: {error}",
+            f"Cannot write {kind} file {cache_path}.",
+        ) from error
+    finally:
+        temporary_path.unlink(missing_ok=True)
+    return True
+
+
+def import_numpy(feature: str) -> ModuleType:
+    """The NumPy module, needed by `feature`; DeviceCacheError if it is not
+    installed."""
+    try:
+        import numpy
+    except ImportError as error:  # pragma: no cover - optional dependency
+        raise DeviceCacheError(
+            "NumPy is not installed",
+            f"{feature} needs NumPy: install recoverpy[index].",
+        ) from error
+    return numpy
+
+
+def get_flagged_ranges(
+    flags: Any, unit_size: int, start_offset: int, end_offset: int
+) -> List[ByteRange]:
+    """[start, end) byte ranges of the units set in the NumPy boolean array
+    `flags`, unit i covering [i * unit_size, (i + 1) * unit_size), clipped to
+    [start_offset, end_offset)."""
+    first_unit = start_offset // unit_size
+    indexes = flags[first_unit : -(-end_offset // unit_size)].nonzero()[0] + first_unit
+    if not len(indexes):
+        return []
+    # Positions where a run of consecutive units ends.
+    breaks = ((indexes[1:] - indexes[:-1]) != 1).nonzero()[0]
+    run_starts = [indexes[0], *indexes[breaks + 1]]
+    run_ends = [*(indexes[breaks] + 1), indexes[-1] + 1]
+    ranges: List[ByteRange] = []
+    for run_start, run_end in zip(run_starts, run_ends):
+        start = max(start_offset, int(run_start) * unit_size)
+        end = min(end_offset, int(run_end) * unit_size)
+        if start < end:
+            ranges.append((start, end))
+    return ranges
+
+
+def encode_cache_header(magic: bytes, header: Dict[str, Any]) -> bytes:
+    encoded = magic + json.dumps(header).encode("utf-8")
+    if len(encoded) > CACHE_HEADER_SIZE:
+        raise ValueError(f"cache header too long: {len(encoded)} bytes")
+    return encoded.ljust(CACHE_HEADER_SIZE, b"\0")
+
+
+def decode_cache_header(magic: bytes, data: bytes) -> Dict[str, Any]:
+    """Metadata of a header written by `encode_cache_header`; ValueError if
+    `data` is not such a header."""
+    if not data.startswith(magic):
+        raise ValueError("not a RecoverPy cache file of this kind")
+    header = json.loads(data[len(magic) : CACHE_HEADER_SIZE].rstrip(b"\0"))
+    if not isinstance(header, dict):
+        raise ValueError("invalid cache header")
+    return cast(Dict[str, Any], header)
+
+
+def _get_sample_offsets(size: int) -> List[int]:
+    if size <= 0:
+        return []
+    last_offset = max(0, size - _SAMPLE_SIZE)
+    step = max(1, last_offset // (_SAMPLE_COUNT - 1) // _SAMPLE_SIZE) * _SAMPLE_SIZE
+    offsets = list(range(0, last_offset, step))[: _SAMPLE_COUNT - 1]
+    return offsets + [last_offset]
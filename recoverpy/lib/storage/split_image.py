@@ -0,0 +1,239 @@
+"""
+Split raw disk images read as one contiguous device.
+
+Acquisition tools often write a raw image as numbered segment files
+(`disk.001`, `disk.002`, ... as written by FTK Imager or `split -d`). Given its
+first segment, a `SplitImage` addresses the whole image with offsets into the
+concatenated segments; reads crossing a segment edge are served from both
+files. Segment file descriptors are kept in a small shared pool instead of being
+reopened for every read. The last `_MAX_CACHED_IMAGES` images opened keep their
+pools; older ones close their descriptors.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import stat
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+from typing import List, NamedTuple, Optional, Tuple
+
+from recoverpy.log.logger import log
+
+# Images with thousands of segments must not exhaust the file descriptor limit.
+MAX_OPEN_SEGMENTS = 32
+_SEGMENT_SUFFIX = re.compile(r"^(?P<stem>.+\.)(?P<number>\d{3,})$")
+_FIRST_SEGMENT_NUMBERS = (0, 1)
+_MAX_CACHED_IMAGES = 8
+
+_images: OrderedDict[Tuple[Tuple[str, int, int], ...], SplitImage] = OrderedDict()
+_images_lock = Lock()
+
+
+class SplitImageError(Exception):
+    def __init__(self, message: str, user_message: str):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+class _Segment(NamedTuple):
+    path: str
+    start_offset: int
+    size: int
+
+
+def get_split_segments(path: str) -> List[str]:
+    """Ordered segment files of the image starting at `path`.
+
+    Empty unless `path` is the first of at least two consecutively numbered
+    regular files, so a lone `.001` file is read as a plain image.
+    """
+    match = _SEGMENT_SUFFIX.match(path)
+    if match is None or int(match.group("number")) not in _FIRST_SEGMENT_NUMBERS:
+        return []
+    stem = match.group("stem")
+    width = len(match.group("number"))
+    number = int(match.group("number"))
+    segments = []
+    while True:
+        segment_path = f"{stem}{number:0{width}d}"
+        try:
+            if not stat.S_ISREG(os.stat(segment_path).st_mode):
+                break
+        except OSError:
+            break
+        segments.append(segment_path)
+        number += 1
+    return segments if len(segments) > 1 else []
+
+
+def open_split_image(path: str) -> Optional[SplitImage]:
+    """Shared image for the first segment of a split image, None otherwise.
+
+    Images are cached per set of segments, so every reader shares one pool.
+    """
+    segment_paths = get_split_segments(path)
+    if not segment_paths:
+        return None
+    try:
+        segment_stats = [os.stat(segment_path) for segment_path in segment_paths]
+    except OSError:
+        return None
+    key = tuple(
+        (os.path.realpath(segment_path), segment_stat.st_size, segment_stat.st_mtime_ns)
+        for segment_path, segment_stat in zip(segment_paths, segment_stats)
+    )
+    with _images_lock:
+        image = _images.get(key)
+        if image is not None:
+            _images.move_to_end(key)
+            return image
+        image = SplitImage(
+            path,
+            [
+                (segment_path, segment_stat.st_size)
+                for segment_path, segment_stat in zip(segment_paths, segment_stats)
+            ],
+        )
+        # Images of an earlier version of the segments are stale.
+        for stale_key in [cached for cached in _images if cached[0][0] == key[0][0]]:
+            _images.pop(stale_key).close_segments()
+        _images[key] = image
+        while len(_images) > _MAX_CACHED_IMAGES:
+            _images.popitem(last=False)[1].close_segments()
+        return image
+
+
+class SplitImage:
+    """Segments of a split image addressed as one byte range. Thread-safe."""
+
+    def __init__(self, path: str, segments: List[Tuple[str, int]]):
+        self.path = path
+        self._segments: List[_Segment] = []
+        offset = 0
+        for segment_path, segment_size in segments:
+            self._segments.append(_Segment(segment_path, offset, segment_size))
+            offset += segment_size
+        self._segment_starts = [segment.start_offset for segment in self._segments]
+        self._size = offset
+        self._pool = _SegmentPool(self)
+        log.info(
+            f"split_image - {path} has {len(self._segments)} segments, {offset} bytes"
+        )
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def estimate_size(self) -> int:
+        return self._size
+
+    def open_reader(self) -> SplitImage:
+        # Reads carry their own offsets, so the image is its own reader.
+        return self
+
+    def close(self) -> None:
+        """Nothing to release per reader; pooled descriptors stay open."""
+
+    def close_segments(self) -> None:
+        """Close the pooled descriptors; later reads close theirs when done."""
+        self._pool.close()
+
+    def pread(self, length: int, offset: int) -> bytes:
+        """Random access read; short only at the end of the image."""
+        buffer = bytearray(max(0, min(length, self._size - offset)))
+        read_len = self.readinto(memoryview(buffer), offset)
+        return bytes(buffer[:read_len])
+
+    def readinto(self, target: memoryview, offset: int) -> int:
+        total = 0
+        while total < len(target) and offset + total < self._size:
+            position = offset + total
+            index = bisect_right(self._segment_starts, position) - 1
+            segment = self._segments[index]
+            segment_offset = position - segment.start_offset
+            length = min(len(target) - total, segment.size - segment_offset)
+            read_len = self._pool.preadv(
+                index, target[total : total + length], segment_offset
+            )
+            total += read_len
+            if read_len < length:
+                # A segment shrank since it was listed: the image ends here.
+                break
+        return total
+
+    def get_segment(self, index: int) -> _Segment:
+        return self._segments[index]
+
+
+class _SegmentPool:
+    """Least recently used segment descriptors, at most `MAX_OPEN_SEGMENTS`.
+
+    Descriptors in use by a read are never closed; the pool may briefly exceed
+    its limit while more reads than that are in flight.
+    """
+
+    def __init__(self, image: SplitImage):
+        self._image = image
+        self._lock = Lock()
+        # Segment index -> [fd, reads in flight].
+        self._entries: OrderedDict[int, List[int]] = OrderedDict()
+        self._closed = False
+
+    def preadv(self, index: int, target: memoryview, offset: int) -> int:
+        fd = self._acquire(index)
+        segment_path = self._image.get_segment(index).path
+        try:
+            return os.preadv(fd, [target], offset)
+        except OSError as error:
+            raise SplitImageError(
+                f"Cannot read segment {segment_path}: {error}",
+                f"Cannot read from {segment_path}.",
+            ) from error
+        finally:
+            self._release(index)
+
+    def _acquire(self, index: int) -> int:
+        with self._lock:
+            entry = self._entries.get(index)
+            if entry is None:
+                segment_path = self._image.get_segment(index).path
+                try:
+                    fd = os.open(segment_path, os.O_RDONLY)
+                except OSError as error:
+                    raise SplitImageError(
+                        f"Cannot open segment {segment_path}: {error}",
+                        f"Cannot open {segment_path}.",
+                    ) from error
+                entry = [fd, 0]
+                self._entries[index] = entry
+            self._entries.move_to_end(index)
+            entry[1] += 1
+            self._evict()
+            return entry[0]
+
+    def _release(self, index: int) -> None:
+        with self._lock:
+            self._entries[index][1] -= 1
+            self._evict()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._evict()
+
+    def _evict(self) -> None:
+        excess = len(self._entries) - (0 if self._closed else MAX_OPEN_SEGMENTS)
+        for index, (fd, users) in list(self._entries.items()):
+            if excess <= 0:
+                return
+            if users == 0:
+                os.close(fd)
+                del self._entries[index]
+                excess -= 1
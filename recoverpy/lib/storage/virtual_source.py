@@ -0,0 +1,30 @@
+"""
+Image files read as one device through something other than a single fd.
+
+Compressed images are decoded on the fly and split images are concatenated from
+their segments. Both are addressed with offsets into the device they present
+and share the same interface: `size`, `estimate_size()`, `pread(length, offset)`
+and `open_reader()`, whose reader has `readinto(target, offset)` and `close()`.
+"""
+
+from typing import Optional, Union
+
+from recoverpy.lib.storage.compressed_image import (CompressedImage,
+                                                    CompressedImageError,
+                                                    CompressedReader,
+                                                    open_compressed_image)
+from recoverpy.lib.storage.split_image import (SplitImage, SplitImageError,
+                                               open_split_image)
+
+VirtualSource = Union[CompressedImage, SplitImage]
+VirtualSourceReader = Union[CompressedReader, SplitImage]
+VIRTUAL_SOURCE_ERRORS = (CompressedImageError, SplitImageError)
+
+
+def open_virtual_source(path: str) -> Optional[VirtualSource]:
+    """Shared virtual source for `path`, None for devices and plain images."""
+    split_image = open_split_image(path)
+    if split_image is not None:
+        return split_image
+    return open_compressed_image(path)
+
@@ -2,6 +2,7 @@
 
 from re import findall
 
+from recoverpy.lib.filesystem.block_size import get_view_block_size
 from recoverpy.lib.storage.block_device_metadata import get_logical_block_size
 
 
@@ -14,7 +15,8 @@ def get_printable(result: str) -> str:
 
 
 def get_block_size(partition: str) -> int:
-    return get_logical_block_size(partition)
+    """Filesystem block size of the partition, or its logical sector size."""
+    return get_view_block_size(partition, get_logical_block_size(partition))
 
 
 def get_inode(string: str) -> int:
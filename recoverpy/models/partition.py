@@ -1,7 +1,7 @@
 """Domain model describing partitions/devices presented in the UI."""
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 
 @dataclass
@@ -13,6 +13,9 @@ class Partition:
     size_bytes: int = 0
     device_type: str = "unknown"
     device_path: Optional[str] = None
+    # Whole disks holding the device, empty when unknown. Scans of devices
+    # sharing a disk compete for the same heads.
+    physical_disks: Tuple[str, ...] = ()
 
     def get_full_name(self) -> str:
         return self.device_path or f"/dev/{self.name}"
@@ -0,0 +1,106 @@
+"""Byte sub-range of a device to scan, given as offsets or percentages."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+ByteRange = Tuple[int, int]
+
+# Binary multiples, matching the sizes shown for partitions.
+_UNIT_FACTORS = {"k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+class ScanRangeError(Exception):
+    def __init__(self, message: str, user_message: str):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+@dataclass(frozen=True)
+class ScanOffset:
+    """An absolute byte offset, or a percentage of the device size."""
+
+    value: float
+    is_percent: bool = False
+
+    def resolve(self, size_bytes: int) -> int:
+        if self.is_percent:
+            return int(size_bytes * self.value / 100)
+        if size_bytes <= 0:
+            return int(self.value)
+        return min(int(self.value), size_bytes)
+
+
+def parse_scan_offset(text: str) -> Optional[ScanOffset]:
+    """Parse `4096`, `0x1000`, `512M` or `25%`; an empty string means unset."""
+    value = text.strip().lower()
+    if not value:
+        return None
+    try:
+        if value.endswith("%"):
+            percent = float(value[:-1])
+            if not 0 <= percent <= 100:
+                raise ValueError(f"{percent} is not a percentage")
+            return ScanOffset(percent, is_percent=True)
+
+        factor = _UNIT_FACTORS.get(value[-1], 1)
+        if factor > 1:
+            value = value[:-1]
+        offset = int(value, 16) if value.startswith("0x") else int(value)
+        if offset < 0:
+            raise ValueError(f"{offset} is negative")
+        return ScanOffset(offset * factor)
+    except ValueError as error:
+        raise ScanRangeError(
+            f"Invalid scan offset {text!r}: {error}",
+            f"Invalid offset `{text.strip()}`: use bytes (4096, 0x1000, 512M) or a percentage (25%).",
+        ) from error
+
+
+def resolve_scan_range(
+    start: Optional[ScanOffset], end: Optional[ScanOffset], size_bytes: int
+) -> Tuple[int, Optional[int]]:
+    """Return the [start, end) byte range to scan, end None meaning the device end."""
+    start_offset = start.resolve(size_bytes) if start is not None else 0
+    end_offset = end.resolve(size_bytes) if end is not None else None
+    if end_offset is not None and end_offset <= start_offset:
+        raise ScanRangeError(
+            f"Empty scan range [{start_offset}, {end_offset})",
+            "The end of the scanned range must come after its start.",
+        )
+    if size_bytes > 0 and start_offset >= size_bytes:
+        raise ScanRangeError(
+            f"Scan start {start_offset} is past the device end {size_bytes}",
+            "The start of the scanned range is past the end of the device.",
+        )
+    return start_offset, end_offset
+
+
+def intersect_ranges(
+    first: Sequence[ByteRange], second: Sequence[ByteRange]
+) -> List[ByteRange]:
+    """Intersection of two sorted lists of disjoint [start, end) ranges."""
+    ranges: List[ByteRange] = []
+    first_index = second_index = 0
+    while first_index < len(first) and second_index < len(second):
+        start = max(first[first_index][0], second[second_index][0])
+        end = min(first[first_index][1], second[second_index][1])
+        if start < end:
+            ranges.append((start, end))
+        if first[first_index][1] < second[second_index][1]:
+            first_index += 1
+        else:
+            second_index += 1
+    return ranges
+
+
+def merge_close_ranges(ranges: Sequence[ByteRange], max_gap: int) -> List[ByteRange]:
+    """Sorted disjoint ranges with the gaps of at most `max_gap` bytes filled."""
+    merged: List[ByteRange] = []
+    for start, end in ranges:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
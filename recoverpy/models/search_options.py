@@ -0,0 +1,70 @@
+"""User-tunable scan options shared by the CLI, UI screens and search engine."""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from recoverpy.lib.search.binary_scanner import (DEFAULT_SCAN_WORKERS,
+                                                 IO_POLICY_CACHED,
+                                                 SCAN_BACKEND_READ)
+from recoverpy.models.scan_range import ScanOffset
+
+DEFAULT_REGEX_MAX_MATCH_LEN = 256
+
+
+@dataclass
+class SearchOptions:
+    scan_workers: int = DEFAULT_SCAN_WORKERS
+    # Disk image files offered next to the partitions, possibly gzip, xz or
+    # bz2 compressed.
+    image_paths: List[str] = field(default_factory=lambda: [])
+    # Extra keywords searched in the same device pass as the typed search
+    # string. Any keyword matching produces a result.
+    keywords: List[str] = field(default_factory=lambda: [])
+    # Treat the search string as a bytes regular expression. Matches longer
+    # than `max_match_len` may be cut at chunk edges.
+    regex: bool = False
+    max_match_len: int = DEFAULT_REGEX_MAX_MATCH_LEN
+    # "mmap" maps disk image files instead of reading them in chunks.
+    scan_backend: str = SCAN_BACKEND_READ
+    # "drop-behind" evicts scanned pages from the page cache and "direct"
+    # bypasses it with O_DIRECT, so full-device scans do not evict hot data.
+    io_policy: str = IO_POLICY_CACHED
+    # Derive the chunk size from the device queue hints and tune it online.
+    auto_chunk_size: bool = False
+    # Bandwidth cap in MB/s, 0 meaning unlimited. Adjustable during a search.
+    bandwidth_limit_mb: int = 0
+    # I/O scheduling class ("best-effort" or "idle") and CPU niceness of the
+    # scan; None keeps the current ones.
+    io_class: Optional[str] = None
+    niceness: Optional[int] = None
+    # Keep scanning past unreadable sectors, recording them in an error map
+    # which is written to `error_map_path` when the scan ends, if set.
+    tolerate_read_errors: bool = False
+    error_map_path: Optional[str] = None
+    # Periodically save scan checkpoints to `checkpoint_path`; resuming from
+    # a checkpoint also keeps it updated unless another path is given.
+    checkpoint_path: Optional[str] = None
+    resume_from: Optional[str] = None
+    # Only scan matches starting in [scan_start, scan_end), None meaning the
+    # device start and end.
+    scan_start: Optional[ScanOffset] = None
+    scan_end: Optional[ScanOffset] = None
+    # Share device reads with the other searches of the same device in this
+    # process. Shared reads ignore the worker count, backend, I/O policy,
+    # read error tolerance and checkpoints.
+    shared_scan: bool = False
+    # Only scan the regions the device's trigram index, built beforehand with
+    # `--build-index`, reports as possible matches. Searches without a usable
+    # index, regular expressions and shared scans read the whole range.
+    use_index: bool = False
+    # Skip the blocks that cannot hold plain text (compressed, encrypted or
+    # binary data) according to the device's block map, built beforehand with
+    # `--classify-blocks`. Searches without a current map read every block.
+    text_only: bool = False
+    # Only scan the blocks the filesystem of the device (ext2/3/4 or FAT32)
+    # marks free, where deleted data lives. Other devices are read in full.
+    unallocated_only: bool = False
+    # Drop the hits in blocks owned by a live file of the device's ext2/3/4
+    # filesystem, according to a map of its inodes built on first use.
+    # Unlike `unallocated_only`, metadata, the journal and slack are scanned.
+    skip_live_files: bool = False
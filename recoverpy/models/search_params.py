@@ -1,12 +1,42 @@
 """Immutable-ish search request parameters derived from user input."""
 
+from typing import List, Optional
+
 from recoverpy.lib.text.text_processing import get_block_size
+from recoverpy.models.scan_range import resolve_scan_range
+from recoverpy.models.search_options import SearchOptions
 
 
 class SearchParams:
-    def __init__(self, partition: str, search_string: str):
+    def __init__(
+        self,
+        partition: str,
+        search_string: str,
+        options: Optional[SearchOptions] = None,
+        device_size_bytes: int = 0,
+    ):
         self.search_string = search_string
         self.partition = partition
         self.block_size = get_block_size(partition)
         self.searched_lines = search_string.strip().splitlines()
         self.is_multi_line = len(self.searched_lines) > 1
+        self.options = options or SearchOptions()
+        self.is_regex_search = self.options.regex
+        self.is_keyword_search = (
+            len(self.options.keywords) > 0 and not self.is_regex_search
+        )
+        self.patterns = self._get_patterns()
+        # Byte range to scan, end None meaning the end of the device.
+        self.start_offset, self.end_offset = resolve_scan_range(
+            self.options.scan_start, self.options.scan_end, device_size_bytes
+        )
+
+    def _get_patterns(self) -> List[str]:
+        if self.is_regex_search:
+            return [self.search_string.strip()]
+        if not self.is_keyword_search:
+            # Multi-line searches scan for the first line and validate the
+            # remaining lines around each hit.
+            return self.searched_lines[:1]
+        patterns = self.searched_lines + self.options.keywords
+        return [pattern for pattern in dict.fromkeys(patterns) if pattern]
@@ -2,8 +2,63 @@
 
 from __future__ import annotations
 
+from time import monotonic
+
+# Throughput is sampled at most this often, so short bursts between chunks
+# do not make the displayed rate jitter.
+_THROUGHPUT_SAMPLE_SECONDS = 0.5
+# Weight of the newest sample in the exponentially smoothed throughput.
+_THROUGHPUT_SMOOTHING = 0.3
+
+
 class SearchProgress:
     def __init__(self) -> None:
         self.result_count = 0
         self.progress_percent = 0.0
         self.error_message: str | None = None
+        self.total_bytes = 0
+        self.bytes_scanned = 0
+        # Smoothed scan rate in bytes per second, None until first sampled.
+        self.bytes_per_second: float | None = None
+        # Seconds from the start of the scan to the first hit.
+        self.time_to_first_hit: float | None = None
+        self._started_at: float | None = None
+        self._sampled_at = 0.0
+        self._sampled_bytes = 0
+
+    def start(self, total_bytes: int) -> None:
+        self.total_bytes = total_bytes
+        self._started_at = self._sampled_at = monotonic()
+        self._sampled_bytes = self.bytes_scanned = 0
+
+    def update_bytes_scanned(self, bytes_scanned: int) -> None:
+        self.bytes_scanned = max(self.bytes_scanned, bytes_scanned)
+        if self.total_bytes > 0:
+            ratio = min(1.0, self.bytes_scanned / self.total_bytes)
+            self.progress_percent = ratio * 100
+        else:
+            self.progress_percent = 100.0
+
+        now = monotonic()
+        elapsed = now - self._sampled_at
+        if elapsed < _THROUGHPUT_SAMPLE_SECONDS:
+            return
+        rate = (self.bytes_scanned - self._sampled_bytes) / elapsed
+        self.bytes_per_second = (
+            rate
+            if self.bytes_per_second is None
+            else _THROUGHPUT_SMOOTHING * rate
+            + (1 - _THROUGHPUT_SMOOTHING) * self.bytes_per_second
+        )
+        self._sampled_at = now
+        self._sampled_bytes = self.bytes_scanned
+
+    def record_hit(self) -> None:
+        if self.time_to_first_hit is None and self._started_at is not None:
+            self.time_to_first_hit = monotonic() - self._started_at
+
+    def get_eta_seconds(self) -> float | None:
+        """Seconds left at the smoothed rate, None while unknown."""
+        if not self.bytes_per_second:
+            return None
+        return max(0, self.total_bytes - self.bytes_scanned) / self.bytes_per_second
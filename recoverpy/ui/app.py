@@ -2,7 +2,8 @@
 Defines the RecoverpyApp class which serves as the main app orchestrator for the application.
 """
 
-from typing import Dict, cast
+from dataclasses import replace
+from typing import Any, Dict, Optional, cast
 
 from textual.app import App, ComposeResult
 from textual.binding import Binding
@@ -10,7 +11,10 @@ from textual.screen import Screen
 from textual.widgets import Footer
 
 from recoverpy.lib.env_check import verify_app_environment
+from recoverpy.lib.search.scan_checkpoint import (CheckpointError,
+                                                  load_checkpoint)
 from recoverpy.log.logger import log
+from recoverpy.models.search_options import SearchOptions
 from recoverpy.ui.css import get_css
 from recoverpy.ui.screens.modal import install_and_push_modal
 from recoverpy.ui.screens.screen_params import ParamsScreen
@@ -34,15 +38,23 @@ class RecoverpyApp(App[None]):
         Binding("ctrl+q", "quit", "Quit"),
     ]
 
-    def __init__(self, *args, **kwargs) -> None:  # type: ignore
+    def __init__(
+        self,
+        *args: Any,
+        search_options: Optional[SearchOptions] = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(*args, **kwargs)
         self._is_user_root = False
+        self._search_options = search_options or SearchOptions()
         self._initialize_screens()
         log.debug("Recoverpy app initialized")
 
     def _initialize_screens(self) -> None:
         self.screens = {
-            "params": ParamsScreen(name="params"),
+            "params": ParamsScreen(
+                name="params", image_paths=self._search_options.image_paths
+            ),
             "search": SearchScreen(name="search"),
             "result": ResultScreen(name="result"),
             "save": SaveScreen(name="save"),
@@ -60,6 +72,8 @@ class RecoverpyApp(App[None]):
         await self.push_screen("params")
         await verify_app_environment(self)
         self.notify("Press ? for keyboard help", title="Tip", timeout=5)
+        if self._search_options.resume_from:
+            await self._resume_search(self._search_options.resume_from)
 
     def _get_keyboard_help_message(self) -> str:
         hidden_keys = {"left", "right", "up", "down"}
@@ -93,7 +107,36 @@ class RecoverpyApp(App[None]):
         log.info("User clicked continue on parameters screen")
         await self.push_screen("search")
         self.get_screen("search").post_message(
-            SearchScreen.Start(message.searched_string, message.selected_partition)
+            SearchScreen.Start(
+                message.searched_string,
+                message.selected_partition,
+                replace(
+                    self._search_options,
+                    scan_start=message.scan_start,
+                    scan_end=message.scan_end,
+                ),
+            )
+        )
+
+    async def on_params_screen_resume(self, message: ParamsScreen.Resume) -> None:
+        log.info("User clicked resume on parameters screen")
+        await self._resume_search(message.checkpoint_path)
+
+    async def _resume_search(self, checkpoint_path: str) -> None:
+        try:
+            checkpoint = load_checkpoint(checkpoint_path)
+        except CheckpointError as error:
+            log.error(f"app - {error}")
+            self.notify(error.user_message, title="Cannot resume", severity="error")
+            return
+
+        await self.push_screen("search")
+        self.get_screen("search").post_message(
+            SearchScreen.Start(
+                checkpoint.search_string,
+                checkpoint.device_path,
+                checkpoint.restore_options(self._search_options, checkpoint_path),
+            )
         )
 
     async def on_search_screen_open(self, message: SearchScreen.Open) -> None:
@@ -3,17 +3,19 @@ Allows user to enter search string and select partition."""
 
 from __future__ import annotations
 
-from typing import Generator, Optional
+from typing import Any, Generator, Optional, Sequence
 
 from textual.app import ComposeResult
 from textual.binding import Binding
-from textual.containers import Container
+from textual.containers import Container, Horizontal
 from textual.message import Message
 from textual.screen import Screen
 from textual.widgets import Button, Checkbox, Input, Label
 
 from recoverpy.log.logger import log
 from recoverpy.models.partition import Partition
+from recoverpy.models.scan_range import (ScanOffset, ScanRangeError,
+                                         parse_scan_offset, resolve_scan_range)
 from recoverpy.ui.widgets.partition_list import PartitionList
 
 
@@ -25,37 +27,84 @@ class ParamsScreen(Screen[None]):
 
     _partition_list: Optional[PartitionList] = None
 
+    def __init__(
+        self, *args: Any, image_paths: Sequence[str] = (), **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._image_paths = image_paths
+
     class Continue(Message):
-        def __init__(self, searched_string: str, selected_partition: str) -> None:
+        def __init__(
+            self,
+            searched_string: str,
+            selected_partition: str,
+            scan_start: Optional[ScanOffset] = None,
+            scan_end: Optional[ScanOffset] = None,
+        ) -> None:
             super().__init__()
             self.searched_string = searched_string
             self.selected_partition = selected_partition
+            self.scan_start = scan_start
+            self.scan_end = scan_end
+
+    class Resume(Message):
+        def __init__(self, checkpoint_path: str) -> None:
+            super().__init__()
+            self.checkpoint_path = checkpoint_path
 
     def compose(self) -> ComposeResult:
         self._search_input = Input(
             name="search", id="search-input", placeholder="Search"
         )
         self._filter_checkbox = Checkbox("Filter partitions", True)
+        self._scan_start_input = Input(
+            name="scan-start",
+            id="scan-start-input",
+            placeholder="Start: 0x1000, 512M or 25% (optional)",
+        )
+        self._scan_end_input = Input(
+            name="scan-end",
+            id="scan-end-input",
+            placeholder="End: 0x2000, 1G or 50% (optional)",
+        )
         self._start_search_button = Button(
             label="Start search", id="start-search-button", disabled=True, variant="primary"
         )
+        self._checkpoint_input = Input(
+            name="checkpoint",
+            id="checkpoint-input",
+            placeholder="Checkpoint file of an interrupted search",
+        )
+        self._resume_button = Button(
+            label="Resume", id="resume-button", disabled=True, variant="default"
+        )
 
         yield Label("Type a text to search for:")
         yield self._search_input
         yield Label("Available partitions:")
         yield from self._yield_partition_list()
-        yield Container(self._start_search_button, self._filter_checkbox)
+        yield Label("Range of the partition to scan:")
+        yield Horizontal(self._scan_start_input, self._scan_end_input, id="scan-range")
+        yield Label("Or resume an interrupted search:")
+        yield self._checkpoint_input
+        yield Container(
+            self._start_search_button, self._resume_button, self._filter_checkbox
+        )
         log.debug("params - Parameters screen composed")
 
     def _yield_partition_list(self) -> Generator[PartitionList, None, None]:
         if not self._partition_list:
-            self._partition_list = PartitionList()
+            self._partition_list = PartitionList(image_paths=self._image_paths)
         yield self._partition_list
 
     def on_mount(self) -> None:
         self.set_focus(self._search_input)
 
-    async def on_button_pressed(self) -> None:
+    async def on_button_pressed(self, event: Optional[Button.Pressed] = None) -> None:
+        if event is not None and event.button.id == "resume-button":
+            self._resume_search()
+            return
+
         if not self._partition_list:
             log.warning("Partition list not initialized")
             self.notify("Partition list is not available yet.", severity="warning")
@@ -77,16 +126,39 @@ class ParamsScreen(Screen[None]):
         selected_partition: Partition = self._partition_list.list_items[
             highlighted_child.id
         ]
+        try:
+            scan_start = parse_scan_offset(self._scan_start_input.value)
+            scan_end = parse_scan_offset(self._scan_end_input.value)
+            resolve_scan_range(scan_start, scan_end, selected_partition.size_bytes)
+        except ScanRangeError as error:
+            log.warning(f"params - {error}")
+            self.notify(error.user_message, severity="warning")
+            return
 
         log.info(
             f"User selected partition {selected_partition.get_full_name()} and search string `{searched_string}`"
         )
 
         self.app.post_message(
-            self.Continue(searched_string, selected_partition.get_full_name())
+            self.Continue(
+                searched_string,
+                selected_partition.get_full_name(),
+                scan_start,
+                scan_end,
+            )
         )
 
+    def _resume_search(self) -> None:
+        checkpoint_path = self._checkpoint_input.value.strip()
+        log.info(f"User resumes search from checkpoint {checkpoint_path}")
+        self.app.post_message(self.Resume(checkpoint_path))
+
     async def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "checkpoint-input":
+            self._resume_button.disabled = len(event.value.strip()) == 0
+            return
+        if event.input.id != "search-input":
+            return
         self._start_search_button.disabled = len(event.value.strip()) == 0
 
     async def on_checkbox_changed(self, event: Checkbox.Changed) -> None:
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from asyncio import Task, create_task
+from typing import Optional
 
 from textual.app import ComposeResult
 from textual.binding import Binding
@@ -12,25 +13,40 @@ from textual.screen import Screen
 from textual.timer import Timer
 from textual.widgets import Button, Label
 
+from recoverpy.lib.search.scan_checkpoint import CheckpointError
+from recoverpy.lib.search.scan_error_map import ScanErrorMap
 from recoverpy.lib.search.search_engine import SearchEngine
 from recoverpy.lib.storage.block_device_metadata import DeviceIOError
 from recoverpy.log.logger import log
+from recoverpy.models.scan_range import ScanRangeError
+from recoverpy.models.search_options import SearchOptions
 from recoverpy.models.search_result import SearchResult
 from recoverpy.ui.widgets.search_result_list import SearchResultList
 
+# Bandwidth caps offered by the Limit button, in MB/s; 0 means unlimited.
+_BANDWIDTH_LIMIT_STEPS_MB = (0, 500, 200, 100, 50, 20, 10)
+
 
 class SearchScreen(Screen[None]):
     BINDINGS = [
         Binding("o", "open_result", "Open result"),
         Binding("p", "toggle_pause", "Pause/resume"),
+        Binding("l", "cycle_limit", "Bandwidth limit"),
+        Binding("e", "export_error_map", "Export error map"),
         Binding("q", "exit_screen", "Exit"),
     ]
 
     class Start(Message):
-        def __init__(self, searched_string: str, selected_partition: str) -> None:
+        def __init__(
+            self,
+            searched_string: str,
+            selected_partition: str,
+            options: Optional[SearchOptions] = None,
+        ) -> None:
             super().__init__()
             self.searched_string = searched_string
             self.selected_partition = selected_partition
+            self.options = options
 
     class Open(Message):
         def __init__(self, inode: int, block_size: int, partition: str) -> None:
@@ -55,6 +71,14 @@ class SearchScreen(Screen[None]):
         self._result_count_label = Label("0", id="result-count")
         self._progress_title_label = Label("- progress -", id="progress-title")
         self._progress_label = Label("0.00%", id="progress")
+        self._throughput_label = Label("-", id="throughput")
+        self._eta_label = Label("-", id="eta")
+        self._first_hit_label = Label("-", id="first-hit")
+        self._read_errors_title = self.InfoContainer(
+            Label("- read errors -", id="read-errors-title")
+        )
+        self._read_errors_label = Label("0", id="read-errors")
+        self._read_errors_container = self.InfoContainer(self._read_errors_label)
         self._open_button = Button(
             label="Open", id="open-button", disabled=True, variant="primary"
         )
@@ -66,14 +90,27 @@ class SearchScreen(Screen[None]):
         yield Vertical(
             self.InfoContainer(self._progress_title_label),
             self.InfoContainer(self._progress_label),
+            self.InfoContainer(Label("- throughput -", id="throughput-title")),
+            self.InfoContainer(self._throughput_label),
+            self.InfoContainer(Label("- time left -", id="eta-title")),
+            self.InfoContainer(self._eta_label),
+            self.InfoContainer(Label("- first hit after -", id="first-hit-title")),
+            self.InfoContainer(self._first_hit_label),
             self.InfoContainer(Label("- status -", id="status-title")),
             self.InfoContainer(self._search_status_label),
             self.InfoContainer(Label("- result count -", id="result-count-title")),
             self.InfoContainer(self._result_count_label),
+            self._read_errors_title,
+            self._read_errors_container,
             id="info-bar",
         )
+        self._limit_button = Button(
+            label=_format_limit(0), id="limit-button", disabled=True, variant="default"
+        )
+
         yield self._open_button
         yield self._pause_button
+        yield self._limit_button
         yield Button("Exit", id="exit-button", variant="error")
         log.debug("search - Search screen composed")
 
@@ -81,9 +118,9 @@ class SearchScreen(Screen[None]):
         self._search_error_notified = False
         try:
             self.search_engine = SearchEngine(
-                message.selected_partition, message.searched_string
+                message.selected_partition, message.searched_string, message.options
             )
-        except DeviceIOError as error:
+        except (DeviceIOError, CheckpointError, ScanRangeError) as error:
             log.error(f"search - {error}")
             self.notify(error.user_message, severity="error")
             self.app.pop_screen()
@@ -91,6 +128,11 @@ class SearchScreen(Screen[None]):
         self._search_status_label.update("Searching...")
         self._pause_button.disabled = False
         self._pause_button.label = "Pause"
+        self._limit_button.disabled = False
+        self._limit_button.label = _format_limit(self.search_engine.get_bandwidth_limit())
+        # Read errors only exist when the search tolerates them.
+        self._read_errors_title.display = self.search_engine.error_map is not None
+        self._read_errors_container.display = self.search_engine.error_map is not None
         self.set_focus(self._search_result_list)
         await self._start_search_engine()
 
@@ -121,9 +163,14 @@ class SearchScreen(Screen[None]):
         self._result_count_label.update(
             str(self.search_engine.search_progress.result_count)
         )
-        self._progress_label.update(
-            f"{self.search_engine.search_progress.progress_percent:.2f}%"
-        )
+        progress = self.search_engine.search_progress
+        self._progress_label.update(f"{progress.progress_percent:.2f}%")
+        if progress.bytes_per_second is not None:
+            self._throughput_label.update(f"{_format_bytes(progress.bytes_per_second)}/s")
+        self._eta_label.update(_format_duration(progress.get_eta_seconds()))
+        self._first_hit_label.update(_format_duration(progress.time_to_first_hit))
+        if self.search_engine.error_map is not None:
+            self._read_errors_label.update(_format_read_errors(self.search_engine.error_map))
         if self.search_engine.is_paused():
             self._search_status_label.update("Paused")
         elif int(self.search_engine.search_progress.progress_percent) < 100:
@@ -131,6 +178,7 @@ class SearchScreen(Screen[None]):
         if int(self.search_engine.search_progress.progress_percent) >= 100:
             self._search_status_label.update("Completed")
             self._pause_button.disabled = True
+            self._limit_button.disabled = True
             if self._progress_timer:
                 self._progress_timer.stop()
                 self._progress_timer = None
@@ -140,6 +188,7 @@ class SearchScreen(Screen[None]):
             "exit-button": self._handle_exit_button,
             "open-button": self._handle_open_button,
             "pause-button": self._handle_pause_button,
+            "limit-button": self._handle_limit_button,
         }
 
         button_id = event.button.id
@@ -174,6 +223,30 @@ class SearchScreen(Screen[None]):
             self._pause_button.label = "Resume"
             self._search_status_label.update("Paused")
 
+    async def _handle_limit_button(self) -> None:
+        current_limit = self.search_engine.get_bandwidth_limit()
+        # Custom limits from the command line step to the next lower preset.
+        next_limit = next(
+            (
+                limit
+                for limit in _BANDWIDTH_LIMIT_STEPS_MB
+                if limit and (not current_limit or limit < current_limit)
+            ),
+            0,
+        )
+        log.info(f"search - Bandwidth limit set to {next_limit} MB/s")
+        self.search_engine.set_bandwidth_limit(next_limit)
+        self._limit_button.label = _format_limit(next_limit)
+
+    async def _handle_export_error_map(self) -> None:
+        try:
+            path = self.search_engine.export_error_map()
+        except OSError as error:
+            log.error(f"search - Cannot export error map: {error}")
+            self.notify(f"Cannot export error map: {error}", severity="error")
+            return
+        self.notify(f"Error map exported to {path}")
+
     def _get_selected_search_result(self) -> SearchResult:
         return self._search_result_list.search_results[
             self._search_result_list.get_index()
@@ -202,6 +275,14 @@ class SearchScreen(Screen[None]):
         if hasattr(self, "search_engine"):
             await self._handle_pause_button()
 
+    async def action_cycle_limit(self) -> None:
+        if hasattr(self, "search_engine"):
+            await self._handle_limit_button()
+
+    async def action_export_error_map(self) -> None:
+        if hasattr(self, "search_engine") and self.search_engine.error_map is not None:
+            await self._handle_export_error_map()
+
     def check_action(self, action: str, parameters: tuple[object, ...]) -> bool | None:
         if action == "open_result" and self._open_button.disabled:
             return None
@@ -209,4 +290,38 @@ class SearchScreen(Screen[None]):
             not hasattr(self, "search_engine") or self._pause_button.disabled
         ):
             return None
+        if action == "export_error_map" and (
+            not hasattr(self, "search_engine") or self.search_engine.error_map is None
+        ):
+            return None
+        if action == "cycle_limit" and (
+            not hasattr(self, "search_engine") or self._limit_button.disabled
+        ):
+            return None
         return True
+
+
+def _format_bytes(byte_count: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if byte_count < 1000:
+            return f"{byte_count:.1f} {unit}"
+        byte_count /= 1000
+    return f"{byte_count:.1f} TB"
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+def _format_read_errors(error_map: ScanErrorMap) -> str:
+    return f"{len(error_map)} ({error_map.get_bad_bytes()} bytes)"
+
+
+def _format_limit(limit_mb: int) -> str:
+    return f"Limit: {limit_mb} MB/s" if limit_mb else "Limit: off"
@@ -1,10 +1,11 @@
 """A Textual ListView Widget for displaying partitions."""
 
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from textual.widgets import Label, ListItem, ListView
 
 from recoverpy.lib.storage.block_device_inventory import (DeviceDiscoveryError,
+                                                          get_image_partition,
                                                           get_partitions)
 from recoverpy.log.logger import log
 from recoverpy.models.partition import Partition
@@ -23,20 +24,29 @@ def _get_label(partition: Partition) -> Label:
 
 
 def _get_partition_id(partition: Partition) -> str:
-    return "".join(filter(str.isalnum, partition.name))
+    partition_id = "".join(filter(str.isalnum, partition.name))
+    # Widget ids cannot start with a digit, as image file names may.
+    return partition_id if partition_id[:1].isalpha() else f"p{partition_id}"
 
 
 class PartitionList(ListView):
-    def __init__(self, *children, **kwargs) -> None:  # type: ignore
+    def __init__(
+        self, *children: ListItem, image_paths: Sequence[str] = (), **kwargs: Any
+    ) -> None:
         super().__init__(id="partition-list", *children, **kwargs)
         self.list_items: Dict[Optional[str], Partition] = {}
+        # Disk image files given on the command line, listed first.
+        self._image_paths = list(image_paths)
 
     async def on_mount(self) -> None:
         await self.set_partitions()
 
     async def set_partitions(self, filtered: bool = True) -> None:
         try:
-            partitions = get_partitions(filtered)
+            partitions: List[Partition] = [
+                get_image_partition(image_path) for image_path in self._image_paths
+            ]
+            partitions += get_partitions(filtered)
         except DeviceDiscoveryError as error:
             log.error(f"partition_list - {error}")
             if self.app:
@@ -1,12 +1,13 @@
-"""A Textual ListView widget consuming an asyncio Queue"""
+"""A Textual ListView widget consuming a SearchResultQueue"""
 
 from __future__ import annotations
 
-from asyncio import Lock, Queue, sleep
+from asyncio import Lock, sleep
 from typing import List, cast
 
-from textual.widgets import Label, ListView
+from textual.widgets import Label, ListItem, ListView
 
+from recoverpy.lib.search.result_queue import SearchResultQueue
 from recoverpy.log.logger import log
 from recoverpy.models.search_result import SearchResult
 
@@ -18,41 +19,44 @@ class SearchResultList(ListView):
         self.search_results: List[SearchResult] = []
         self.id = "search-result-list"
 
-    async def start_consumer(self, queue: Queue[SearchResult]) -> None:
+    async def start_consumer(self, queue: SearchResultQueue) -> None:
         log.debug("search_result_list - Starting consumer")
         while True:
-            if not self._should_add_more():
+            missing_count = self._get_missing_count()
+            if missing_count <= 0:
                 await sleep(0.1)
                 continue
 
-            log.debug("search_result_list - Adding more results")
-            search_result = await queue.get()
-            await self._append(search_result)
+            # Only the results about to be shown are taken, in one batch.
+            search_results = await queue.get_batch(missing_count)
+            log.debug(f"search_result_list - Adding {len(search_results)} results")
+            await self._append_batch(search_results)
 
     def get_index(self) -> int:
         return self.index or 0
 
-    async def _append(self, search_result: SearchResult) -> None:
-        log.debug(f"search_result_list - Appending inode {search_result.inode}")
-        search_result.create_list_item()
-
-        if not search_result.list_item:
-            log.error(
-                f"search_result_list - Search result {search_result.inode} has no list item"
-            )
-            return
-
+    async def _append_batch(self, search_results: List[SearchResult]) -> None:
+        list_items: List[ListItem] = []
         async with self.lock:
-            self.search_results.append(search_result)
-            new_index = len(self.search_results) - 1
-            self._resize_item(new_index)
-            await super().append(search_result.list_item)
+            for search_result in search_results:
+                search_result.create_list_item()
+                if not search_result.list_item:
+                    log.error(
+                        f"search_result_list - Search result {search_result.inode} "
+                        "has no list item"
+                    )
+                    continue
+                self.search_results.append(search_result)
+                self._resize_item(len(self.search_results) - 1)
+                list_items.append(search_result.list_item)
+            # Mounting the whole batch at once refreshes the list once.
+            await super().extend(list_items)
 
     def _get_list_index_to_show(self) -> int:
         return int(self.size.height) + int(self.scroll_y) + 10
 
-    def _should_add_more(self) -> bool:
-        return len(self.children) < self._get_list_index_to_show()
+    def _get_missing_count(self) -> int:
+        return self._get_list_index_to_show() - len(self.children)
 
     def on_resize(self) -> None:
         for index in range(len(self.children)):
@@ -0,0 +1,119 @@
+import struct
+
+from recoverpy.lib.filesystem.allocation_map import get_unallocated_ranges
+from recoverpy.lib.filesystem.ext4 import iter_clear_bit_runs
+from recoverpy.lib.search import search_engine
+from recoverpy.lib.search.search_engine import SearchEngine
+from recoverpy.models.search_options import SearchOptions
+
+_EXT4_BLOCK_SIZE = 1024
+_EXT4_BLOCKS = 1 + 2 * 8192 - 100
+_FAT_DATA_OFFSET = (32 + 2 * 8) * 512
+_FAT_CLUSTER_SIZE = 8 * 512
+
+
+def _write_ext4_image(path):
+    superblock = bytearray(1024)
+    struct.pack_into("<II", superblock, 0x00, 32, _EXT4_BLOCKS)
+    # First data block 1, 1 KiB blocks, 8192 blocks and 16 inodes per group.
+    struct.pack_into("<II", superblock, 0x14, 1, 0)
+    struct.pack_into("<I", superblock, 0x20, 8192)
+    struct.pack_into("<I", superblock, 0x28, 16)
+    struct.pack_into("<H", superblock, 0x38, 0xEF53)
+    struct.pack_into("<I", superblock, 0x4C, 1)
+    struct.pack_into("<H", superblock, 0x58, 256)
+    descriptors = bytearray(64)
+    struct.pack_into("<III", descriptors, 0, 3, 5, 6)
+    # The second group was never allocated from: it only holds a superblock
+    # backup, a descriptor table copy, its bitmaps and its inode table.
+    struct.pack_into("<III", descriptors, 32, 8195, 8196, 8197)
+    struct.pack_into("<H", descriptors, 32 + 0x12, 0x2)
+    bitmap = bytearray(_EXT4_BLOCK_SIZE)
+    for block in [*range(10), *range(100, 200)]:
+        bitmap[block // 8] |= 1 << (block % 8)
+
+    with open(path, "wb") as image:
+        image.truncate(_EXT4_BLOCKS * _EXT4_BLOCK_SIZE)
+        image.seek(1024)
+        image.write(superblock)
+        image.seek(2 * _EXT4_BLOCK_SIZE)
+        image.write(descriptors)
+        image.seek(3 * _EXT4_BLOCK_SIZE)
+        image.write(bitmap)
+
+
+def _write_fat32_image(path):
+    boot_sector = bytearray(512)
+    # 512-byte sectors, 8 per cluster, 32 reserved sectors and 2 FATs.
+    struct.pack_into("<HBHB", boot_sector, 0x0B, 512, 8, 32, 2)
+    struct.pack_into("<II", boot_sector, 0x20, 32 + 2 * 8 + 1000 * 8, 8)
+    boot_sector[510:512] = b"\x55\xaa"
+    entries = [0x0FFFFFF8, 0x0FFFFFFF, 0x0FFFFFFF, 0, 0, 0, 7, 0x0FFFFFFF, 0x100]
+    fat = struct.pack(f"<{len(entries)}I", *entries)
+
+    with open(path, "wb") as image:
+        image.truncate(_FAT_DATA_OFFSET + 1000 * _FAT_CLUSTER_SIZE)
+        image.write(boot_sector)
+        image.seek(32 * 512)
+        image.write(fat)
+
+
+def test_clear_bit_runs():
+    bitmap = bytes([0b11110000, 0b00000001, 0xFF, 0])
+
+    assert list(iter_clear_bit_runs(bitmap, 32)) == [(0, 4), (9, 16), (24, 32)]
+    assert list(iter_clear_bit_runs(bitmap, 12)) == [(0, 4), (9, 12)]
+    assert list(iter_clear_bit_runs(b"\xff", 8)) == []
+    # Zero bytes and partly clear bytes merge into one run.
+    assert list(iter_clear_bit_runs(bytes([0b10000000, 0, 0b11111100]), 24)) == [
+        (0, 7),
+        (8, 18),
+    ]
+    # Bits past the bitmap are clear.
+    assert list(iter_clear_bit_runs(b"\x00", 20)) == [(0, 20)]
+
+
+def test_ext4_free_blocks(tmp_path):
+    path = tmp_path / "ext4.img"
+    _write_ext4_image(path)
+
+    ranges = get_unallocated_ranges(str(path))
+
+    assert ranges == [
+        (11 * _EXT4_BLOCK_SIZE, 101 * _EXT4_BLOCK_SIZE),
+        (201 * _EXT4_BLOCK_SIZE, 8193 * _EXT4_BLOCK_SIZE),
+        (8201 * _EXT4_BLOCK_SIZE, _EXT4_BLOCKS * _EXT4_BLOCK_SIZE),
+    ]
+    assert get_unallocated_ranges(str(path), 50 * _EXT4_BLOCK_SIZE, 300 * _EXT4_BLOCK_SIZE) == [
+        (50 * _EXT4_BLOCK_SIZE, 101 * _EXT4_BLOCK_SIZE),
+        (201 * _EXT4_BLOCK_SIZE, 300 * _EXT4_BLOCK_SIZE),
+    ]
+
+
+def test_fat32_free_clusters(tmp_path):
+    path = tmp_path / "fat32.img"
+    _write_fat32_image(path)
+
+    assert get_unallocated_ranges(str(path)) == [
+        (_FAT_DATA_OFFSET + 1 * _FAT_CLUSTER_SIZE, _FAT_DATA_OFFSET + 4 * _FAT_CLUSTER_SIZE),
+        (_FAT_DATA_OFFSET + 7 * _FAT_CLUSTER_SIZE, _FAT_DATA_OFFSET + 1000 * _FAT_CLUSTER_SIZE),
+    ]
+
+
+def test_unknown_filesystem_is_scanned_in_full(tmp_path):
+    path = tmp_path / "raw.img"
+    path.write_bytes(bytes(64 * 1024))
+
+    assert get_unallocated_ranges(str(path)) is None
+
+
+def test_engine_scans_unallocated_ranges(monkeypatch):
+    megabyte = 1024 * 1024
+    monkeypatch.setattr(
+        search_engine,
+        "get_unallocated_ranges",
+        lambda *args: [(0, megabyte), (10 * megabyte, 12 * megabyte)],
+    )
+    engine = SearchEngine("/dev/sda1", "Lorem", SearchOptions(unallocated_only=True))
+
+    assert engine._get_scan_ranges(0) == [(0, megabyte), (10 * megabyte, 12 * megabyte)]
@@ -0,0 +1,121 @@
+import random
+import zlib
+
+import pytest
+
+from recoverpy.lib.search import block_classification, search_engine
+from recoverpy.lib.search.block_classification import (CLASS_BLOCK_SIZE,
+                                                       build_block_class_map,
+                                                       classify_blocks,
+                                                       get_text_blocks,
+                                                       get_text_ranges)
+from recoverpy.lib.search.search_engine import SearchEngine
+from recoverpy.models.search_options import SearchOptions
+
+_TEXT = (b"Dear customer, your invoice is attached to this message. " * 80)[
+    :CLASS_BLOCK_SIZE
+]
+
+
+def _get_sample_blocks():
+    generator = random.Random(7)
+    records = bytes(
+        generator.choice((0, 0, 0, 1, 2, 7, 0x10, 0x41, 0x80)) for _ in range(CLASS_BLOCK_SIZE)
+    )
+    return {
+        "text": _TEXT,
+        "utf16": ("Recovered notes, page one. " * 80).encode("utf-16-le")[:CLASS_BLOCK_SIZE],
+        "utf8": ("Восстановление удалённых данных. " * 80).encode()[:CLASS_BLOCK_SIZE],
+        "padded": _TEXT[:700].ljust(CLASS_BLOCK_SIZE, b"\0"),
+        "random": generator.randbytes(CLASS_BLOCK_SIZE),
+        "compressed": zlib.compress(generator.randbytes(2 * CLASS_BLOCK_SIZE))[
+            :CLASS_BLOCK_SIZE
+        ],
+        "records": records,
+        "zeros": bytes(CLASS_BLOCK_SIZE),
+    }
+
+
+def test_text_blocks_are_told_from_binary_ones():
+    blocks = _get_sample_blocks()
+
+    text_blocks = get_text_blocks(classify_blocks(b"".join(blocks.values())))
+
+    assert dict(zip(blocks, text_blocks.tolist())) == {
+        "text": True,
+        "utf16": True,
+        "utf8": True,
+        "padded": True,
+        "random": False,
+        "compressed": False,
+        "records": False,
+        "zeros": False,
+    }
+
+
+def test_partial_last_block_is_classified_alone():
+    stats = classify_blocks(_TEXT + _TEXT[:100])
+
+    assert stats.shape == (2, 4)
+    assert get_text_blocks(stats).tolist() == [True, True]
+
+
+def test_text_ranges_follow_the_block_map(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    blocks = _get_sample_blocks()
+    path = tmp_path / "disk.img"
+    path.write_bytes(b"".join(blocks.values()))
+    assert get_text_ranges(str(path)) is None
+
+    build_block_class_map(str(path))
+
+    assert get_text_ranges(str(path)) == [(0, 4 * CLASS_BLOCK_SIZE)]
+    assert get_text_ranges(str(path), 100, 2 * CLASS_BLOCK_SIZE) == [
+        (100, 2 * CLASS_BLOCK_SIZE)
+    ]
+    path.write_bytes(bytes(CLASS_BLOCK_SIZE))
+    assert get_text_ranges(str(path)) is None
+
+
+def test_mounted_device_scans_all_blocks(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "disk.img"
+    path.write_bytes(_TEXT)
+    build_block_class_map(str(path))
+    monkeypatch.setattr(block_classification, "is_mounted", lambda _path: True)
+
+    assert get_text_ranges(str(path)) is None
+
+
+@pytest.mark.parametrize("size", [0, 100])
+def test_tiny_sources_are_classified(tmp_path, monkeypatch, size):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "disk.img"
+    path.write_bytes(_TEXT[:size])
+
+    build_block_class_map(str(path))
+
+    assert get_text_ranges(str(path)) == ([(0, size)] if size else [])
+
+
+def test_engine_scans_indexed_text_ranges(monkeypatch):
+    megabyte = 1024 * 1024
+    monkeypatch.setattr(
+        search_engine,
+        "get_indexed_ranges",
+        lambda *args: [(0, 8 * megabyte), (20 * megabyte, 30 * megabyte)],
+    )
+    monkeypatch.setattr(
+        search_engine,
+        "get_text_ranges",
+        lambda *args: [(4 * megabyte, 5 * megabyte), (6 * megabyte, 25 * megabyte)],
+    )
+    engine = SearchEngine(
+        "/dev/sda1", "Lorem", SearchOptions(use_index=True, text_only=True)
+    )
+
+    # Ranges one megabyte apart are scanned together.
+    assert engine._get_scan_ranges(0) == [
+        (4 * megabyte, 8 * megabyte),
+        (20 * megabyte, 25 * megabyte),
+    ]
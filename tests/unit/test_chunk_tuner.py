@@ -0,0 +1,51 @@
+from recoverpy.lib.search.chunk_tuner import (MAX_TUNED_CHUNK_SIZE,
+                                              ChunkSizeTuner)
+from recoverpy.lib.storage.block_device_inventory import BlockQueueHints
+
+MIB = 1024 * 1024
+
+
+def _record_chunks(tuner, bytes_per_second, count=4):
+    for _ in range(count):
+        tuner.record_read(tuner.chunk_size, tuner.chunk_size / bytes_per_second)
+
+
+def test_initial_chunk_size_follows_queue_hints():
+    spinning = BlockQueueHints(optimal_io_size=0, rotational=True, read_ahead_kb=128)
+    striped = BlockQueueHints(optimal_io_size=3 * MIB, rotational=False, read_ahead_kb=128)
+    huge_read_ahead = BlockQueueHints(
+        optimal_io_size=0, rotational=False, read_ahead_kb=64 * 1024
+    )
+
+    assert ChunkSizeTuner("/dev/sda", None).chunk_size == 8 * MIB
+    assert ChunkSizeTuner("/dev/sda", spinning).chunk_size == 16 * MIB
+    # Rounded up to whole stripes.
+    assert ChunkSizeTuner("/dev/md0", striped).chunk_size == 9 * MIB
+    assert ChunkSizeTuner("/dev/sdb", huge_read_ahead).chunk_size == MAX_TUNED_CHUNK_SIZE
+
+
+def test_chunk_size_grows_while_throughput_improves():
+    tuner = ChunkSizeTuner("/dev/nvme0n1", None)
+
+    _record_chunks(tuner, 500e6)
+    assert tuner.chunk_size == 16 * MIB
+    _record_chunks(tuner, 900e6)
+    assert tuner.chunk_size == 32 * MIB
+    # No gain: back to the best size, which is then kept.
+    _record_chunks(tuner, 910e6)
+    assert tuner.chunk_size == 16 * MIB
+    _record_chunks(tuner, 2000e6)
+    assert tuner.chunk_size == 16 * MIB
+
+
+def test_chunk_size_shrinks_when_chunks_are_slow():
+    tuner = ChunkSizeTuner("/dev/nbd0", None)
+
+    tuner.record_read(tuner.chunk_size, 2.0)
+    assert tuner.chunk_size == 4 * MIB
+    # Growing never goes back to a size that was too slow.
+    _record_chunks(tuner, 10e6)
+    assert tuner.chunk_size == 4 * MIB
+    # Short reads at the end of the source are ignored.
+    tuner.record_read(1024, 5.0)
+    assert tuner.chunk_size == 4 * MIB
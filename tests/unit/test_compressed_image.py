@@ -0,0 +1,146 @@
+import bz2
+import gzip
+import lzma
+import os
+import random
+from collections import OrderedDict
+
+import pytest
+
+from recoverpy.lib.search.binary_scanner import iter_scan_hits
+from recoverpy.lib.storage import compressed_image
+from recoverpy.lib.storage.byte_range_reader import (BlockExtractionError,
+                                                     read_block)
+from recoverpy.lib.storage.compressed_image import (CompressedImageError,
+                                                    get_compression,
+                                                    open_compressed_image)
+
+_COMPRESSORS = {"gzip": gzip.compress, "xz": lzma.compress, "bz2": bz2.compress}
+
+
+def _image_payload():
+    rng = random.Random(7)
+    payload = bytearray(rng.randbytes(1024 * 1024))
+    payload += bytes(1024 * 1024)
+    payload += b"log line with NEEDLE inside\n" * 20000
+    return bytes(payload)
+
+
+def _write_image(tmp_path, compression, payload, streams=2):
+    compress = _COMPRESSORS[compression]
+    path = tmp_path / f"disk.img.{compression}"
+    split = len(payload) // streams
+    with open(path, "wb") as image_file:
+        for index in range(streams):
+            end = len(payload) if index == streams - 1 else (index + 1) * split
+            image_file.write(compress(payload[index * split : end]))
+    return str(path)
+
+
+@pytest.mark.parametrize("compression", sorted(_COMPRESSORS))
+def test_scan_reports_uncompressed_offsets(tmp_path, compression):
+    payload = _image_payload()
+    path = _write_image(tmp_path, compression, payload)
+    plain = tmp_path / "disk.img"
+    plain.write_bytes(payload)
+
+    hits = list(iter_scan_hits(path, b"NEEDLE", chunk_size=256 * 1024, workers=4))
+
+    assert get_compression(path) == compression
+    assert hits == list(iter_scan_hits(str(plain), b"NEEDLE", chunk_size=256 * 1024))
+    # The size is known once the image has been decoded.
+    assert open_compressed_image(path).size == len(payload)
+
+
+@pytest.mark.parametrize("compression", sorted(_COMPRESSORS))
+def test_read_block_uses_seek_points(tmp_path, monkeypatch, compression):
+    monkeypatch.setattr(compressed_image, "SEEK_POINT_INTERVAL", 512 * 1024)
+    payload = _image_payload()
+    path = _write_image(tmp_path, compression, payload, streams=3)
+    list(iter_scan_hits(path, b"NEEDLE"))
+    image = open_compressed_image(path)
+
+    rng = random.Random(3)
+    for block_index in rng.sample(range(len(payload) // 4096), 20):
+        expected = payload[block_index * 4096 : (block_index + 1) * 4096]
+        assert read_block(path, 4096, block_index) == expected
+    assert len(image._seek_points) >= 3
+    with pytest.raises(BlockExtractionError):
+        read_block(path, 4096, len(payload) // 4096 + 1)
+
+
+def test_gzip_seek_points_snapshot_decoder(tmp_path, monkeypatch):
+    monkeypatch.setattr(compressed_image, "SEEK_POINT_INTERVAL", 256 * 1024)
+    payload = _image_payload()
+    path = _write_image(tmp_path, "gzip", payload, streams=1)
+    image = open_compressed_image(path)
+    reader = image.open_reader()
+    assert reader.pread(len(payload), 0) == payload
+    reader.close()
+
+    # Points inside the single stream hold a copy of the decoder state.
+    assert any(point.decompressor is not None for point in image._seek_points)
+    offset = len(payload) - 5000
+    assert image.pread(100, offset) == payload[offset : offset + 100]
+
+
+def test_decoder_seek_points_are_thinned(tmp_path, monkeypatch):
+    monkeypatch.setattr(compressed_image, "SEEK_POINT_INTERVAL", 64 * 1024)
+    monkeypatch.setattr(compressed_image, "MAX_DECODER_SEEK_POINTS", 4)
+    payload = _image_payload()
+    path = _write_image(tmp_path, "gzip", payload, streams=1)
+    image = open_compressed_image(path)
+    assert image.pread(len(payload), 0) == payload
+
+    decoder_points = [
+        point for point in image._seek_points if point.decompressor is not None
+    ]
+    assert 0 < len(decoder_points) <= 4
+    assert image.seek_point_interval > 64 * 1024
+    offset = len(payload) - 5000
+    assert image.pread(100, offset) == payload[offset : offset + 100]
+    assert image.pread(100, 4096) == payload[4096:4196]
+
+
+def test_image_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(compressed_image, "_MAX_CACHED_IMAGES", 2)
+    monkeypatch.setattr(compressed_image, "_images", OrderedDict())
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"disk{index}.img.gz"
+        path.write_bytes(gzip.compress(bytes([index]) * 4096))
+        paths.append(str(path))
+    first = open_compressed_image(paths[0])
+    assert first.pread(1, 0) == b"\x00"
+
+    for path in paths[1:]:
+        open_compressed_image(path)
+
+    assert len(compressed_image._images) == 2
+    assert open_compressed_image(paths[0]) is not first
+    # An evicted image still reads, reopening its file.
+    assert first.pread(1, 100) == b"\x00"
+
+
+def test_xz_size_is_read_from_index(tmp_path):
+    payload = _image_payload()
+    path = _write_image(tmp_path, "xz", payload, streams=3)
+
+    assert open_compressed_image(path).size == len(payload)
+
+
+def test_corrupted_image_raises(tmp_path):
+    path = tmp_path / "broken.img.gz"
+    data = bytearray(gzip.compress(os.urandom(256 * 1024)))
+    data[len(data) // 2 : len(data) // 2 + 64] = bytes(64)
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(CompressedImageError):
+        open_compressed_image(str(path)).pread(256 * 1024, 0)
+
+
+def test_plain_files_are_not_compressed_images(tmp_path):
+    path = tmp_path / "disk.img"
+    path.write_bytes(b"\x00" * 4096)
+
+    assert open_compressed_image(str(path)) is None
@@ -0,0 +1,11 @@
+import numpy as np
+
+from recoverpy.lib.storage.device_cache import get_flagged_ranges
+
+
+def test_flagged_ranges_are_clipped_runs():
+    flags = np.array([True, True, False, True, False, False, True, True])
+
+    assert get_flagged_ranges(flags, 10, 0, 80) == [(0, 20), (30, 40), (60, 80)]
+    assert get_flagged_ranges(flags, 10, 15, 65) == [(15, 20), (30, 40), (60, 65)]
+    assert get_flagged_ranges(flags, 10, 40, 60) == []
@@ -1,7 +1,11 @@
+import os
+
 import pytest
 
+from recoverpy.lib.storage import block_device_inventory
 from recoverpy.lib.storage.block_device_inventory import (
-    _IGNORED_PARTITION_TYPES, DeviceDiscoveryError, get_partitions)
+    _IGNORED_PARTITION_TYPES, BlockQueueHints, DeviceDiscoveryError,
+    get_partitions, get_queue_hints, is_mounted)
 from tests.fixtures.mock_device_discovery import (UNFILTERED_PARTITION_COUNT,
                                                   VISIBLE_PARTITION_COUNT)
 
@@ -28,3 +32,67 @@ def test_get_partitions_permission_error(mocker):
 
     with pytest.raises(DeviceDiscoveryError):
         get_partitions(True)
+
+
+def test_get_queue_hints_reads_parent_disk_queue(tmp_path, mocker):
+    disk_dir = tmp_path / "devices" / "sdz"
+    (disk_dir / "sdz1").mkdir(parents=True)
+    (disk_dir / "queue").mkdir()
+    (disk_dir / "queue" / "optimal_io_size").write_text("1048576\n")
+    (disk_dir / "queue" / "rotational").write_text("1\n")
+    (disk_dir / "queue" / "read_ahead_kb").write_text("128\n")
+    class_dir = tmp_path / "class"
+    class_dir.mkdir()
+    (class_dir / "sdz1").symlink_to(disk_dir / "sdz1")
+    mocker.patch.object(block_device_inventory, "_SYS_CLASS_BLOCK", class_dir)
+    device_node = tmp_path / "sdz1"
+    device_node.touch()
+    mocker.patch.object(block_device_inventory.stat, "S_ISBLK", return_value=True)
+
+    assert get_queue_hints(str(device_node)) == BlockQueueHints(
+        optimal_io_size=1024 * 1024, rotational=True, read_ahead_kb=128
+    )
+
+
+def test_get_queue_hints_ignores_regular_files(tmp_path):
+    image = tmp_path / "disk.img"
+    image.write_bytes(b"\x00" * 512)
+
+    assert get_queue_hints(str(image)) is None
+
+
+def _make_block_device(sys_dir, name, number, parent=None):
+    device_dir = (parent or sys_dir / "devices") / name
+    device_dir.mkdir(parents=True)
+    (device_dir / "dev").write_text(f"{number}\n")
+    if parent is not None:
+        (device_dir / "partition").write_text("1\n")
+    (sys_dir / "class" / name).symlink_to(device_dir)
+    (sys_dir / "dev" / number).symlink_to(device_dir)
+    return device_dir
+
+
+@pytest.mark.parametrize(
+    ("mounted", "expected"), [({(259, 0)}, True), ({(8, 1)}, False)]
+)
+def test_is_mounted_follows_loop_devices_and_partitions(
+    tmp_path, mocker, mounted, expected
+):
+    sys_dir = tmp_path / "sys"
+    (sys_dir / "class").mkdir(parents=True)
+    (sys_dir / "dev").mkdir()
+    loop_dir = _make_block_device(sys_dir, "loop0", "7:0")
+    _make_block_device(sys_dir, "loop0p1", "259:0", parent=loop_dir)
+    image = tmp_path / "disk.img"
+    image.write_bytes(b"\x00" * 512)
+    (loop_dir / "loop").mkdir()
+    (loop_dir / "loop" / "backing_file").write_text(f"{image}\n")
+    mocker.patch.object(block_device_inventory, "_SYS_CLASS_BLOCK", sys_dir / "class")
+    mocker.patch.object(block_device_inventory, "_SYS_DEV_BLOCK", sys_dir / "dev")
+    mocker.patch.object(
+        block_device_inventory,
+        "_read_mounted_devices",
+        return_value={os.makedev(*device) for device in mounted},
+    )
+
+    assert is_mounted(str(image)) is expected
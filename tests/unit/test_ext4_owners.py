@@ -0,0 +1,184 @@
+import struct
+
+from recoverpy.lib.filesystem import ext4_owners
+from recoverpy.lib.filesystem.ext4_owners import (Ext4OwnerMap,
+                                                  get_ext4_owner_map)
+from recoverpy.lib.search import search_engine
+from recoverpy.lib.search.binary_scanner import ScanHit
+from recoverpy.lib.search.search_engine import SearchEngine
+from recoverpy.models.search_options import SearchOptions
+
+_BLOCK_SIZE = 1024
+_BLOCK_COUNT = 512
+_INODE_SIZE = 256
+_INODE_TABLE_BLOCK = 5
+_EXTENTS = 0x80000
+
+
+def _inode(mode, blocks=b"", flags=0, size=0, dtime=0):
+    record = bytearray(_INODE_SIZE)
+    struct.pack_into("<HHI", record, 0x00, mode, 0, size)
+    struct.pack_into("<I", record, 0x14, dtime)
+    struct.pack_into("<H", record, 0x1A, 1)
+    struct.pack_into("<I", record, 0x20, flags)
+    record[0x28 : 0x28 + len(blocks)] = blocks
+    return bytes(record)
+
+
+def _extent_node(depth, entries):
+    node = struct.pack("<HHHHI", 0xF30A, len(entries), 4, depth, 0)
+    for entry in entries:
+        if depth:
+            node += struct.pack("<IIHH", 0, entry, 0, 0)
+        else:
+            first_block, length = entry
+            node += struct.pack("<IHHI", 0, length, 0, first_block)
+    return node
+
+
+def _directory_block(entries):
+    block = bytearray()
+    for index, (inode, name) in enumerate(entries):
+        encoded = name.encode()
+        length = 8 + len(encoded)
+        record_length = _BLOCK_SIZE - len(block) if index == len(entries) - 1 else length
+        block += struct.pack("<IHBB", inode, record_length, len(encoded), 0) + encoded
+        block += bytes(record_length - length)
+    return bytes(block)
+
+
+def _write_ext4_image(path):
+    superblock = bytearray(1024)
+    struct.pack_into("<II", superblock, 0x00, 32, _BLOCK_COUNT)
+    struct.pack_into("<II", superblock, 0x14, 1, 0)
+    struct.pack_into("<I", superblock, 0x20, 8192)
+    struct.pack_into("<I", superblock, 0x28, 32)
+    struct.pack_into("<H", superblock, 0x38, 0xEF53)
+    struct.pack_into("<I", superblock, 0x4C, 1)
+    struct.pack_into("<H", superblock, 0x58, _INODE_SIZE)
+    descriptor = struct.pack("<III", 3, 4, _INODE_TABLE_BLOCK)
+    inodes = {
+        2: _inode(0x41ED, struct.pack("<I", 20)),
+        # The journal keeps copies of deleted data.
+        8: _inode(0x8180, struct.pack("<I", 25)),
+        12: _inode(
+            0x81A4,
+            # Blocks 50 and 51 are preallocated and not written yet.
+            _extent_node(0, [(40, 4), (50, 32768 + 2)]),
+            _EXTENTS,
+        ),
+        13: _inode(0x41ED, _extent_node(1, [30]), _EXTENTS),
+        14: _inode(0x81A4, struct.pack("<12II", 60, *[0] * 11, 61)),
+        15: _inode(0x81A4, struct.pack("<I", 70), dtime=1),
+        # Short symbolic links store their target in place of blocks.
+        16: _inode(0xA1FF, b"notes.txt", size=9),
+    }
+    blocks = {
+        2: descriptor,
+        3: bytes([0xFF]) * 32,
+        # Inodes 1 to 16 are in use.
+        4: b"\xff\xff",
+        20: _directory_block(
+            [(2, "."), (2, ".."), (12, "notes.txt"), (13, "docs"), (16, "link")]
+        ),
+        30: _extent_node(0, [(31, 1)]),
+        31: _directory_block([(13, "."), (2, ".."), (14, "a.txt")]),
+        61: struct.pack("<I", 62),
+    }
+
+    with open(path, "wb") as image:
+        image.truncate(_BLOCK_COUNT * _BLOCK_SIZE)
+        image.seek(1024)
+        image.write(superblock)
+        for block, data in blocks.items():
+            image.seek(block * _BLOCK_SIZE)
+            image.write(data)
+        for inode, record in inodes.items():
+            image.seek(_INODE_TABLE_BLOCK * _BLOCK_SIZE + (inode - 1) * _INODE_SIZE)
+            image.write(record)
+
+
+def test_blocks_map_to_live_inodes(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "ext4.img"
+    _write_ext4_image(path)
+
+    owner_map = get_ext4_owner_map(str(path))
+
+    assert owner_map is not None
+    owners = {
+        block: owner_map.find_owner(block * _BLOCK_SIZE + 10)
+        for block in range(_BLOCK_COUNT)
+    }
+    assert {block: inode for block, inode in owners.items() if inode} == {
+        20: 2,
+        30: 13,
+        31: 13,
+        40: 12,
+        41: 12,
+        42: 12,
+        43: 12,
+        60: 14,
+        61: 14,
+        62: 14,
+    }
+    assert owner_map.get_path(14) == "/docs/a.txt"
+    assert owner_map.get_path(12) == "/notes.txt"
+    assert owner_map.get_path(2) == "/"
+    assert owner_map.get_path(15) is None
+
+
+def test_owner_map_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "ext4.img"
+    _write_ext4_image(path)
+    built = get_ext4_owner_map(str(path))
+    monkeypatch.setattr(ext4_owners, "build_ext4_owner_map", lambda *args: None)
+
+    cached = get_ext4_owner_map(str(path))
+
+    assert built is not None and cached is not None
+    assert len(cached) == len(built)
+    assert cached.find_owner(41 * _BLOCK_SIZE) == 12
+    assert cached.get_path(12) == "/notes.txt"
+
+
+def test_owner_map_of_mounted_filesystem_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "ext4.img"
+    _write_ext4_image(path)
+    get_ext4_owner_map(str(path))
+    monkeypatch.setattr(ext4_owners, "is_mounted", lambda _path: True)
+    monkeypatch.setattr(ext4_owners, "build_ext4_owner_map", lambda *args: None)
+
+    assert get_ext4_owner_map(str(path)) is None
+
+
+def test_other_filesystems_have_no_owner_map(tmp_path):
+    path = tmp_path / "raw.img"
+    path.write_bytes(bytes(64 * 1024))
+
+    assert get_ext4_owner_map(str(path)) is None
+
+
+def test_engine_drops_hits_in_live_files(mocker):
+    def hits(*args, **kwargs):
+        # The map is ready before the first hit reaches the converter.
+        get_owner_map.assert_called_once_with("/dev/sda1")
+        yield ScanHit(match_offset=4096, preview=b"live Lorem")
+        yield ScanHit(match_offset=3 * 4096, preview=b"deleted Lorem")
+
+    mocker.patch.object(search_engine, "iter_scan_hits", side_effect=hits)
+    get_owner_map = mocker.patch.object(
+        search_engine,
+        "get_ext4_owner_map",
+        return_value=Ext4OwnerMap("/dev/sda1", 4096, [(1, 3, 12, 0)]),
+    )
+    engine = SearchEngine("/dev/sda1", "Lorem", SearchOptions(skip_live_files=True))
+
+    engine._scan_hits_worker()
+    engine._convert_hits_worker()
+
+    assert engine.formatted_results_queue.qsize() == 1
+    assert engine.formatted_results_queue.get_nowait().line == "deleted Lorem"
+    get_owner_map.assert_called_once_with("/dev/sda1")
@@ -0,0 +1,84 @@
+import struct
+
+import pytest
+
+from recoverpy.lib.filesystem.block_size import (MAX_VIEW_BLOCK_SIZE,
+                                                 get_view_block_size,
+                                                 probe_filesystem_block_size)
+
+_IMAGE_SIZE = 128 * 1024
+
+
+def _ext4_header():
+    superblock = bytearray(1024)
+    struct.pack_into("<II", superblock, 0x00, 16, 1024)
+    # 4 KiB blocks: 1024 << 2.
+    struct.pack_into("<II", superblock, 0x14, 0, 2)
+    struct.pack_into("<I", superblock, 0x20, 32768)
+    struct.pack_into("<I", superblock, 0x28, 16)
+    struct.pack_into("<H", superblock, 0x38, 0xEF53)
+    return {1024: bytes(superblock)}
+
+
+def _boot_sector(oem, fields):
+    sector = bytearray(512)
+    sector[3:11] = oem
+    for offset, value in fields.items():
+        sector[offset : offset + len(value)] = value
+    sector[510:512] = b"\x55\xaa"
+    return {0: bytes(sector)}
+
+
+def _ntfs_header(sectors_per_cluster):
+    return _boot_sector(
+        b"NTFS    ", {0x0B: struct.pack("<HB", 512, sectors_per_cluster)}
+    )
+
+
+_HEADERS = {
+    "ext2/3/4": (_ext4_header(), 4096),
+    "XFS": ({0: b"XFSB" + struct.pack(">I", 4096)}, 4096),
+    "btrfs": ({0x10040: b"_BHRfS_M", 0x10090: struct.pack("<I", 4096)}, 4096),
+    "NTFS": (_ntfs_header(8), 4096),
+    "exFAT": (_boot_sector(b"EXFAT   ", {0x6C: bytes([9, 6])}), 32768),
+    "FAT": (
+        _boot_sector(
+            b"mkfs.fat",
+            {0x0B: struct.pack("<HBHB", 512, 4, 4, 2), 0x36: b"FAT16   "},
+        ),
+        2048,
+    ),
+}
+
+
+def _write_image(tmp_path, header):
+    path = tmp_path / "fs.img"
+    with open(path, "wb") as image:
+        image.truncate(_IMAGE_SIZE)
+        for offset, data in header.items():
+            image.seek(offset)
+            image.write(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("filesystem", sorted(_HEADERS))
+def test_probe_filesystem_block_size(tmp_path, filesystem):
+    header, block_size = _HEADERS[filesystem]
+
+    probed = probe_filesystem_block_size(_write_image(tmp_path, header))
+
+    assert probed is not None
+    assert (probed.filesystem, probed.block_size) == (filesystem, block_size)
+
+
+def test_view_block_size_falls_back_to_sectors(tmp_path):
+    unknown = _write_image(tmp_path, {})
+    assert get_view_block_size(unknown, 512) == 512
+
+    # NTFS clusters of 2 MiB, stored as a negative power of two.
+    huge_clusters = _write_image(tmp_path, _ntfs_header(256 - 21))
+    assert get_view_block_size(huge_clusters, 512) == MAX_VIEW_BLOCK_SIZE
+
+    ext4 = _write_image(tmp_path, _ext4_header())
+    assert get_view_block_size(ext4, 512) == 4096
+    assert get_view_block_size(ext4, 8192) == 8192
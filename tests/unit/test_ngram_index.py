@@ -0,0 +1,135 @@
+import os
+import random
+import re
+from threading import Event
+
+import pytest
+
+from recoverpy.lib.search import ngram_index, search_engine
+from recoverpy.lib.search.binary_scanner import iter_scan_hits
+from recoverpy.lib.search.ngram_index import (build_ngram_index,
+                                              get_index_path,
+                                              get_indexed_ranges)
+from recoverpy.lib.search.search_engine import SearchEngine
+from recoverpy.models.search_options import SearchOptions
+from tests.integration.helper import assert_with_timeout
+
+_REGION_SIZE = 64 * 1024
+_WORDS = [b"alpha", b"bravo", b"charlie", b"delta", b"echo", b"foxtrot", b"golf"]
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def _write_source(tmp_path):
+    generator = random.Random(3)
+    text = b" ".join(generator.choice(_WORDS) for _ in range(8 * _REGION_SIZE))
+    payload = bytearray(text[: 32 * _REGION_SIZE])
+    # Needles inside regions and straddling region edges.
+    for offset in (100, _REGION_SIZE - 4, 9 * _REGION_SIZE + 7, 32 * _REGION_SIZE - 8):
+        payload[offset : offset + 8] = b"SECRET-7"
+    path = tmp_path / "disk.img"
+    path.write_bytes(payload)
+    return str(path)
+
+
+def _scan_ranges(path, needles, ranges):
+    return [hit.match_offset for hit in iter_scan_hits(path, needles, ranges=ranges)]
+
+
+def test_candidate_ranges_hold_every_match(tmp_path):
+    path = _write_source(tmp_path)
+    assert build_ngram_index(path, region_size=_REGION_SIZE) == get_index_path(path)
+
+    ranges = get_indexed_ranges(path, [b"SECRET-7", b"nowhere"])
+
+    expected = [hit.match_offset for hit in iter_scan_hits(path, [b"SECRET-7"])]
+    assert _scan_ranges(path, [b"SECRET-7", b"nowhere"], ranges) == expected
+    assert sum(end - start for start, end in ranges) < 8 * _REGION_SIZE
+
+
+def test_ranges_are_clipped_to_the_scan_range(tmp_path):
+    path = _write_source(tmp_path)
+    build_ngram_index(path, region_size=_REGION_SIZE)
+
+    ranges = get_indexed_ranges(path, [b"SECRET-7"], 200, 9 * _REGION_SIZE + 8)
+
+    assert ranges[0][0] >= 200 and ranges[-1][1] <= 9 * _REGION_SIZE + 8
+    assert _scan_ranges(path, [b"SECRET-7"], ranges) == [
+        _REGION_SIZE - 4,
+        9 * _REGION_SIZE + 7,
+    ]
+
+
+def test_unusable_index_means_full_scan(tmp_path):
+    path = _write_source(tmp_path)
+    assert get_indexed_ranges(path, [b"SECRET-7"]) is None
+
+    build_ngram_index(path, region_size=_REGION_SIZE)
+    assert get_indexed_ranges(path, re.compile(b"SECRET-\\d")) is None
+    assert get_indexed_ranges(path, [b"SECRET-7", b"ab"]) is None
+
+    # A rewritten image no longer matches the index fingerprint.
+    with open(path, "r+b") as source:
+        source.write(b"changed")
+    assert get_indexed_ranges(path, [b"SECRET-7"]) is None
+
+
+def test_stopped_build_leaves_no_index(tmp_path):
+    path = _write_source(tmp_path)
+    stop_event = Event()
+    stop_event.set()
+
+    assert build_ngram_index(path, stop_event=stop_event) is None
+    assert not [file for file in (tmp_path / "cache").rglob("*") if file.is_file()]
+
+
+def test_metadata_changes_make_the_index_stale(tmp_path):
+    path = _write_source(tmp_path)
+    build_ngram_index(path, region_size=_REGION_SIZE)
+    source_stat = os.stat(path)
+
+    # Like a block device, whose writes leave no modification time: a group
+    # descriptor rewritten between the sampled blocks.
+    with open(path, "r+b") as source:
+        source.seek(5000)
+        source.write(b"\x01\x02")
+    os.utime(path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+    assert get_indexed_ranges(path, [b"SECRET-7"]) is None
+
+
+def test_mounted_device_means_full_scan(tmp_path, monkeypatch):
+    path = _write_source(tmp_path)
+    build_ngram_index(path, region_size=_REGION_SIZE)
+    monkeypatch.setattr(ngram_index, "is_mounted", lambda _path: True)
+
+    assert get_indexed_ranges(path, [b"SECRET-7"]) is None
+
+
+@pytest.mark.asyncio
+async def test_engine_scans_indexed_ranges(monkeypatch):
+    scanned = []
+
+    def fake_iter_scan_hits(source_path, patterns, **kwargs):
+        scanned.append(kwargs["ranges"])
+        return iter(())
+
+    monkeypatch.setattr(
+        search_engine,
+        "get_indexed_ranges",
+        lambda *args: [(0, 4096), (8192, 12288), (4194304, 4198400)],
+    )
+    monkeypatch.setattr(search_engine, "iter_scan_hits", fake_iter_scan_hits)
+    engine = SearchEngine("/dev/sda1", "Lorem", SearchOptions(use_index=True))
+
+    await engine.start_search()
+
+    await assert_with_timeout(
+        lambda: engine.wait_for_completion(timeout=0), True, scanned
+    )
+    # Ranges separated by small gaps are scanned as one, all ranges by one scan.
+    assert scanned == [[(0, 12288), (4194304, 4198400)]]
+    assert engine.search_progress.progress_percent == 100.0
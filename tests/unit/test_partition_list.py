@@ -20,3 +20,20 @@ async def test_partition_list_discovery_error_does_not_crash(mocker):
     async with PartitionListApp().run_test() as pilot:
         await pilot.pause()
         assert len(list(pilot.app.query("ListItem").results())) == 0
+
+
+@pytest.mark.asyncio
+async def test_partition_list_offers_image_files_first(tmp_path):
+    image = tmp_path / "2024-evidence.img.gz"
+    image.write_bytes(b"\x1f\x8b" + bytes(510))
+
+    class ImageListApp(App[None]):
+        def compose(self) -> ComposeResult:
+            yield PartitionList(image_paths=[str(image)])
+
+    async with ImageListApp().run_test() as pilot:
+        await pilot.pause()
+        partition_list = pilot.app.query_one(PartitionList)
+        first = list(partition_list.list_items.values())[0]
+        assert first.get_full_name() == str(image)
+        assert first.device_type == "gzip image"
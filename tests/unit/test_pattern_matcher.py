@@ -0,0 +1,47 @@
+import re
+
+import pytest
+
+from recoverpy.lib.search.pattern_matcher import (MultiPatternMatcher,
+                                                  PatternMatcher, RegexMatcher,
+                                                  extract_required_literal)
+
+
+def test_extract_required_literal_prefix_and_inner_literal():
+    assert extract_required_literal(re.compile(rb"(ab)(cd)\d+")) == (b"abcd", True)
+    assert extract_required_literal(re.compile(rb"\d+@example\.com")) == (
+        b"@example.com",
+        False,
+    )
+
+
+def test_extract_required_literal_skips_unsafe_patterns():
+    assert extract_required_literal(re.compile(rb"(?i)abc")) == (b"", False)
+    assert extract_required_literal(re.compile(rb"abc|def")) == (b"", False)
+
+
+def test_regex_matcher_prefilter_matches_plain_finditer():
+    regex = re.compile(rb"\d{2,6}-key")
+    data = b"zz 12-key 99 123456-key 7-key 1234-key1234-key"
+    matcher = RegexMatcher(regex, max_match_len=10)
+
+    spans = [(start, end) for start, end, _ in matcher.iter_matches(data, 0, len(data))]
+
+    assert spans == [match.span() for match in regex.finditer(data)]
+
+
+def test_multi_pattern_matcher_reports_nested_patterns():
+    matcher = MultiPatternMatcher([b"he", b"she", b"hers", b"his"])
+    data = b"ushers"
+
+    matches = list(matcher.iter_matches(data, 0, len(data)))
+
+    assert matches == [(1, 4, 1), (2, 4, 0), (2, 6, 2)]
+
+
+def test_matcher_without_iter_matches_cannot_be_created():
+    class IncompleteMatcher(PatternMatcher):
+        max_match_len = 4
+
+    with pytest.raises(TypeError):
+        IncompleteMatcher()
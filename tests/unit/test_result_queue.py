@@ -0,0 +1,52 @@
+import asyncio
+from threading import Thread
+
+import pytest
+
+from recoverpy.lib.search.result_queue import SearchResultQueue
+from recoverpy.models.search_result import SearchResult
+
+
+def _results(*inodes):
+    return [SearchResult(f"result {inode}", inode=inode) for inode in inodes]
+
+
+@pytest.mark.asyncio
+async def test_batch_put_from_thread_wakes_consumer():
+    queue = SearchResultQueue()
+    consumer = asyncio.create_task(queue.get_batch(10))
+    await asyncio.sleep(0.01)
+    assert not consumer.done()
+
+    producer = Thread(target=queue.put_batch, args=(_results(1, 2, 3),))
+    producer.start()
+    batch = await asyncio.wait_for(consumer, timeout=2.0)
+    producer.join()
+
+    assert [result.inode for result in batch] == [1, 2, 3]
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_and_ordered():
+    queue = SearchResultQueue()
+    queue.put_batch(_results(1, 2, 3))
+    queue.put_batch(_results(4))
+
+    first = await queue.get_batch(2)
+    rest = queue.get_batch_nowait()
+
+    assert [result.inode for result in first] == [1, 2]
+    assert [result.inode for result in rest] == [3, 4]
+    assert queue.get_batch_nowait() == []
+    with pytest.raises(asyncio.QueueEmpty):
+        queue.get_nowait()
+
+
+def test_put_without_consumer_loop():
+    queue = SearchResultQueue()
+
+    queue.put_batch(_results(1, 2))
+
+    assert queue.qsize() == 2
+    assert queue.get_nowait().inode == 1
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from recoverpy.lib.search.binary_scanner import ScanHit
+from recoverpy.lib.search.scan_checkpoint import (CheckpointError,
+                                                  CheckpointHitLog,
+                                                  ScanCheckpoint,
+                                                  iter_checkpoint_hits,
+                                                  load_checkpoint,
+                                                  save_checkpoint)
+from recoverpy.lib.storage.block_device_metadata import DeviceInfo
+from recoverpy.models.search_options import SearchOptions
+
+
+def _checkpoint(**overrides):
+    fields = {
+        "device_path": "/dev/sda1",
+        "device_size_bytes": 1024 * 1024,
+        "sector_size": 512,
+        "device_identity": "device/serial:S3Z9NB0K",
+        "search_string": "Lorem",
+        "keywords": ["ipsum"],
+        "regex": False,
+        "max_match_len": 256,
+    }
+    fields.update(overrides)
+    return ScanCheckpoint(**fields)
+
+
+def test_checkpoint_round_trip_keeps_hits_below_scanned_offset(tmp_path):
+    path = str(tmp_path / "scan.checkpoint")
+    hits = [
+        ScanHit(match_offset=100, preview=b"\x00Lorem\xff", pattern_index=0),
+        ScanHit(match_offset=4096, preview=b"ipsum", pattern_index=1),
+        # Found past the last progress report: scanned again on resume.
+        ScanHit(match_offset=9000, preview=b"Lorem", pattern_index=0),
+    ]
+    hit_log = CheckpointHitLog(path)
+    for hit in hits:
+        hit_log.append(hit)
+    checkpoint = _checkpoint(
+        scanned_offset=8192, hits_size=hit_log.size, hit_count=hit_log.hit_count
+    )
+    # Logged after the checkpoint was taken.
+    hit_log.append(ScanHit(match_offset=1000, preview=b"Lorem"))
+    hit_log.sync()
+    hit_log.close()
+
+    save_checkpoint(path, checkpoint)
+    loaded = load_checkpoint(path)
+
+    assert loaded == checkpoint
+    assert list(iter_checkpoint_hits(path, loaded)) == hits[:2]
+    assert not (tmp_path / "scan.checkpoint.tmp").exists()
+    assert not (tmp_path / "scan.checkpoint.hits.tmp").exists()
+
+
+def test_checkpoint_hits_ignore_truncated_records(tmp_path):
+    path = str(tmp_path / "scan.checkpoint")
+    hit_log = CheckpointHitLog(path)
+    hit_log.append(ScanHit(match_offset=100, preview=b"Lorem"))
+    hit_log.append(ScanHit(match_offset=200, preview=b"ipsum"))
+    hit_log.sync()
+    hit_log.close()
+    with open(f"{path}.hits", "r+b") as hits_file:
+        hits_file.truncate(hit_log.size - 2)
+
+    hits = iter_checkpoint_hits(path, _checkpoint(scanned_offset=8192, hits_size=hit_log.size))
+
+    assert [hit.match_offset for hit in hits] == [100]
+
+
+def test_checkpoint_restores_search_options():
+    options = _checkpoint(regex=True, max_match_len=64).restore_options(
+        SearchOptions(scan_workers=4), "scan.checkpoint"
+    )
+
+    assert options.keywords == ["ipsum"]
+    assert options.regex is True
+    assert options.max_match_len == 64
+    assert options.scan_workers == 4
+    assert options.resume_from == "scan.checkpoint"
+
+
+def _device_info(size_bytes=1024 * 1024):
+    return DeviceInfo(
+        size_bytes=size_bytes,
+        logical_sector_size=512,
+        physical_sector_size=512,
+        read_only=True,
+        is_block_device=True,
+    )
+
+
+@pytest.mark.parametrize(
+    ("device_path", "size_bytes", "device_identity"),
+    [
+        ("/dev/sda1", 2 * 1024 * 1024, "device/serial:S3Z9NB0K"),
+        ("/dev/sdb1", 1024 * 1024, "device/serial:S3Z9NB0K"),
+        ("/dev/sda1", 1024 * 1024, "device/serial:WD-WCC4N7"),
+    ],
+)
+def test_checkpoint_rejects_other_device(device_path, size_bytes, device_identity):
+    with pytest.raises(CheckpointError):
+        _checkpoint().check_device(
+            device_path, _device_info(size_bytes), device_identity
+        )
+
+
+def test_checkpoint_accepts_same_device():
+    _checkpoint().check_device("/dev/sda1", _device_info(), "device/serial:S3Z9NB0K")
+    # Identity unknown when the checkpoint was taken or now.
+    _checkpoint(device_identity=None).check_device(
+        "/dev/sda1", _device_info(), "device/serial:S3Z9NB0K"
+    )
+    _checkpoint().check_device("/dev/sda1", _device_info(), None)
+
+
+@pytest.mark.parametrize("content", ["not json", json.dumps({"version": 99})])
+def test_load_checkpoint_rejects_invalid_files(tmp_path, content):
+    path = tmp_path / "scan.checkpoint"
+    path.write_text(content)
+
+    with pytest.raises(CheckpointError):
+        load_checkpoint(str(path))
@@ -0,0 +1,35 @@
+from recoverpy.lib.search.scan_error_map import ScanErrorMap
+
+
+def test_error_map_merges_touching_ranges():
+    error_map = ScanErrorMap()
+    error_map.add(4096, 4608)
+    error_map.add(0, 512)
+    error_map.add(4608, 5632)
+    error_map.add(8192, 8704)
+    error_map.add(400, 1024)
+
+    assert error_map.get_ranges() == [(0, 1024), (4096, 5632), (8192, 8704)]
+    assert error_map.get_bad_bytes() == 1024 + 1536 + 512
+    assert len(error_map) == 3
+
+
+def test_error_map_merges_range_spanning_several(tmp_path):
+    error_map = ScanErrorMap()
+    for start in (0, 1000, 2000):
+        error_map.add(start, start + 100)
+    error_map.add(50, 2050)
+
+    assert error_map.get_ranges() == [(0, 2100)]
+
+
+def test_error_map_export_uses_ddrescue_notation(tmp_path):
+    error_map = ScanErrorMap()
+    error_map.add(0x1000, 0x1600)
+    map_path = tmp_path / "errors.map"
+
+    error_map.export(map_path)
+
+    lines = map_path.read_text().splitlines()
+    assert lines[0].startswith("#")
+    assert lines[-1] == "0x00001000  0x00000600  -"
@@ -0,0 +1,58 @@
+import pytest
+
+from recoverpy.models.scan_range import (ScanOffset, ScanRangeError,
+                                         intersect_ranges, merge_close_ranges,
+                                         parse_scan_offset, resolve_scan_range)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("", None),
+        ("4096", ScanOffset(4096)),
+        (" 0x1000 ", ScanOffset(4096)),
+        ("512M", ScanOffset(512 * 1024 * 1024)),
+        ("2k", ScanOffset(2048)),
+        ("12.5%", ScanOffset(12.5, is_percent=True)),
+    ],
+)
+def test_parse_scan_offset(text, expected):
+    assert parse_scan_offset(text) == expected
+
+
+@pytest.mark.parametrize("text", ["abc", "-1", "150%", "1.5G"])
+def test_parse_scan_offset_rejects_invalid_values(text):
+    with pytest.raises(ScanRangeError):
+        parse_scan_offset(text)
+
+
+def test_resolve_scan_range_mixes_offsets_and_percentages():
+    size = 1000 * 1000
+
+    assert resolve_scan_range(None, None, size) == (0, None)
+    assert resolve_scan_range(ScanOffset(25, is_percent=True), ScanOffset(600000), size) == (
+        250000,
+        600000,
+    )
+    # Offsets past the device end are clamped to it.
+    assert resolve_scan_range(ScanOffset(10), ScanOffset(5 * size), size) == (10, size)
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (ScanOffset(50, is_percent=True), ScanOffset(500000)),
+        (ScanOffset(2000 * 1000), None),
+    ],
+)
+def test_resolve_scan_range_rejects_empty_ranges(start, end):
+    with pytest.raises(ScanRangeError):
+        resolve_scan_range(start, end, 1000 * 1000)
+
+
+def test_intersect_and_merge_ranges():
+    first = [(0, 100), (200, 300), (400, 500)]
+    second = [(50, 250), (290, 420)]
+
+    assert intersect_ranges(first, second) == [(50, 100), (200, 250), (290, 300), (400, 420)]
+    assert merge_close_ranges([(0, 10), (15, 20), (40, 50)], 5) == [(0, 20), (40, 50)]
@@ -0,0 +1,76 @@
+import os
+from threading import Event, Thread, get_native_id
+
+import pytest
+
+from recoverpy.lib.search.scan_throttle import (ScanThrottle,
+                                                set_scan_thread_priority)
+
+
+@pytest.fixture
+def fake_clock(mocker):
+    clock = {"now": 0.0, "slept": 0.0}
+
+    def sleep(seconds):
+        clock["now"] += seconds
+        clock["slept"] += seconds
+
+    mocker.patch(
+        "recoverpy.lib.search.scan_throttle.monotonic", side_effect=lambda: clock["now"]
+    )
+    mocker.patch("recoverpy.lib.search.scan_throttle.sleep", side_effect=sleep)
+    return clock
+
+
+def test_unlimited_throttle_never_sleeps(fake_clock):
+    throttle = ScanThrottle()
+
+    throttle.consume(10**12)
+
+    assert fake_clock["slept"] == 0
+
+
+def test_throttle_caps_average_rate(fake_clock):
+    throttle = ScanThrottle(1000)
+
+    for _ in range(10):
+        throttle.consume(300)
+
+    assert fake_clock["slept"] == pytest.approx(3.0)
+
+
+def test_throttle_rate_change_forgives_debt(fake_clock):
+    throttle = ScanThrottle(1000)
+    throttle.consume(1000)
+    slept = fake_clock["slept"]
+
+    throttle.set_rate(0)
+    throttle.consume(10**9)
+
+    assert fake_clock["slept"] == slept
+    assert throttle.rate == 0
+
+
+def test_throttle_wait_stops_with_scan(fake_clock):
+    throttle = ScanThrottle(1)
+    stop_event = Event()
+    stop_event.set()
+
+    throttle.consume(10**9, stop_event)
+
+    assert fake_clock["slept"] == 0
+
+
+def test_scan_thread_priority_only_affects_calling_thread():
+    niceness = {}
+
+    def scan_thread():
+        set_scan_thread_priority(niceness=5)
+        niceness["scan"] = os.getpriority(os.PRIO_PROCESS, get_native_id())
+
+    thread = Thread(target=scan_thread)
+    thread.start()
+    thread.join()
+
+    assert niceness["scan"] == max(5, os.getpriority(os.PRIO_PROCESS, 0))
+    assert os.getpriority(os.PRIO_PROCESS, get_native_id()) != 5
@@ -1,6 +1,14 @@
+import errno
+import os
+import re
+import threading
 from threading import Event
 
-from recoverpy.lib.search.binary_scanner import iter_scan_hits
+import pytest
+
+from recoverpy.lib.search import binary_scanner
+from recoverpy.lib.search.binary_scanner import ScanError, iter_scan_hits
+from recoverpy.lib.search.scan_error_map import ScanErrorMap
 
 
 def test_scan_offsets_are_exact(tmp_path):
@@ -87,3 +95,682 @@ def test_scan_cancel_stops_quickly(tmp_path):
     remaining = list(generator)
     # Scanner may finish the current chunk before stop check, but must stop quickly.
     assert len(remaining) <= 1
+
+
+def test_parallel_scan_matches_sequential_across_shard_edges(tmp_path):
+    needle = b"SHARD-EDGE"
+    shard_size = 1024
+    payload = bytearray(b"x" * (shard_size * 6))
+    # Place matches straddling every shard boundary plus one inside a shard.
+    expected_offsets = [shard_size * i - 3 for i in range(1, 6)] + [4500]
+    expected_offsets.sort()
+    for offset in expected_offsets:
+        payload[offset : offset + len(needle)] = needle
+
+    source = tmp_path / "shards.bin"
+    source.write_bytes(bytes(payload))
+
+    sequential = list(iter_scan_hits(str(source), needle, chunk_size=256))
+    parallel = list(
+        iter_scan_hits(
+            str(source), needle, chunk_size=256, workers=2, shard_size=shard_size
+        )
+    )
+
+    assert [hit.match_offset for hit in parallel] == expected_offsets
+    assert parallel == sequential
+
+
+def test_scan_rejects_invalid_worker_count(tmp_path):
+    source = tmp_path / "workers.bin"
+    source.write_bytes(b"x" * 16)
+
+    with pytest.raises(ValueError):
+        list(iter_scan_hits(str(source), b"x", workers=0))
+
+
+def test_multi_pattern_scan_reports_matching_pattern(tmp_path):
+    patterns = [b"alpha", b"beta", b"alphabet", b"bet"]
+    payload = bytearray(b"x" * 600)
+    payload[10:18] = b"alphabet"
+    payload[300:304] = b"beta"
+
+    source = tmp_path / "multi.bin"
+    source.write_bytes(bytes(payload))
+
+    hits = list(iter_scan_hits(str(source), patterns, chunk_size=64))
+    found = [(hit.match_offset, patterns[hit.pattern_index]) for hit in hits]
+
+    assert found == [
+        (10, b"alpha"),
+        (10, b"alphabet"),
+        (15, b"bet"),
+        (300, b"bet"),
+        (300, b"beta"),
+    ]
+
+
+def test_multi_pattern_scan_overlap_uses_longest_pattern(tmp_path):
+    patterns = [b"ab", b"LONG-PATTERN-XYZ"]
+    chunk_size = 32
+    payload = bytearray(b"x" * 128)
+    start = chunk_size - 5
+    payload[start : start + len(patterns[1])] = patterns[1]
+
+    source = tmp_path / "multi-boundary.bin"
+    source.write_bytes(bytes(payload))
+
+    hits = list(iter_scan_hits(str(source), patterns, chunk_size=chunk_size))
+
+    assert [(hit.match_offset, hit.pattern_index) for hit in hits] == [(start, 1)]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 16, 33, 4096])
+def test_regex_scan_matches_full_buffer_finditer(tmp_path, chunk_size):
+    regex = re.compile(rb"[a-z]+@example\.com")
+    payload = bytearray(b"." * 400)
+    for offset in (3, 30, 61, 62, 150, 350):
+        address = b"user%d@example.com" % offset
+        payload[offset : offset + len(address)] = address
+
+    source = tmp_path / "regex.bin"
+    source.write_bytes(bytes(payload))
+
+    hits = list(
+        iter_scan_hits(str(source), regex, chunk_size=chunk_size, max_match_len=24)
+    )
+
+    expected = [match.start() for match in regex.finditer(bytes(payload))]
+    assert [hit.match_offset for hit in hits] == expected
+
+
+def test_regex_scan_reports_short_match_at_end_of_source(tmp_path):
+    source = tmp_path / "regex-tail.bin"
+    source.write_bytes(b"x" * 100 + b"id=42")
+
+    hits = list(
+        iter_scan_hits(
+            str(source), re.compile(rb"id=\d+"), chunk_size=32, max_match_len=64
+        )
+    )
+
+    assert [hit.match_offset for hit in hits] == [100]
+
+
+def test_regex_scan_requires_max_match_len(tmp_path):
+    source = tmp_path / "regex-params.bin"
+    source.write_bytes(b"x" * 16)
+
+    with pytest.raises(ValueError):
+        list(iter_scan_hits(str(source), re.compile(rb"x+")))
+
+
+@pytest.mark.parametrize("chunk_size", [64, 100, 1000])
+def test_scan_previews_match_pread_window(tmp_path, chunk_size):
+    needle = b"HIT"
+    payload = bytes(range(256)) * 8
+    payload = bytearray(payload)
+    offsets = [5, 90, 95, 180, 700, 1500, 2040]
+    for offset in offsets:
+        payload[offset : offset + len(needle)] = needle
+    source = tmp_path / "previews.bin"
+    source.write_bytes(bytes(payload))
+
+    hits = list(
+        iter_scan_hits(
+            str(source),
+            needle,
+            chunk_size=chunk_size,
+            preview_before=20,
+            preview_after=40,
+            max_preview_len=50,
+        )
+    )
+
+    assert [hit.match_offset for hit in hits] == offsets
+    for hit in hits:
+        start = max(0, hit.match_offset - 20)
+        expected = bytes(payload[start : start + min(50, hit.match_offset + 40 - start)])
+        assert hit.preview == expected
+
+
+def test_scan_previews_do_not_pread_per_hit(tmp_path, mocker):
+    needle = b"word"
+    source = tmp_path / "dense.bin"
+    source.write_bytes(b"a word " * 2000)
+    pread = mocker.spy(os, "pread")
+
+    hits = list(iter_scan_hits(str(source), needle, chunk_size=4096))
+
+    assert len(hits) == 2000
+    assert pread.call_count == 0
+
+
+@pytest.mark.parametrize(
+    "needle, max_match_len",
+    [
+        (b"HIT", None),
+        ([b"HIT", b"IT-2"], None),
+        (re.compile(rb"HIT-\d"), 8),
+    ],
+)
+def test_mmap_backend_matches_read_backend(tmp_path, needle, max_match_len):
+    payload = bytearray(b"." * 5000)
+    for offset in (0, 63, 64, 1000, 4090, 4995):
+        payload[offset : offset + 5] = b"HIT-2"
+    source = tmp_path / "mapped.img"
+    source.write_bytes(bytes(payload))
+
+    def scan(backend):
+        return list(
+            iter_scan_hits(
+                str(source),
+                needle,
+                chunk_size=64,
+                preview_before=10,
+                preview_after=30,
+                max_preview_len=32,
+                max_match_len=max_match_len,
+                backend=backend,
+            )
+        )
+
+    assert scan("mmap") == scan("read")
+
+
+def test_mmap_backend_stops_cleanly(tmp_path):
+    source = tmp_path / "mapped-stop.img"
+    source.write_bytes(b"HIT." * 4096)
+    stop_event = Event()
+
+    generator = iter_scan_hits(
+        str(source),
+        re.compile(rb"HIT"),
+        chunk_size=1024,
+        max_match_len=3,
+        backend="mmap",
+        stop_event=stop_event,
+    )
+    assert next(generator).match_offset == 0
+
+    stop_event.set()
+    assert len(list(generator)) < 4096
+
+
+def test_mmap_backend_falls_back_for_empty_source(tmp_path):
+    source = tmp_path / "empty.img"
+    source.write_bytes(b"")
+
+    assert list(iter_scan_hits(str(source), b"HIT", backend="mmap")) == []
+
+
+@pytest.mark.parametrize(
+    "backend, io_policy",
+    [
+        ("read", "drop-behind"),
+        ("mmap", "drop-behind"),
+        ("read", "direct"),
+        ("mmap", "direct"),
+    ],
+)
+def test_io_policies_match_cached_scan(tmp_path, backend, io_policy):
+    payload = bytearray(b"." * 20000)
+    for offset in (0, 4093, 8190, 12000, 19995):
+        payload[offset : offset + 5] = b"HIT-2"
+    source = tmp_path / "policy.img"
+    source.write_bytes(bytes(payload))
+
+    def scan(backend, io_policy):
+        return list(
+            iter_scan_hits(
+                str(source),
+                b"HIT",
+                chunk_size=1000,
+                preview_before=10,
+                preview_after=30,
+                max_preview_len=32,
+                backend=backend,
+                io_policy=io_policy,
+            )
+        )
+
+    # Direct reads fall back to drop-behind where O_DIRECT is unsupported.
+    assert scan(backend, io_policy) == scan("read", "cached")
+
+
+def test_drop_behind_evicts_scanned_ranges(tmp_path, mocker):
+    source = tmp_path / "drop.img"
+    source.write_bytes(b"." * 10000)
+    fadvise = mocker.spy(os, "posix_fadvise")
+
+    list(iter_scan_hits(str(source), b"HIT", chunk_size=1000, io_policy="drop-behind"))
+
+    dropped = [
+        (offset, length)
+        for _fd, offset, length, advice in (call.args for call in fadvise.call_args_list)
+        if advice == os.POSIX_FADV_DONTNEED
+    ]
+    assert dropped
+    # Ranges are contiguous from the start and never overlap.
+    assert dropped[0][0] == 0
+    for (offset, length), (next_offset, _length) in zip(dropped, dropped[1:]):
+        assert offset + length == next_offset
+
+
+def test_cached_policy_does_not_advise(tmp_path, mocker):
+    source = tmp_path / "cached.img"
+    source.write_bytes(b"." * 10000)
+    fadvise = mocker.spy(os, "posix_fadvise")
+
+    list(iter_scan_hits(str(source), b"HIT", chunk_size=1000))
+
+    assert fadvise.call_count == 0
+
+
+def test_invalid_io_policy(tmp_path):
+    source = tmp_path / "invalid.img"
+    source.write_bytes(b"HIT")
+
+    with pytest.raises(ValueError):
+        list(iter_scan_hits(str(source), b"HIT", io_policy="uncached"))
+
+
+@pytest.mark.parametrize("read_ahead", [1, 3])
+@pytest.mark.parametrize("chunk_size", [64, 100, 1000])
+def test_read_ahead_matches_inline_reads(tmp_path, read_ahead, chunk_size):
+    payload = bytearray(b"." * 5000)
+    for offset in (0, 63, 64, 1000, 4090, 4995):
+        payload[offset : offset + 5] = b"HIT-2"
+    source = tmp_path / "read-ahead.img"
+    source.write_bytes(bytes(payload))
+
+    def scan(read_ahead):
+        return list(
+            iter_scan_hits(
+                str(source),
+                [b"HIT", b"IT-2"],
+                chunk_size=chunk_size,
+                preview_before=10,
+                preview_after=30,
+                max_preview_len=32,
+                read_ahead=read_ahead,
+            )
+        )
+
+    assert scan(read_ahead) == scan(0)
+
+
+def test_read_ahead_thread_stops_with_scan(tmp_path):
+    source = tmp_path / "read-ahead-stop.img"
+    source.write_bytes(b"HIT." * 4096)
+
+    generator = iter_scan_hits(str(source), b"HIT", chunk_size=64, read_ahead=2)
+    assert next(generator).match_offset == 0
+    generator.close()
+
+    assert not any(thread.name == "scan-read-ahead" for thread in threading.enumerate())
+
+
+def test_read_ahead_propagates_read_errors(tmp_path, mocker):
+    source = tmp_path / "read-ahead-error.img"
+    source.write_bytes(b"HIT." * 4096)
+    mocker.patch("os.preadv", side_effect=OSError(5, "Input/output error"))
+
+    with pytest.raises(ScanError):
+        list(iter_scan_hits(str(source), b"HIT", chunk_size=64, read_ahead=2))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_throttle_accounts_for_every_scanned_byte(tmp_path, workers):
+    source = tmp_path / "throttled.img"
+    source.write_bytes(b"." * 10000)
+
+    class CountingThrottle:
+        consumed = 0
+
+        def consume(self, byte_count, stop_event=None):
+            self.consumed += byte_count
+
+    throttle = CountingThrottle()
+    list(
+        iter_scan_hits(
+            str(source),
+            b"HIT",
+            chunk_size=1000,
+            workers=workers,
+            shard_size=4096,
+            throttle=throttle,
+        )
+    )
+
+    assert throttle.consumed == 10000
+
+
+def test_parallel_scan_groups_small_ranges_into_shards(tmp_path):
+    source = tmp_path / "fragmented.img"
+    source.write_bytes(b"NEEDLE".ljust(200, b".") * 100)
+    ranges = [(start, start + 100) for start in range(0, 20000, 200)]
+    progress = []
+
+    hits = list(
+        iter_scan_hits(
+            str(source),
+            b"NEEDLE",
+            workers=2,
+            shard_size=4096,
+            ranges=ranges,
+            progress_callback=progress.append,
+        )
+    )
+
+    assert [hit.match_offset for hit in hits] == [start for start, _ in ranges]
+    # One progress report per shard of 4096 scanned bytes.
+    assert progress == [8096, 16292, 19900]
+
+
+def _fail_reads_in(mocker, bad_start, bad_end):
+    real_preadv = os.preadv
+
+    def preadv(fd, buffers, offset):
+        length = sum(len(buffer) for buffer in buffers)
+        if offset < bad_end and offset + length > bad_start:
+            raise OSError(errno.EIO, "Input/output error")
+        return real_preadv(fd, buffers, offset)
+
+    mocker.patch("os.preadv", side_effect=preadv)
+
+
+@pytest.mark.parametrize("read_ahead", [0, 2])
+def test_read_errors_are_mapped_and_skipped(tmp_path, mocker, read_ahead):
+    payload = bytearray(b"." * 12000)
+    for offset in (100, 4000, 6000, 11000):
+        payload[offset : offset + 3] = b"HIT"
+    source = tmp_path / "failing.img"
+    source.write_bytes(bytes(payload))
+    _fail_reads_in(mocker, 4096, 5120)
+    error_map = ScanErrorMap()
+
+    hits = list(
+        iter_scan_hits(
+            str(source),
+            b"HIT",
+            chunk_size=2048,
+            read_ahead=read_ahead,
+            error_map=error_map,
+        )
+    )
+
+    assert [hit.match_offset for hit in hits] == [100, 4000, 6000, 11000]
+    [(bad_start, bad_end)] = error_map.get_ranges()
+    assert bad_start == 4096
+    assert 5120 <= bad_end <= 6000
+
+
+def test_read_errors_abort_scan_without_error_map(tmp_path, mocker):
+    source = tmp_path / "failing-strict.img"
+    source.write_bytes(b"." * 12000)
+    _fail_reads_in(mocker, 4096, 5120)
+
+    with pytest.raises(ScanError):
+        list(iter_scan_hits(str(source), b"HIT", chunk_size=2048))
+
+
+def test_sparse_file_holes_are_not_read(tmp_path, mocker):
+    source = tmp_path / "sparse.img"
+    with open(source, "wb") as sparse_file:
+        sparse_file.write(b"HIT at start")
+        sparse_file.seek(64 * 1024 * 1024)
+        sparse_file.write(b"\x00\x00HIT after hole")
+        sparse_file.truncate(128 * 1024 * 1024)
+    preadv = mocker.spy(os, "preadv")
+    progress = []
+
+    hits = list(
+        iter_scan_hits(
+            str(source),
+            [b"HIT", b"\x00HIT"],
+            chunk_size=1024 * 1024,
+            progress_callback=progress.append,
+        )
+    )
+
+    assert [(hit.match_offset, hit.pattern_index) for hit in hits] == [
+        (0, 0),
+        (64 * 1024 * 1024 + 1, 1),
+        (64 * 1024 * 1024 + 2, 0),
+    ]
+    with open(source, "rb") as sparse_file:
+        first_hole = os.lseek(sparse_file.fileno(), 0, os.SEEK_HOLE)
+    if first_hole < 64 * 1024 * 1024:
+        # The file system reports holes: they are skipped without reading.
+        bytes_read = sum(len(call.args[1][0]) for call in preadv.call_args_list)
+        assert bytes_read < 16 * 1024 * 1024
+    # Skipped bytes still count as scanned.
+    assert progress == sorted(progress)
+    assert progress[-1] == 128 * 1024 * 1024
+
+
+@pytest.mark.parametrize("read_ahead", [0, 1])
+def test_zero_chunks_keep_boundary_matches(tmp_path, read_ahead):
+    chunk_size = 1024
+    payload = bytearray(8 * chunk_size)
+    payload[1000:1024] = b"x" * 20 + b"AB\x00\x00"
+    payload[3 * chunk_size : 3 * chunk_size + 8] = b"CD" + b"y" * 6
+    payload[6 * chunk_size - 2 : 6 * chunk_size + 4] = b"\x00\x00EFzz"
+    source = tmp_path / "zeros.img"
+    source.write_bytes(bytes(payload))
+
+    hits = list(
+        iter_scan_hits(
+            str(source),
+            [b"AB\x00\x00\x00", b"\x00\x00CD", b"\x00EF"],
+            chunk_size=chunk_size,
+            preview_before=4,
+            preview_after=8,
+            read_ahead=read_ahead,
+        )
+    )
+
+    assert [(hit.match_offset, hit.pattern_index) for hit in hits] == [
+        (1020, 0),
+        (3 * chunk_size - 2, 1),
+        (6 * chunk_size - 1, 2),
+    ]
+    assert hits[0].preview == b"xxxxAB" + bytes(6)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resuming_from_progress_offset_finds_remaining_hits(tmp_path, workers):
+    payload = bytearray(b"." * 40000)
+    for offset in range(100, 40000, 1500):
+        payload[offset : offset + 3] = b"HIT"
+    # Straddles the 8192 byte chunk boundary.
+    payload[8190:8193] = b"HIT"
+    source = tmp_path / "resume.img"
+    source.write_bytes(bytes(payload))
+    scan_kwargs = {"chunk_size": 1024, "workers": workers, "shard_size": 8192}
+    all_hits = [hit.match_offset for hit in iter_scan_hits(str(source), b"HIT", **scan_kwargs)]
+
+    # Interrupt the scan after the first progress report past 8000 bytes.
+    progress = []
+    hits_before = []
+    for hit in iter_scan_hits(
+        str(source), b"HIT", progress_callback=progress.append, **scan_kwargs
+    ):
+        if progress and progress[-1] > 8000:
+            break
+        hits_before.append(hit.match_offset)
+    resume_offset = progress[-1]
+    hits_after = [
+        hit.match_offset
+        for hit in iter_scan_hits(
+            str(source), b"HIT", start_offset=resume_offset, **scan_kwargs
+        )
+    ]
+
+    kept = [offset for offset in hits_before if offset < resume_offset]
+    assert kept + hits_after == all_hits
+
+
+@pytest.mark.parametrize(
+    "scan_kwargs",
+    [
+        {},
+        {"read_ahead": 0},
+        {"backend": "mmap"},
+        {"workers": 2, "shard_size": 4096},
+    ],
+)
+def test_sub_range_scan_matches_full_scan_inside_range(tmp_path, scan_kwargs):
+    payload = bytearray(b"." * 30000)
+    for offset in range(50, 30000, 997):
+        payload[offset : offset + 6] = b"NEEDLE"
+    # Matches crossing each bound, starting at the start and ending at the end.
+    for offset in (9997, 10003, 19991, 19997):
+        payload[offset : offset + 6] = b"NEEDLE"
+    source = tmp_path / "range.img"
+    source.write_bytes(bytes(payload))
+    full_scan = list(iter_scan_hits(str(source), b"NEEDLE", chunk_size=1024, **scan_kwargs))
+
+    for start, end in ((10000, 20000), (10003, 19997)):
+        range_scan = list(
+            iter_scan_hits(
+                str(source),
+                b"NEEDLE",
+                chunk_size=1024,
+                start_offset=start,
+                end_offset=end,
+                **scan_kwargs,
+            )
+        )
+        assert range_scan == [hit for hit in full_scan if start <= hit.match_offset < end]
+        assert range_scan[0].match_offset == 10003
+        assert range_scan[-1].match_offset == (19997 if end == 20000 else 19991)
+
+
+@pytest.mark.parametrize(
+    "scan_kwargs",
+    [{}, {"backend": "mmap"}, {"workers": 2, "shard_size": 4096}],
+)
+def test_regex_sub_range_scan_matches_full_scan(tmp_path, scan_kwargs):
+    regex = re.compile(rb"\d{2,4}")
+    payload = bytearray(b"." * 20000)
+    for offset in range(17, 20000, 613):
+        payload[offset : offset + 8] = b"12345678"
+    # Hundreds of back-to-back matches.
+    payload[2000:6001] = b"7" * 4001
+    source = tmp_path / "regex-range.img"
+    source.write_bytes(bytes(payload))
+    full_scan = list(
+        iter_scan_hits(str(source), regex, chunk_size=1024, max_match_len=4, **scan_kwargs)
+    )
+
+    # Each range starts inside a run of digits matched as several hits.
+    for start, end in ((8601, 15000), (8602, 14726), (8603, 14727), (5001, 9000)):
+        range_scan = list(
+            iter_scan_hits(
+                str(source),
+                regex,
+                chunk_size=1024,
+                max_match_len=4,
+                start_offset=start,
+                end_offset=end,
+                **scan_kwargs,
+            )
+        )
+        assert range_scan == [hit for hit in full_scan if start <= hit.match_offset < end]
+
+
+@pytest.mark.parametrize(
+    "scan_kwargs",
+    [
+        {},
+        {"read_ahead": 0},
+        {"backend": "mmap"},
+        {"io_policy": "direct"},
+        {"workers": 2, "shard_size": 4096},
+    ],
+)
+@pytest.mark.parametrize("needle", [b"NEEDLE", re.compile(rb"NEE\w+")])
+def test_range_list_scan_matches_full_scan_inside_ranges(tmp_path, scan_kwargs, needle):
+    payload = bytearray(b"." * 30000)
+    for offset in range(50, 30000, 397):
+        payload[offset : offset + 6] = b"NEEDLE"
+    source = tmp_path / "ranges.img"
+    source.write_bytes(bytes(payload))
+    scan_kwargs = {"chunk_size": 1024, "max_match_len": 16, **scan_kwargs}
+    full_scan = list(iter_scan_hits(str(source), needle, **scan_kwargs))
+    # Unsorted, overlapping, touching and clipped by the scan range.
+    ranges = [(20000, 40000), (449, 452), (5000, 9000), (8000, 9500), (9500, 9600)]
+    progress = []
+
+    range_scan = list(
+        iter_scan_hits(
+            str(source),
+            needle,
+            start_offset=100,
+            end_offset=25000,
+            ranges=ranges,
+            progress_callback=progress.append,
+            **scan_kwargs,
+        )
+    )
+
+    assert range_scan == [
+        hit
+        for hit in full_scan
+        if any(max(start, 100) <= hit.match_offset < min(end, 25000) for start, end in ranges)
+    ]
+    assert progress == sorted(progress)
+
+
+def test_range_list_is_scanned_through_one_source(tmp_path, mocker):
+    source = tmp_path / "ranges.img"
+    source.write_bytes(b"NEEDLE".ljust(4096, b".") * 64)
+    open_scan_source = mocker.spy(binary_scanner, "_open_scan_source")
+    ranges = [(start, start + 100) for start in range(0, 64 * 4096, 8192)]
+
+    hits = list(iter_scan_hits(str(source), b"NEEDLE", ranges=ranges))
+
+    assert [hit.match_offset for hit in hits] == [start for start, _ in ranges]
+    assert open_scan_source.call_count == 1
+
+
+def test_empty_sub_range_yields_no_hits(tmp_path):
+    source = tmp_path / "empty-range.img"
+    source.write_bytes(b"NEEDLE" * 100)
+
+    assert list(iter_scan_hits(str(source), b"NEEDLE", start_offset=60, end_offset=60)) == []
+    with pytest.raises(ValueError):
+        list(iter_scan_hits(str(source), b"NEEDLE", start_offset=60, end_offset=30))
+
+
+class _CyclingChunkTuner:
+    min_chunk_size = 1024
+    max_chunk_size = 4096
+
+    def __init__(self, source_path, hints):
+        self._sizes = [1024, 4096, 2048, 3072]
+        self.chunk_size = self._sizes[0]
+
+    def record_read(self, byte_count, seconds):
+        self._sizes.append(self._sizes.pop(0))
+        self.chunk_size = self._sizes[0]
+
+
+@pytest.mark.parametrize("read_ahead", [0, 1])
+def test_tuned_chunk_sizes_keep_hits_exact(tmp_path, mocker, read_ahead):
+    payload = bytearray(b"." * 40000)
+    payload[20000:30000] = bytes(10000)
+    for offset in range(13, 40000, 701):
+        payload[offset : offset + 6] = b"NEEDLE"
+    source = tmp_path / "tuned.img"
+    source.write_bytes(bytes(payload))
+    fixed = list(iter_scan_hits(str(source), b"NEEDLE", chunk_size=2048))
+    mocker.patch.object(binary_scanner, "ChunkSizeTuner", _CyclingChunkTuner)
+
+    tuned = list(
+        iter_scan_hits(str(source), b"NEEDLE", auto_chunk_size=True, read_ahead=read_ahead)
+    )
+
+    assert tuned == fixed
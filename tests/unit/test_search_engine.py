@@ -5,6 +5,8 @@ import pytest
 
 import recoverpy.lib.search.search_engine as search_engine_module
 from recoverpy.lib.search.binary_scanner import ScanHit
+from recoverpy.models.scan_range import ScanOffset
+from recoverpy.models.search_options import SearchOptions
 from tests.fixtures.mock_scan_hits import SCAN_HIT_COUNT
 from tests.integration.helper import assert_with_timeout
 
@@ -70,6 +72,65 @@ def test_pause_resume_flags(search_engine):
     assert search_engine.is_paused() is False
 
 
+def test_bandwidth_limit_is_adjustable_during_search(mocker):
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="Lorem ipsum",
+        options=SearchOptions(bandwidth_limit_mb=50),
+    )
+    captured = {}
+
+    def throttled_hits(*args, **kwargs):
+        captured["throttle"] = kwargs["throttle"]
+        return iter(())
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=throttled_hits)
+    engine._scan_hits_worker()
+
+    assert captured["throttle"].rate == 50 * 1000 * 1000
+    engine.set_bandwidth_limit(10)
+    assert engine.get_bandwidth_limit() == 10
+    assert captured["throttle"].rate == 10 * 1000 * 1000
+
+
+def test_progress_follows_scanned_bytes_without_hits(mocker):
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1", searched_string="Lorem ipsum"
+    )
+    progress_snapshots = []
+
+    def hitless_scan(*args, **kwargs):
+        for fraction in (0.25, 0.5):
+            kwargs["progress_callback"](int(engine._source_size_bytes * fraction))
+            progress_snapshots.append(engine.search_progress.progress_percent)
+        return iter(())
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=hitless_scan)
+    engine._scan_hits_worker()
+
+    assert progress_snapshots == pytest.approx([25.0, 50.0], abs=0.01)
+
+
+def test_error_map_is_exported_when_scan_ends(mocker, tmp_path):
+    map_path = tmp_path / "errors.map"
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="Lorem ipsum",
+        options=SearchOptions(tolerate_read_errors=True, error_map_path=str(map_path)),
+    )
+
+    def failing_disk_hits(*args, **kwargs):
+        kwargs["error_map"].add(4096, 8192)
+        return iter(())
+
+    mocker.patch.object(
+        search_engine_module, "iter_scan_hits", side_effect=failing_disk_hits
+    )
+    engine._scan_hits_worker()
+
+    assert map_path.read_text().splitlines()[-1] == "0x00001000  0x00001000  -"
+
+
 def test_raw_hits_queue_is_bounded_with_backpressure(mocker):
     engine = search_engine_module.SearchEngine(
         partition="/dev/sda1", searched_string="Lorem ipsum"
@@ -91,3 +152,125 @@ def test_raw_hits_queue_is_bounded_with_backpressure(mocker):
     engine._stop_event.set()
     thread.join(timeout=2.0)
     assert thread.is_alive() is False
+
+
+def test_keyword_search_scans_all_patterns_in_one_pass(mocker):
+    captured = {}
+
+    def keyword_hits(source_path, needles, **kwargs):
+        captured["needles"] = needles
+        yield ScanHit(match_offset=4096, preview=b"found beta here", pattern_index=2)
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=keyword_hits)
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="alpha",
+        options=SearchOptions(keywords=["gamma", "beta"]),
+    )
+
+    engine._scan_hits_worker()
+    engine._convert_hits_worker()
+
+    assert captured["needles"] == [b"alpha", b"gamma", b"beta"]
+    result = engine.formatted_results_queue.get_nowait()
+    assert result.line == "[beta] found beta here"
+
+
+def test_regex_search_passes_compiled_pattern(mocker):
+    captured = {}
+
+    def regex_hits(source_path, needle, **kwargs):
+        captured["needle"] = needle
+        captured["max_match_len"] = kwargs["max_match_len"]
+        return iter(())
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=regex_hits)
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string=r"user\d+",
+        options=SearchOptions(regex=True, max_match_len=32),
+    )
+
+    engine._scan_hits_worker()
+
+    assert captured["needle"].pattern == rb"user\d+"
+    assert captured["max_match_len"] == 32
+    assert engine.search_progress.error_message is None
+
+
+def test_invalid_regex_surfaces_error_message(mocker):
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="user(",
+        options=SearchOptions(regex=True),
+    )
+
+    engine._scan_hits_worker()
+
+    assert engine.search_progress.error_message.startswith("Invalid regular expression")
+
+
+def test_checkpoint_saves_and_resumes_scan(mocker, tmp_path):
+    checkpoint_path = str(tmp_path / "scan.checkpoint")
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="Lorem ipsum",
+        options=SearchOptions(checkpoint_path=checkpoint_path),
+    )
+
+    def interrupted_scan(*args, **kwargs):
+        yield ScanHit(match_offset=4096, preview=b"Lorem ipsum")
+        kwargs["progress_callback"](8192)
+        engine._stop_event.set()
+        yield ScanHit(match_offset=12288, preview=b"Lorem ipsum")
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=interrupted_scan)
+    engine._scan_hits_worker()
+
+    captured = {}
+
+    def resumed_scan(*args, **kwargs):
+        captured["start_offset"] = kwargs["start_offset"]
+        yield ScanHit(match_offset=12288, preview=b"Lorem ipsum")
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=resumed_scan)
+    resumed = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="Lorem ipsum",
+        options=SearchOptions(resume_from=checkpoint_path),
+    )
+    resumed._scan_hits_worker()
+
+    assert captured["start_offset"] == 8192
+    offsets = []
+    while not resumed.raw_scan_hits_queue.empty():
+        hit = resumed.raw_scan_hits_queue.get_nowait()
+        if hit is not None:
+            offsets.append(hit.match_offset)
+    assert offsets == [4096, 12288]
+
+
+def test_scan_range_bounds_scan_and_progress(mocker):
+    captured = {}
+    progress_snapshots = []
+
+    engine = search_engine_module.SearchEngine(
+        partition="/dev/sda1",
+        searched_string="Lorem ipsum",
+        options=SearchOptions(
+            scan_start=ScanOffset(25, is_percent=True), scan_end=ScanOffset(768 * 1024)
+        ),
+    )
+
+    def range_scan(*args, **kwargs):
+        captured["range"] = kwargs["start_offset"], kwargs["end_offset"]
+        kwargs["progress_callback"](512 * 1024)
+        progress_snapshots.append(engine.search_progress.progress_percent)
+        return iter(())
+
+    mocker.patch.object(search_engine_module, "iter_scan_hits", side_effect=range_scan)
+    engine._scan_hits_worker()
+
+    assert captured["range"] == (256 * 1024, 768 * 1024)
+    assert progress_snapshots == pytest.approx([50.0])
+    assert engine.search_progress.progress_percent == 100.0
@@ -0,0 +1,174 @@
+import json
+from threading import Lock
+from time import sleep
+
+import pytest
+
+from recoverpy.lib.search import search_jobs
+from recoverpy.lib.search.search_jobs import (JOB_STATUS_COMPLETED,
+                                              SUMMARY_REPORT_NAME,
+                                              SearchJobError, load_search_jobs,
+                                              run_search_jobs)
+from recoverpy.models.scan_range import ScanOffset
+from recoverpy.models.search_options import SearchOptions
+from tests.fixtures.mock_scan_hits import SCAN_HIT_COUNT
+
+
+def _write_jobs(tmp_path, jobs):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps({"jobs": jobs}))
+    return str(path)
+
+
+def test_load_jobs_overrides_base_options(tmp_path):
+    path = _write_jobs(
+        tmp_path,
+        [
+            {"device": "/dev/sda1", "search": "needle", "options": {"regex": True}},
+            {
+                "name": "home dir",
+                "device": "/dev/sdb1",
+                "search": "other",
+                "options": {"scan_end": "50%", "checkpoint_path": "home.ckpt"},
+            },
+        ],
+    )
+    base_options = SearchOptions(scan_workers=4, checkpoint_path="shared.ckpt")
+
+    first, second = load_search_jobs(path, base_options)
+
+    assert first.name == "job1-sda1"
+    assert first.options.regex and first.options.scan_workers == 4
+    # Per-device files are never inherited from the command line.
+    assert first.options.checkpoint_path is None
+    assert second.name == "home_dir"
+    assert second.options.scan_end == ScanOffset(50, is_percent=True)
+    assert second.options.checkpoint_path == "home.ckpt"
+
+
+@pytest.mark.parametrize(
+    "jobs",
+    [
+        [],
+        [{"device": "/dev/sda1"}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"colour": "red"}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"scan_start": "-1"}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"keywords": "abc"}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"scan_workers": "4"}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"regex": 1}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"io_policy": "fast"}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"niceness": 40}}],
+        [{"device": "/dev/sda1", "search": "x", "options": {"scan_end": [1]}}],
+        [
+            {"name": "a", "device": "/dev/sda1", "search": "x"},
+            {"name": "a", "device": "/dev/sdb1", "search": "y"},
+        ],
+    ],
+)
+def test_load_jobs_rejects_invalid_files(tmp_path, jobs):
+    with pytest.raises(SearchJobError):
+        load_search_jobs(_write_jobs(tmp_path, jobs), SearchOptions())
+
+
+def test_load_jobs_checks_option_types(tmp_path):
+    options = {
+        "keywords": ["abc", "def"],
+        "scan_workers": 4,
+        "io_class": None,
+        "niceness": -5,
+        "scan_start": 4096,
+    }
+    job_entry = {"name": "typed", "device": "/dev/sda1", "search": "x"}
+
+    (job,) = load_search_jobs(
+        _write_jobs(tmp_path, [{**job_entry, "options": options}]), SearchOptions()
+    )
+
+    assert job.options.keywords == ["abc", "def"]
+    assert job.options.scan_workers == 4 and job.options.niceness == -5
+    assert job.options.scan_start == ScanOffset(4096)
+    # Errors name the job.
+    with pytest.raises(SearchJobError, match="typed"):
+        load_search_jobs(
+            _write_jobs(tmp_path, [{**job_entry, "options": {"scan_workers": "4"}}]),
+            SearchOptions(),
+        )
+
+
+def test_one_job_per_physical_disk(tmp_path, monkeypatch):
+    disks = {"/dev/sda1": ("sda",), "/dev/sda2": ("sda",), "/dev/sdb1": ("sdb",)}
+    monkeypatch.setattr(search_jobs, "get_partitions", lambda filtered: [])
+    monkeypatch.setattr(search_jobs, "get_physical_disks", disks.__getitem__)
+    running = set()
+    overlaps = []
+    lock = Lock()
+
+    def fake_run_engine(report, stop_event):
+        with lock:
+            overlaps.append(set(running))
+            running.add(report.job.device_path)
+        sleep(0.3)
+        with lock:
+            running.discard(report.job.device_path)
+        report.status = JOB_STATUS_COMPLETED
+
+    monkeypatch.setattr(search_jobs, "_run_engine", fake_run_engine)
+    jobs = load_search_jobs(
+        _write_jobs(
+            tmp_path,
+            [{"device": device, "search": "x"} for device in sorted(disks)],
+        ),
+        SearchOptions(),
+    )
+
+    reports = run_search_jobs(jobs, str(tmp_path / "reports"))
+
+    assert [report.status for report in reports] == [JOB_STATUS_COMPLETED] * 3
+    # sda1 and sdb1 start together, sda2 waits for sda1.
+    assert overlaps[:2] in ([set(), {"/dev/sda1"}], [set(), {"/dev/sdb1"}])
+    assert "/dev/sda1" not in overlaps[2]
+
+
+def test_reports_hold_job_results(tmp_path):
+    jobs = load_search_jobs(
+        _write_jobs(tmp_path, [{"name": "disk1", "device": "/dev/sda1", "search": "Lorem"}]),
+        SearchOptions(),
+    )
+    report_dir = tmp_path / "reports"
+
+    (report,) = run_search_jobs(jobs, str(report_dir))
+
+    assert report.status == JOB_STATUS_COMPLETED
+    content = json.loads((report_dir / "disk1.json").read_text())
+    assert content["result_count"] == SCAN_HIT_COUNT
+    assert [result["block"] for result in content["results"]] == [1, 2, 3]
+    assert content["results"][0]["offset"] == 4096
+    summary = json.loads((report_dir / SUMMARY_REPORT_NAME).read_text())
+    assert summary["jobs"][0]["status"] == JOB_STATUS_COMPLETED
+
+
+def test_shared_scan_jobs_run_together(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_jobs, "get_partitions", lambda filtered: [])
+    monkeypatch.setattr(search_jobs, "get_physical_disks", lambda path: ("sda",))
+    started = []
+    seen_running = {}
+
+    def fake_run_engine(report, stop_event):
+        started.append(report.job.search_string)
+        sleep(0.3)
+        seen_running[report.job.search_string] = list(started)
+        report.status = JOB_STATUS_COMPLETED
+
+    monkeypatch.setattr(search_jobs, "_run_engine", fake_run_engine)
+    jobs = load_search_jobs(
+        _write_jobs(
+            tmp_path,
+            [{"device": "/dev/sda1", "search": search} for search in ("a", "b")],
+        ),
+        SearchOptions(shared_scan=True),
+    )
+
+    run_search_jobs(jobs, str(tmp_path / "reports"))
+
+    # The first job saw the second one start while it was running.
+    assert sorted(seen_running["a"]) == ["a", "b"]
@@ -0,0 +1,50 @@
+import pytest
+
+from recoverpy.models.search_progress import SearchProgress
+
+
+@pytest.fixture
+def clock(mocker):
+    now = {"value": 100.0}
+    mocker.patch(
+        "recoverpy.models.search_progress.monotonic", side_effect=lambda: now["value"]
+    )
+    return now
+
+
+def test_progress_tracks_bytes_scanned(clock):
+    progress = SearchProgress()
+    progress.start(1000)
+
+    progress.update_bytes_scanned(250)
+
+    assert progress.progress_percent == 25.0
+    assert progress.bytes_per_second is None
+    assert progress.get_eta_seconds() is None
+
+
+def test_throughput_is_smoothed_and_drives_eta(clock):
+    progress = SearchProgress()
+    progress.start(10_000)
+
+    clock["value"] += 1
+    progress.update_bytes_scanned(1000)
+    assert progress.bytes_per_second == pytest.approx(1000)
+    assert progress.get_eta_seconds() == pytest.approx(9)
+
+    clock["value"] += 1
+    progress.update_bytes_scanned(3000)
+    # A single faster sample only moves the rate part of the way.
+    assert 1000 < progress.bytes_per_second < 2000
+
+
+def test_time_to_first_hit_is_recorded_once(clock):
+    progress = SearchProgress()
+    progress.start(1000)
+
+    clock["value"] += 2.5
+    progress.record_hit()
+    clock["value"] += 10
+    progress.record_hit()
+
+    assert progress.time_to_first_hit == pytest.approx(2.5)
@@ -73,3 +73,34 @@ async def test_toggle_pause_action_changes_button_label() -> None:
     await screen.action_toggle_pause()
     assert screen.search_engine.is_paused() is False  # type: ignore[union-attr]
     assert screen._pause_button.label == "Pause"
+
+
+@pytest.mark.asyncio
+async def test_cycle_limit_action_steps_through_bandwidth_caps() -> None:
+    class FakeEngine:
+        def __init__(self) -> None:
+            self.limit = 0
+
+        def get_bandwidth_limit(self) -> int:
+            return self.limit
+
+        def set_bandwidth_limit(self, limit_mb: int) -> None:
+            self.limit = limit_mb
+
+    screen = SearchScreen()
+    screen.search_engine = FakeEngine()  # type: ignore[assignment]
+    screen._limit_button = type(
+        "FakeButton", (), {"label": "Limit: off", "disabled": False}
+    )()  # type: ignore[assignment]
+
+    await screen.action_cycle_limit()
+    assert screen.search_engine.get_bandwidth_limit() == 500  # type: ignore[union-attr]
+    assert screen._limit_button.label == "Limit: 500 MB/s"
+
+    screen.search_engine.set_bandwidth_limit(30)  # type: ignore[union-attr]
+    await screen.action_cycle_limit()
+    assert screen.search_engine.get_bandwidth_limit() == 20  # type: ignore[union-attr]
+
+    screen.search_engine.set_bandwidth_limit(10)  # type: ignore[union-attr]
+    await screen.action_cycle_limit()
+    assert screen._limit_button.label == "Limit: off"
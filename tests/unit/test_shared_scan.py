@@ -0,0 +1,92 @@
+import random
+from threading import Thread
+
+import pytest
+
+from recoverpy.lib.search.binary_scanner import iter_scan_hits
+from recoverpy.lib.search.search_engine import SearchEngine
+from recoverpy.lib.search.shared_scan import SharedScanSession
+from recoverpy.models.search_options import SearchOptions
+from tests.integration.helper import assert_with_timeout
+
+_CHUNK_SIZE = 64 * 1024
+_SOURCE_SIZE = 1024 * 1024
+
+
+def _write_source(tmp_path):
+    payload = bytearray(random.Random(5).randbytes(_SOURCE_SIZE))
+    # Needles inside chunks and straddling chunk edges.
+    for offset in (1000, _CHUNK_SIZE - 3, 5 * _CHUNK_SIZE - 1, 600_000, _SOURCE_SIZE - 6):
+        payload[offset : offset + 6] = b"NEEDLE"
+    for offset in (2 * _CHUNK_SIZE - 2, 700_000):
+        payload[offset : offset + 5] = b"OTHER"
+    path = tmp_path / "disk.img"
+    path.write_bytes(payload)
+    return str(path)
+
+
+def _collect(hits, results):
+    results.extend(hits)
+
+
+def test_late_search_wraps_around_and_shares_reads(tmp_path):
+    path = _write_source(tmp_path)
+    session = SharedScanSession(path, chunk_size=_CHUNK_SIZE)
+    first_hits = session.iter_hits(b"NEEDLE")
+    first_results = [next(first_hits)]
+    # The reader is past the start of the device when the second search joins.
+    second_results = []
+    second = Thread(
+        target=_collect, args=(session.iter_hits(b"OTHER"), second_results)
+    )
+    second.start()
+    first_results.extend(first_hits)
+    second.join(timeout=10)
+
+    assert first_results == list(iter_scan_hits(path, b"NEEDLE"))
+    assert sorted(second_results, key=lambda hit: hit.match_offset) == list(
+        iter_scan_hits(path, b"OTHER")
+    )
+    assert session.bytes_read < 2 * _SOURCE_SIZE
+
+
+def test_ranges_and_progress(tmp_path):
+    path = _write_source(tmp_path)
+    session = SharedScanSession(path, chunk_size=_CHUNK_SIZE)
+    progress = []
+
+    hits = list(
+        session.iter_hits(
+            b"NEEDLE",
+            start_offset=_CHUNK_SIZE,
+            end_offset=600_001,
+            progress_callback=progress.append,
+        )
+    )
+
+    assert [hit.match_offset for hit in hits] == [5 * _CHUNK_SIZE - 1, 600_000]
+    assert progress[-1] == 600_001 - _CHUNK_SIZE
+    # Only the range and the overlap of its last match were read.
+    assert session.bytes_read < _SOURCE_SIZE
+
+
+@pytest.mark.asyncio
+async def test_engines_share_one_device_read(tmp_path):
+    path = _write_source(tmp_path)
+    options = SearchOptions(shared_scan=True)
+    engines = [
+        SearchEngine(path, "NEEDLE", options),
+        SearchEngine(path, "OTHER", options),
+    ]
+    for engine in engines:
+        await engine.start_search()
+
+    for engine, expected in zip(engines, (5, 2)):
+        await assert_with_timeout(
+            lambda engine=engine, expected=expected: engine.search_progress.result_count
+            == expected,
+            expected,
+            engine.search_progress.result_count,
+        )
+        assert engine.wait_for_completion(timeout=5)
+        assert engine.search_progress.error_message is None
@@ -0,0 +1,122 @@
+import os
+import random
+from collections import OrderedDict
+
+from recoverpy.lib.search.binary_scanner import iter_scan_hits
+from recoverpy.lib.storage import split_image
+from recoverpy.lib.storage.block_device_inventory import get_image_partition
+from recoverpy.lib.storage.byte_range_reader import read_block, read_range
+from recoverpy.lib.storage.split_image import (get_split_segments,
+                                               open_split_image)
+
+
+def _image_payload():
+    rng = random.Random(11)
+    payload = bytearray(rng.randbytes(3 * 1024 * 1024))
+    for offset in (100_000, 1_048_573, 2_097_150, 3_000_000):
+        payload[offset : offset + 6] = b"NEEDLE"
+    return bytes(payload)
+
+
+def _write_segments(tmp_path, payload, segment_size=1024 * 1024):
+    for index, start in enumerate(range(0, len(payload), segment_size)):
+        path = tmp_path / f"disk.{index + 1:03d}"
+        path.write_bytes(payload[start : start + segment_size])
+    return str(tmp_path / "disk.001")
+
+
+def test_scan_finds_matches_straddling_segments(tmp_path):
+    payload = _image_payload()
+    path = _write_segments(tmp_path, payload)
+    plain = tmp_path / "disk.img"
+    plain.write_bytes(payload)
+
+    expected = list(iter_scan_hits(str(plain), b"NEEDLE", chunk_size=256 * 1024))
+    serial = list(iter_scan_hits(path, b"NEEDLE", chunk_size=256 * 1024))
+    sharded = list(
+        iter_scan_hits(
+            path, b"NEEDLE", chunk_size=256 * 1024, workers=2, shard_size=512 * 1024
+        )
+    )
+
+    assert [hit.match_offset for hit in expected] == [
+        100_000,
+        1_048_573,
+        2_097_150,
+        3_000_000,
+    ]
+    assert serial == expected
+    assert sharded == expected
+
+
+def test_read_block_across_segment_edges(tmp_path):
+    payload = _image_payload()
+    path = _write_segments(tmp_path, payload, segment_size=1000)
+
+    assert read_block(path, 4096, 3) == payload[3 * 4096 : 4 * 4096]
+    assert read_range(path, 999, 2) == payload[999:1001]
+    assert read_range(path, len(payload) - 10, 10) == payload[-10:]
+
+
+def test_segment_pool_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(split_image, "MAX_OPEN_SEGMENTS", 4)
+    payload = _image_payload()[: 64 * 1000]
+    path = _write_segments(tmp_path, payload, segment_size=1000)
+    image = open_split_image(path)
+    opened = []
+    real_open = os.open
+
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(split_image.os, "open", counting_open)
+
+    assert image.pread(len(payload), 0) == payload
+    assert image.pread(100, 63_950) == payload[63_950:64_000]
+    assert len(image._pool._entries) == 4
+    # The last segments are still open and served without reopening them.
+    assert len(opened) == 64
+
+
+def test_image_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(split_image, "_MAX_CACHED_IMAGES", 2)
+    monkeypatch.setattr(split_image, "_images", OrderedDict())
+    paths = []
+    for index in range(3):
+        image_dir = tmp_path / str(index)
+        image_dir.mkdir()
+        paths.append(_write_segments(image_dir, bytes([index]) * 3000, 1000))
+    first = open_split_image(paths[0])
+    assert first.pread(1, 2500) == b"\x00"
+    assert len(first._pool._entries) == 1
+
+    for path in paths[1:]:
+        open_split_image(path)
+
+    assert len(split_image._images) == 2
+    assert not first._pool._entries
+    assert open_split_image(paths[0]) is not first
+    # An evicted image still reads, without keeping descriptors open.
+    assert first.pread(1, 100) == b"\x00"
+    assert not first._pool._entries
+
+
+def test_image_partition_reports_all_segments(tmp_path):
+    payload = _image_payload()
+    path = _write_segments(tmp_path, payload)
+
+    partition = get_image_partition(path)
+
+    assert partition.size_bytes == len(payload)
+    assert partition.device_type == "split image (3 segments)"
+
+
+def test_lone_or_later_segments_are_plain_files(tmp_path):
+    lone = tmp_path / "single.001"
+    lone.write_bytes(b"data")
+    path = _write_segments(tmp_path, _image_payload())
+
+    assert get_split_segments(str(lone)) == []
+    assert get_split_segments(path.replace(".001", ".002")) == []
+    assert open_split_image(str(lone)) is None